@@ -20,7 +20,18 @@ from bulk_apply import register_bulk_apply_routes, init_bulk_apply
 from supabase import create_client, Client
 import logging
 import re
-from openai import OpenAI
+import llm_filter
+import llm_cache
+import crawler_daemon
+import crawl_jobs
+import crawl_scheduler
+import rate_limiter
+import llm_usage
+import session_store
+import job_store
+import url_index
+import relevance_ranker
+import verdict_classifier
 from updater import check_for_updates, perform_update, get_update_status
 import atexit
 from fix_settings_patch import get_app_paths, get_data_dir_from_env
@@ -45,6 +56,9 @@ DEFAULT_SETTINGS = {
     'deepseek_api_key': '',
     'max_items': 100,
     'filter_prompt': '',
+    'llm_concurrency': dict(llm_filter.DEFAULT_PROVIDER_CONCURRENCY),
+    'llm_batch_size': llm_filter.DEFAULT_BATCH_SIZE,
+    'llm_batch_token_budget': llm_filter.DEFAULT_BATCH_TOKEN_BUDGET,
     'self_introduction': '',
     'crowdworks_email': '',
     'crowdworks_password': ''
@@ -374,18 +388,17 @@ def auth_required(f):
 # 最新のフィルタリング済みJSONファイルを取得する関数
 def get_latest_filtered_json():
     data_dir = app_paths['data_dir']
-    json_files = glob.glob(str(data_dir / 'crawled_data' / '*_filtered.json'))
+    json_files = job_store.list_files(data_dir / 'crawled_data', filtered=True)
     if not json_files:
         return []
     latest_file = max(json_files, key=os.path.getctime)
-    with open(latest_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return job_store.load_records(latest_file)
 
 # 全てのフィルタリング済みJSONファイルの一覧を取得する関数
 def get_all_filtered_json_files():
     data_dir = app_paths['data_dir']
     crawled_data_dir = data_dir / 'crawled_data'
-    json_files = glob.glob(str(crawled_data_dir / '*_filtered.json'))
+    json_files = job_store.list_files(crawled_data_dir, filtered=True)
     if not json_files:
         return []
     
@@ -393,8 +406,8 @@ def get_all_filtered_json_files():
     file_info = []
     for file_path in json_files:
         file_name = os.path.basename(file_path)
-        # ファイル名からタイムスタンプを抽出（jobs_YYYYMMDD_HHMMSS_filtered.json）
-        match = re.search(r'jobs_(\d{8})_(\d{6})_filtered\.json', file_name)
+        # ファイル名からタイムスタンプを抽出（jobs_YYYYMMDD_HHMMSS_filtered.json / .jsonl）
+        match = re.search(r'jobs_(\d{8})_(\d{6})_filtered\.jsonl?$', file_name)
         if match:
             date_str = match.group(1)
             time_str = match.group(2)
@@ -403,9 +416,7 @@ def get_all_filtered_json_files():
             
             # 案件数を取得
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    jobs = json.load(f)
-                    job_count = len(jobs)
+                job_count = job_store.count_records(file_path)
             except:
                 job_count = 0
             
@@ -427,18 +438,27 @@ def load_filtered_json(file_path):
         return []
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            jobs = json.load(f)
-            # 詳細テキストの改行をHTMLの<br>タグに変換
-            for job in jobs:
-                if 'detail_description' in job:
-                    job['detail_description'] = job['detail_description'].replace('\n', '<br>')
-            return jobs
+        jobs = job_store.load_records(file_path)
+        # 詳細テキストの改行をHTMLの<br>タグに変換
+        for job in jobs:
+            if 'detail_description' in job:
+                job['detail_description'] = job['detail_description'].replace('\n', '<br>')
+        return jobs
     except Exception as e:
         logger.error(f"ファイルの読み込みに失敗: {str(e)}")
         return []
 
 # 案件データをクリアする関数
+def forget_job_urls(deleted_urls, seen_before=None):
+    """
+    削除した案件データのURLをURLインデックスから削除し、次回のクロールで再び取得されるようにする
+    （残っている案件データファイルに含まれるURLは削除しない）
+    """
+    crawled_data_dir = app_paths['data_dir'] / 'crawled_data'
+    remaining_urls = url_index.urls_in_files(job_store.list_files(crawled_data_dir))
+    removed = url_index.get_index().remove(set(deleted_urls) - remaining_urls, seen_before=seen_before)
+    logger.info(f"URLインデックスから {removed} 件の案件URLを削除しました")
+
 def clear_job_data(file_path=None):
     """
     案件データをクリアする
@@ -456,20 +476,25 @@ def clear_job_data(file_path=None):
         if file_path:
             # 特定のファイルのみ削除
             if os.path.exists(file_path):
+                raw_file = job_store.raw_path(file_path)
+                deleted_urls = url_index.urls_in_files([path for path in (file_path, raw_file) if os.path.exists(path)])
                 os.remove(file_path)
                 # 対応する非フィルタリングファイルも削除
-                raw_file = file_path.replace('_filtered.json', '.json')
                 if os.path.exists(raw_file):
                     os.remove(raw_file)
+                forget_job_urls(deleted_urls)
                 return 1
             return 0
         else:
             # 全てのファイルを削除（settings.jsonとchecked_jobs.jsonは除く）
             count = 0
-            for file_path in glob.glob(str(crawled_data_dir / '*.json')):
+            for file_path in glob.glob(str(crawled_data_dir / '*.json')) + glob.glob(str(crawled_data_dir / '*.jsonl')):
                 if not file_path.endswith('settings.json') and not file_path.endswith('checked_jobs.json'):
                     os.remove(file_path)
                     count += 1
+            # 全ての案件を未取得に戻す（残しておくと、以前に取得した案件が重複として除外され続ける）
+            url_index.get_index().clear()
+            logger.info("URLインデックスをリセットしました")
             return count
     except Exception as e:
         logger.error(f"案件データのクリアに失敗: {str(e)}")
@@ -497,8 +522,9 @@ def clear_old_job_data(days=14):
         
         # 削除対象のファイルを検索
         count = 0
-        for file_path in glob.glob(str(crawled_data_dir / 'jobs_*.json')):
-            # ファイル名からタイムスタンプを抽出（jobs_YYYYMMDD_HHMMSS.json または jobs_YYYYMMDD_HHMMSS_filtered.json）
+        deleted_urls = set()
+        for file_path in job_store.list_files(crawled_data_dir):
+            # ファイル名からタイムスタンプを抽出（jobs_YYYYMMDD_HHMMSS.json(l) または jobs_YYYYMMDD_HHMMSS_filtered.json(l)）
             file_name = os.path.basename(file_path)
             match = re.search(r'jobs_(\d{8})_(\d{6})', file_name)
             
@@ -513,6 +539,7 @@ def clear_old_job_data(days=14):
                     # 指定日数より古い場合は削除
                     if file_date < cutoff_date:
                         logger.info(f"古いファイルを削除: {file_path} ({file_date.strftime('%Y-%m-%d %H:%M:%S')})")
+                        deleted_urls |= url_index.urls_in_files([file_path])
                         os.remove(file_path)
                         count += 1
                 except ValueError:
@@ -521,6 +548,9 @@ def clear_old_job_data(days=14):
                     continue
         
         logger.info(f"合計 {count} 件の古い案件データファイルを削除しました")
+        if deleted_urls:
+            # 削除したファイルの案件のうち、その後のクロールで取得されていないものを未取得に戻す
+            forget_job_urls(deleted_urls, seen_before=cutoff_date.timestamp())
         return count
     except Exception as e:
         logger.error(f"古い案件データの削除に失敗: {str(e)}\n{traceback.format_exc()}")
@@ -543,81 +573,61 @@ def refilter_jobs(filter_prompt, model="gpt-4o-mini"):
         data_dir = app_paths['data_dir']
         crawled_data_dir = data_dir / 'crawled_data'
         
-        # 全ての非フィルタリングJSONファイルを取得
-        raw_files = glob.glob(str(crawled_data_dir / 'jobs_*.json'))
-        raw_files = [f for f in raw_files if not f.endswith('_filtered.json')]
+        # 全ての非フィルタリングファイルを取得
+        raw_files = job_store.list_files(crawled_data_dir, filtered=False)
         
         if not raw_files:
             return 0
             
-        # OpenAI クライアントの初期化
+        # モデルに応じたクライアントとバッチ審査エンジンの初期化
         settings = load_settings()
-        client = OpenAI(
-            api_key=settings.get('api_key', '')
+        rate_limiter.configure(settings)
+        llm_usage.configure(settings)
+        client = llm_filter.create_client(model, settings)
+        
+        # フィルタリング設定
+        config = {
+            'model': model,
+            'prompt': filter_prompt,
+            'temperature': 0,
+            'max_tokens': 100
+        }
+        engine = llm_filter.LLMFilterEngine(
+            client,
+            config,
+            max_workers=llm_filter.get_max_workers(model, settings),
+            cache=llm_cache.get_cache(settings),
+            retry_config=llm_filter.get_retry_config(settings),
+            **llm_filter.get_batch_options(settings)
         )
         
-        # 各ファイルに対して再フィルタリングを実行
+        # 各ファイルに対して再フィルタリングを実行（LLMの利用状況は再フィルタリング1回分として集計する）
         total_filtered = 0
+        llm_usage.start_run('refilter')
         
         for raw_file in raw_files:
             try:
                 # 元データを読み込み
-                with open(raw_file, 'r', encoding='utf-8') as f:
-                    jobs = json.load(f)
-                
-                # フィルタリング設定
-                config = {
-                    'model': model,
-                    'prompt': filter_prompt,
-                    'temperature': 0,
-                    'max_tokens': 100
-                }
+                jobs = job_store.load_records(raw_file)
                 
-                # フィルタリング実行
+                # フィルタリング実行（複数案件をまとめて問い合わせる）
+                results = engine.run(jobs, fail_fast=False)
                 filtered_jobs = []
-                for job in jobs:
-                    try:
-                        # 案件情報をテキスト形式に変換
-                        job_text = f"""
-                        タイトル: {job.get('title', 'N/A')}
-                        予算: {job.get('budget', 'N/A')}
-                        クライアント: {job.get('client', 'N/A')}
-                        投稿日: {job.get('posted_date', 'N/A')}
-                        説明: {job.get('description', 'N/A')}
-                        """
-                        
-                        # GPTにフィルタリングを依頼
-                        response = client.chat.completions.create(
-                            model=config['model'],
-                            messages=[
-                                {"role": "system", "content": "あなたは案件フィルタリングを行うアシスタントです。与えられた条件に基づいて案件を評価し、条件に合致するかどうかを判断してください。"},
-                                {"role": "user", "content": f"以下の案件が条件「{config['prompt']}」に合致するか判断してください。\n\n{job_text}\n\nJSON形式で回答してください: {{\"match\": true/false, \"reason\": \"理由\"}}"}
-                            ],
-                            temperature=config['temperature'],
-                            max_tokens=config['max_tokens']
-                        )
-                        
-                        # レスポンスからJSONを抽出
-                        result_text = response.choices[0].message.content
-                        result_json = re.search(r'\{.*\}', result_text, re.DOTALL)
-                        if result_json:
-                            result = json.loads(result_json.group(0))
-                        else:
-                            result = {"match": True, "reason": "フォーマットエラー（安全のため含める）"}
-                        
-                        # 条件に合致する場合のみ追加
-                        if result.get('match', True):
-                            job['gpt_reason'] = result.get('reason', '')
-                            filtered_jobs.append(job)
-                    except Exception as e:
-                        logger.error(f"案件フィルタリング中にエラー: {str(e)}")
+                for job, result in zip(jobs, results):
+                    job['decided_by'] = verdict_classifier.STAGE_LLM
+                    if result['decision'] == 'error':
                         # エラーの場合は安全のため含める
+                        job['gpt_reason'] = "判定エラー（安全のため含める）"
+                        job['decided_by'] = verdict_classifier.STAGE_ERROR
                         filtered_jobs.append(job)
+                    elif result['decision'] == 'yes':
+                        job['gpt_reason'] = result['reason']
+                        filtered_jobs.append(job)
+                verdict_classifier.record_verdicts(jobs, filtered_jobs, filter_prompt)
                 
                 # フィルタリング結果を保存
-                filtered_file = raw_file.replace('.json', '_filtered.json')
-                with open(filtered_file, 'w', encoding='utf-8') as f:
-                    json.dump(filtered_jobs, f, ensure_ascii=False, indent=2)
+                filtered_file = job_store.filtered_path(raw_file)
+                job_store.write_records(filtered_file, filtered_jobs, job_store.get_config(settings))
                 
                 total_filtered += len(filtered_jobs)
                 
@@ -625,10 +635,12 @@ def refilter_jobs(filter_prompt, model="gpt-4o-mini"):
                 logger.error(f"ファイル {raw_file} の再フィルタリング中にエラー: {str(e)}")
                 continue
         
+        llm_usage.finish_run()
         return total_filtered
         
     except Exception as e:
         logger.error(f"再フィルタリング処理中にエラー: {str(e)}")
+        llm_usage.finish_run(status='failed')
         raise
 
 # チェック状態を保存するファイル
@@ -660,6 +672,10 @@ DEFAULT_SETTINGS = {
     'deepseek_api_key': '',
     'max_items': 50,
     'filter_prompt': '',
+    'filter_rules': {},
+    'llm_concurrency': dict(llm_filter.DEFAULT_PROVIDER_CONCURRENCY),
+    'llm_batch_size': llm_filter.DEFAULT_BATCH_SIZE,
+    'llm_batch_token_budget': llm_filter.DEFAULT_BATCH_TOKEN_BUDGET,
     'self_introduction': '',
     'crowdworks_email': '',
     'crowdworks_password': '',
@@ -702,6 +718,11 @@ def load_settings():
             with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
                 loaded_settings = json.load(f)
                 settings.update(loaded_settings)
+                # 一部のプロバイダのみ指定されている場合も、残りは既定値で補う
+                settings['llm_concurrency'] = {
+                    **llm_filter.DEFAULT_PROVIDER_CONCURRENCY,
+                    **(settings.get('llm_concurrency') or {})
+                }
                 logger.debug(f"読み込んだ設定: {settings}")
         except Exception as e:
             logger.error(f"設定ファイルの読み込みに失敗: {str(e)}")
@@ -919,6 +940,24 @@ def update_settings():
                 settings['deepseek_api_key'] = data['deepseek_api_key']
             if 'filter_prompt' in data:
                 settings['filter_prompt'] = data['filter_prompt']
+            if 'filter_rules' in data:
+                if not isinstance(data['filter_rules'], dict):
+                    raise ValueError("filter_rulesはオブジェクト形式で指定してください")
+                settings['filter_rules'] = data['filter_rules']
+            if 'llm_concurrency' in data:
+                if not isinstance(data['llm_concurrency'], dict):
+                    raise ValueError("llm_concurrencyはオブジェクト形式で指定してください")
+                concurrency = dict(settings.get('llm_concurrency') or {})
+                for provider, value in data['llm_concurrency'].items():
+                    if provider not in llm_filter.DEFAULT_PROVIDER_CONCURRENCY or int(value) < 1:
+                        raise ValueError(f"llm_concurrencyの値が不正です: {provider}={value}")
+                    concurrency[provider] = int(value)
+                settings['llm_concurrency'] = concurrency
+            for key in ('llm_batch_size', 'llm_batch_token_budget'):
+                if key in data:
+                    if int(data[key]) < 1:
+                        raise ValueError(f"{key}は1以上で指定してください")
+                    settings[key] = int(data[key])
             if 'self_introduction' in data:
                 settings['self_introduction'] = data['self_introduction']
                 # SelfIntroduction.txtファイルに保存
@@ -972,129 +1011,201 @@ def update_settings():
             status_code=500
         )
 
+def run_crawl_job(job):
+    """
+    クロールジョブの実行関数（CrawlJobManagerのワーカースレッドで実行される）
+
+    常駐クローラーデーモンが有効な場合はデーモンで、利用できない場合はサブプロセスでクロールする。
+
+    Returns:
+        最新のフィルタリング済みJSONファイルなどの実行結果
+
+    Raises:
+        crawl_jobs.CrawlCancelled: キャンセルされた場合
+        Exception: クローラーの実行に失敗した場合
+    """
+    # クローラーのパスを取得
+    crawler_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawler.py')
+    if not os.path.exists(crawler_path):
+        raise FileNotFoundError(f"クローラーファイルが見つかりません: {crawler_path}")
+    
+    stdout, stderr = '', ''
+    
+    # 常駐クローラーデーモンが有効な場合は、ログイン済みのブラウザでクロールする
+    daemon_result = None
+    if crawler_daemon.get_config(load_settings())['enabled']:
+        try:
+            logger.info("クローラーデーモンにクロールを要求")
+            job.check_cancelled()
+            job.cancel_callback = crawler_daemon.cancel_crawl
+            daemon_result = crawler_daemon.request_crawl()
+        except crawler_daemon.DaemonTimeout as e:
+            # デーモンがまだクロール中の可能性があるため、デーモンを終了させてからサブプロセスで実行する
+            # （2つのブラウザが同時にクロールしないようにする）
+            logger.warning(f"クローラーデーモンの応答がタイムアウトしたため、デーモンを停止してサブプロセスで実行します: {str(e)}")
+            crawler_daemon.stop_daemon(wait=True)
+        except ConnectionError as e:
+            logger.warning(f"クローラーデーモンを利用できないため、サブプロセスで実行します: {str(e)}")
+        finally:
+            job.cancel_callback = None
+    
+    if daemon_result is not None:
+        logger.info(f"クローラーデーモンの実行結果: {daemon_result}")
+        if daemon_result.get('status') == 'cancelled':
+            raise crawl_jobs.CrawlCancelled(daemon_result.get('message', 'クロールはキャンセルされました'))
+        if daemon_result.get('status') != 'success':
+            # デーモンはエラー時にブラウザを終了している。サブプロセスで実行し直す
+            # （ログインエラー等のダイアログはサブプロセスのクローラーが表示する）
+            logger.warning(f"クローラーデーモンでのクロールに失敗したため、サブプロセスで実行します: {daemon_result.get('message', '')}")
+            daemon_result = None
+    
+    if daemon_result is not None:
+        stdout = daemon_result.get('message', '')
+    else:
+        job.check_cancelled()
+        # サブプロセスとしてクローラーを実行
+        python_executable = sys.executable
+        logger.info(f"クローラーを実行: {python_executable} {crawler_path}")
+        process = subprocess.Popen(
+            [python_executable, crawler_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        # キャンセル時はSIGINTで終了させ、クローラー側でブラウザを終了させる
+        if os.name == 'nt':
+            job.cancel_callback = process.terminate
+        else:
+            job.cancel_callback = lambda: process.send_signal(signal.SIGINT)
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            job.cancel_callback = None
+        
+        # 出力内容をログに記録
+        logger.info(f"クローラー標準出力: {stdout}")
+        if stderr:
+            logger.warning(f"クローラー標準エラー出力: {stderr}")
+        
+        if process.returncode != 0:
+            job.check_cancelled()
+            logger.error(f"クローラーの実行に失敗: 戻り値={process.returncode}, エラー={stderr}")
+            raise RuntimeError(f"クローラーの実行に失敗しました: {stderr}")
+    
+    # 最新のフィルタリング済みデータを結果とする
+    latest_file = get_latest_filtered_file()
+    return {
+        'message': 'クロールが完了しました',
+        'result_file': latest_file,
+        # このジョブで新しく作成されたファイルかどうか
+        'new_data': bool(latest_file) and os.path.getctime(latest_file) >= job.started_at,
+        'crawler_output': stdout[-2000:],
+        'crawler_error': stderr[-2000:]
+    }
+
+# クロールジョブの管理（同時に実行するクロールは1件のみ）
+crawl_job_manager = crawl_jobs.CrawlJobManager(run_crawl_job)
+
+# 新着の到着ペースに合わせた定期クロール（手動のクロールが実行中の場合はそのジョブに合流する）
+adaptive_scheduler = crawl_scheduler.AdaptiveCrawlScheduler(
+    lambda: crawl_job_manager.submit(source='scheduler')[0],
+    load_settings
+)
+
+def get_latest_filtered_file(since=None):
+    """
+    最新のフィルタリング済みデータのファイルを取得
+
+    Args:
+        since: 指定した時刻（UNIX時間）以降に作成されたファイルのみを対象とする
+
+    Returns:
+        ファイルのパス（該当するファイルがない場合はNone）
+    """
+    crawled_data_dir = app_paths['data_dir'] / 'crawled_data'
+    os.makedirs(crawled_data_dir, exist_ok=True)
+    json_files = job_store.list_files(crawled_data_dir, filtered=True)
+    if since is not None:
+        json_files = [path for path in json_files if os.path.getctime(path) >= since]
+    return max(json_files, key=os.path.getctime) if json_files else None
+
+def load_crawl_job_results(job):
+    """
+    完了したクロールジョブの結果ファイルを読み込む
+
+    Returns:
+        案件リスト（結果ファイルがない場合はNone）
+
+    Raises:
+        json.JSONDecodeError: ファイルが破損している場合
+    """
+    result_file = job.result.get('result_file')
+    if not result_file or not os.path.exists(result_file) or os.path.getsize(result_file) == 0:
+        return None
+    return job_store.load_records(result_file)
+
+def load_partial_crawl_job_results(job):
+    """
+    実行中のクロールジョブがこれまでに保存した案件を読み込む（詳細取得まで完了した案件のみ）
+
+    Returns:
+        案件リスト（このジョブで作成されたファイルがまだない場合は空のリスト）
+    """
+    if not job.started_at:
+        return []
+    partial_file = get_latest_filtered_file(since=job.started_at)
+    if not partial_file or not partial_file.endswith(job_store.JSONL_SUFFIX):
+        return []
+    return job_store.load_records(partial_file)
+
 @app.route('/fetch_new_data', methods=['POST'])
 @auth_required
 def fetch_new_data():
+    """クロールジョブを開始（実行中の場合は合流）し、完了まで待って結果を返す（従来の同期API）"""
     try:
-        # リクエストボディを取得（空でも問題ない）
-        try:
-            data = request.get_json(silent=True) or {}
-        except Exception as e:
-            logger.warning(f"リクエストの解析に失敗: {str(e)}")
-            data = {}
-            
-        # クローラーのパスを取得
-        try:
-            crawler_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawler.py')
-            if not os.path.exists(crawler_path):
-                return handle_error(
-                    Exception(f"クローラーファイルが見つかりません: {crawler_path}"),
-                    error_type="ファイルエラー",
-                    user_message="クローラーファイルが見つかりません。",
-                    status_code=500
-                )
-        except Exception as e:
-            return handle_error(
-                e,
-                error_type="パスエラー",
-                user_message="クローラーファイルのパス取得に失敗しました。",
-                status_code=500
-            )
+        job, _ = crawl_job_manager.submit(source='fetch_new_data')
+        job.done.wait()
         
-        # Pythonインタープリタのパスを取得
-        python_executable = sys.executable
-        
-        # サブプロセスとしてクローラーを実行
-        try:
-            logger.info(f"クローラーを実行: {python_executable} {crawler_path}")
-            process = subprocess.Popen(
-                [python_executable, crawler_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # 実行結果を取得
-            stdout, stderr = process.communicate()
-            
-            # 出力内容をログに記録
-            logger.info(f"クローラー標準出力: {stdout}")
-            if stderr:
-                logger.warning(f"クローラー標準エラー出力: {stderr}")
-            
-            if process.returncode != 0:
-                logger.error(f"クローラーの実行に失敗: 戻り値={process.returncode}, エラー={stderr}")
-                return handle_error(
-                    Exception(f"クローラーの実行に失敗しました: {stderr}"),
-                    error_type="クローラーエラー",
-                    user_message=f"データの取得に失敗しました: {stderr}",
-                    status_code=500
-                )
-        except subprocess.SubprocessError as e:
+        if job.status == crawl_jobs.STATUS_CANCELLED:
+            return jsonify({
+                'status': 'error',
+                'message': 'データの取得はキャンセルされました。'
+            }), 409
+        if job.status != crawl_jobs.STATUS_SUCCEEDED:
             return handle_error(
-                e,
-                error_type="プロセスエラー",
-                user_message="クローラープロセスの実行に失敗しました。",
+                Exception(job.message),
+                error_type="クローラーエラー",
+                user_message=f"データの取得に失敗しました: {job.message}",
                 status_code=500
             )
         
         # 最新のデータを読み込む
         try:
-            data_dir = app_paths['data_dir']
-            crawled_data_dir = data_dir / 'crawled_data'
-            os.makedirs(crawled_data_dir, exist_ok=True)
-            
-            json_files = glob.glob(str(crawled_data_dir / '*_filtered.json'))
-            if not json_files:
-                logger.warning("フィルタリング済みJSONファイルが見つかりません")
-                return jsonify({
-                    'status': 'error',
-                    'message': '新規データが見つかりませんでした。ログインエラーや設定の問題が考えられます。',
-                    'crawler_output': stdout,
-                    'crawler_error': stderr
-                }), 404
-                
-            # 最新のファイルを選択
-            latest_file = max(json_files, key=os.path.getctime)
-            logger.info(f"最新のフィルタリング済みJSONファイル: {latest_file}")
-            
-            # ファイルが存在するか確認
-            if not os.path.exists(latest_file) or os.path.getsize(latest_file) == 0:
-                logger.error(f"ファイルが存在しないか空です: {latest_file}")
-                return jsonify({
-                    'status': 'error',
-                    'message': 'データファイルが存在しないか空です。',
-                    'crawler_output': stdout,
-                    'crawler_error': stderr
-                }), 500
-            
-            # ファイルを読み込む
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                jobs = json.load(f)
-                
-            logger.info(f"新規データの取得が完了: {len(jobs)}件の案件を取得")
-            return jsonify({
-                'status': 'success',
-                'message': f'新規データの取得が完了しました（{len(jobs)}件）',
-                'jobs': jobs
-            })
+            jobs = load_crawl_job_results(job)
         except json.JSONDecodeError as e:
-            logger.error(f"JSONの解析に失敗: {str(e)}, ファイル: {latest_file}")
+            logger.error(f"JSONの解析に失敗: {str(e)}, ファイル: {job.result.get('result_file')}")
             return handle_error(
                 e,
                 error_type="JSONデータエラー",
                 user_message="新規データの解析に失敗しました。データが破損している可能性があります。",
                 status_code=500
             )
-        except Exception as e:
-            logger.error(f"データ読み込みに失敗: {str(e)}\n{traceback.format_exc()}")
-            return handle_error(
-                e,
-                error_type="データ読み込みエラー",
-                user_message="新規データの読み込みに失敗しました。",
-                status_code=500
-            )
-            
+        
+        if jobs is None:
+            logger.warning("フィルタリング済みJSONファイルが見つかりません")
+            return jsonify({
+                'status': 'error',
+                'message': '新規データが見つかりませんでした。ログインエラーや設定の問題が考えられます。',
+                'crawler_output': job.result.get('crawler_output', ''),
+                'crawler_error': job.result.get('crawler_error', '')
+            }), 404
+        
+        logger.info(f"新規データの取得が完了: {len(jobs)}件の案件を取得")
+        return jsonify({
+            'status': 'success',
+            'message': f'新規データの取得が完了しました（{len(jobs)}件）',
+            'jobs': jobs
+        })
     except Exception as e:
         return handle_error(
             e,
@@ -1103,6 +1214,155 @@ def fetch_new_data():
             status_code=500
         )
 
+@app.route('/api/crawl_jobs', methods=['POST'])
+@auth_required
+def start_crawl_job_api():
+    """クロールジョブを開始してすぐにジョブIDを返すAPI（実行中のジョブがある場合はそのジョブに合流）"""
+    try:
+        job, created = crawl_job_manager.submit(source='api')
+        return jsonify({
+            'success': True,
+            'created': created,
+            'job': job.as_dict()
+        }), 202
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="クロールジョブ開始エラー",
+            user_message="データ取得の開始に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/crawl_jobs', methods=['GET'])
+@auth_required
+def list_crawl_jobs_api():
+    """保持しているクロールジョブの一覧を取得するAPI（新しい順）"""
+    try:
+        return jsonify({
+            'success': True,
+            'jobs': [job.as_dict() for job in crawl_job_manager.list_jobs()]
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="クロールジョブ取得エラー",
+            user_message="データ取得の状況の取得に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/crawl_jobs/<job_id>', methods=['GET'])
+@auth_required
+def get_crawl_job_api(job_id):
+    """クロールジョブの状態を取得するAPI"""
+    job = crawl_job_manager.get(job_id)
+    if job is None:
+        return handle_error(
+            Exception(f"クロールジョブが見つかりません: {job_id}"),
+            error_type="パラメータエラー",
+            user_message="指定されたデータ取得ジョブが見つかりません。",
+            status_code=404
+        )
+    return jsonify({
+        'success': True,
+        'job': job.as_dict()
+    })
+
+@app.route('/api/crawl_jobs/<job_id>/cancel', methods=['POST'])
+@auth_required
+def cancel_crawl_job_api(job_id):
+    """クロールジョブのキャンセルを要求するAPI（ページ・詳細取得の区切りで中断される）"""
+    try:
+        job = crawl_job_manager.cancel(job_id)
+        if job is None:
+            return handle_error(
+                Exception(f"クロールジョブが見つかりません: {job_id}"),
+                error_type="パラメータエラー",
+                user_message="指定されたデータ取得ジョブが見つかりません。",
+                status_code=404
+            )
+        return jsonify({
+            'success': True,
+            'job': job.as_dict()
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="クロールジョブキャンセルエラー",
+            user_message="データ取得のキャンセルに失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/crawl_jobs/<job_id>/results', methods=['GET'])
+@auth_required
+def get_crawl_job_results_api(job_id):
+    """完了したクロールジョブの案件データを取得するAPI"""
+    job = crawl_job_manager.get(job_id)
+    if job is None:
+        return handle_error(
+            Exception(f"クロールジョブが見つかりません: {job_id}"),
+            error_type="パラメータエラー",
+            user_message="指定されたデータ取得ジョブが見つかりません。",
+            status_code=404
+        )
+    try:
+        if job.active and request.args.get('partial') == 'true':
+            # 実行中でも、詳細取得まで完了した案件は逐次ファイルに追記されているため途中結果を返せる
+            return jsonify({
+                'success': True,
+                'partial': True,
+                'job': job.as_dict(),
+                'jobs': load_partial_crawl_job_results(job)
+            })
+        if job.status != crawl_jobs.STATUS_SUCCEEDED:
+            return jsonify({
+                'success': False,
+                'job': job.as_dict(),
+                'message': 'データ取得が完了していません。' if job.active else job.message
+            }), 409
+        jobs = load_crawl_job_results(job)
+        if jobs is None:
+            return jsonify({
+                'success': False,
+                'job': job.as_dict(),
+                'message': '新規データが見つかりませんでした。ログインエラーや設定の問題が考えられます。'
+            }), 404
+        return jsonify({
+            'success': True,
+            'job': job.as_dict(),
+            'jobs': jobs
+        })
+    except json.JSONDecodeError as e:
+        return handle_error(
+            e,
+            error_type="JSONデータエラー",
+            user_message="新規データの解析に失敗しました。データが破損している可能性があります。",
+            status_code=500
+        )
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="データ読み込みエラー",
+            user_message="新規データの読み込みに失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/scheduler/status', methods=['GET'])
+@auth_required
+def scheduler_status_api():
+    """定期クロールのスケジューラーの状態（次回の実行予定・現在の間隔・実行履歴）を取得するAPI"""
+    try:
+        return jsonify({
+            'success': True,
+            'scheduler': adaptive_scheduler.status()
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="スケジューラー状態取得エラー",
+            user_message="定期クロールの状態の取得に失敗しました。",
+            status_code=500
+        )
+
 @app.route('/api/check_auth', methods=['POST'])
 @auth_required
 def api_check_auth():
@@ -1324,7 +1584,7 @@ def get_job_history_content():
         safe_file_path = str(crawled_data_dir / file_name)
         
         # パスインジェクション対策
-        if not file_path or not file_name.endswith('_filtered.json'):
+        if not file_path or not job_store.is_filtered(file_name):
             return jsonify({
                 'success': False,
                 'message': '無効な案件ファイルパスです。'
@@ -1342,7 +1602,7 @@ def get_job_history_content():
         
         # ファイル情報を取得
         file_name = os.path.basename(safe_file_path)
-        match = re.search(r'jobs_(\d{8})_(\d{6})_filtered\.json', file_name)
+        match = re.search(r'jobs_(\d{8})_(\d{6})_filtered\.jsonl?$', file_name)
         date_str = ""
         if match:
             date_str = f"{match.group(1)[:4]}-{match.group(1)[4:6]}-{match.group(1)[6:8]} {match.group(2)[:2]}:{match.group(2)[2:4]}:{match.group(2)[4:6]}"
@@ -1451,6 +1711,161 @@ def refilter_job_history():
             status_code=500
         )
 
+@app.route('/api/llm_cache/stats')
+@auth_required
+def llm_cache_stats_api():
+    """LLM判定キャッシュの統計情報を取得するAPI"""
+    try:
+        cache = llm_cache.get_cache(load_settings())
+        if cache is None:
+            return jsonify({
+                'success': True,
+                'enabled': False
+            })
+        return jsonify({
+            'success': True,
+            'enabled': True,
+            'stats': cache.stats()
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="キャッシュ統計取得エラー",
+            user_message="LLM判定キャッシュの統計情報の取得に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/rate_limits/metrics')
+@auth_required
+def rate_limit_metrics_api():
+    """LLM・サイトへの送信レートの利用状況を取得するAPI（クローラーの値は最後のクロール終了時点）"""
+    try:
+        saved = rate_limiter.load_saved_metrics()
+        return jsonify({
+            'success': True,
+            'config': rate_limiter.get_config(load_settings()),
+            'app': rate_limiter.metrics(),
+            'crawler': saved.get('crawler')
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="レート制限統計取得エラー",
+            user_message="送信レートの利用状況の取得に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/relevance_ranking/metrics')
+@auth_required
+def relevance_ranking_metrics_api():
+    """LLM判定前の事前ランキングの除外件数と推定再現率を取得するAPI（クローラーが保存した累計値）"""
+    try:
+        return jsonify({
+            'success': True,
+            'config': relevance_ranker.get_config(load_settings()),
+            'metrics': relevance_ranker.load_metrics()
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="事前ランキング統計取得エラー",
+            user_message="事前ランキングの集計の取得に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/verdict_classifier/train', methods=['POST'])
+@auth_required
+def train_verdict_classifier_api():
+    """過去のクロール結果から判定の分類器を再学習するAPI"""
+    try:
+        settings = load_settings()
+        result = verdict_classifier.train(settings, settings.get('filter_prompt', ''))
+        return jsonify({
+            'success': True,
+            'report': result
+        })
+    except ValueError as e:
+        return handle_error(
+            e,
+            error_type="学習データエラー",
+            user_message=f"判定の分類器を学習できません: {str(e)}",
+            status_code=400
+        )
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="分類器学習エラー",
+            user_message="判定の分類器の学習に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/verdict_classifier/report')
+@auth_required
+def verdict_classifier_report_api():
+    """判定の分類器の検証結果と、運用中のLLMとの一致率を取得するAPI"""
+    try:
+        settings = load_settings()
+        config = verdict_classifier.get_config(settings)
+        result = verdict_classifier.report()
+        unusable_reason = None
+        if result['model'] is not None:
+            unusable_reason = verdict_classifier.load_model().unusable_reason(config, settings.get('filter_prompt', ''))
+        return jsonify({
+            'success': True,
+            'config': config,
+            'model': result['model'],
+            'live': result['live'],
+            # 有効かつ使える状態の場合のみクロール時に使われる
+            'active': config['enabled'] and result['model'] is not None and unusable_reason is None,
+            'unusable_reason': unusable_reason
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="分類器レポート取得エラー",
+            user_message="判定の分類器のレポートの取得に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/llm_usage')
+@auth_required
+def llm_usage_api():
+    """LLM呼び出しの応答時間・トークン数・推定料金・エラーを取得するAPI（実行ごとの集計は新しい順）"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        saved = llm_usage.load_saved_metrics()
+        return jsonify({
+            'success': True,
+            'pricing': llm_usage.get_pricing(load_settings()),
+            'app': llm_usage.metrics(),
+            'crawler': saved.get('crawler'),
+            'runs': llm_usage.load_runs(limit)
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="LLM利用状況取得エラー",
+            user_message="LLMの利用状況の取得に失敗しました。",
+            status_code=500
+        )
+
+@app.route('/api/session/metrics')
+@auth_required
+def session_metrics_api():
+    """CrowdWorksセッションCookieの再利用状況を取得するAPI"""
+    try:
+        return jsonify({
+            'success': True,
+            'metrics': session_store.get_metrics()
+        })
+    except Exception as e:
+        return handle_error(
+            e,
+            error_type="セッション統計取得エラー",
+            user_message="セッションの再利用状況の取得に失敗しました。",
+            status_code=500
+        )
+
 @app.route('/api/get_checks')
 @auth_required
 def get_checks_api():
@@ -1583,30 +1998,23 @@ def get_job_details_api():
                 'message': '案件URLが指定されていません'
             }), 400
         
-        # 全ての案件データをチェック
-        all_jobs = []
-        json_files = glob.glob('crawled_data/*_filtered.json')
-        
-        for file_path in json_files:
+        # 全ての案件データを1件ずつ読み、URLに一致する案件が見つかった時点で読み込みをやめる
+        for file_path in job_store.list_files('crawled_data', filtered=True):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    jobs = json.load(f)
-                    all_jobs.extend(jobs)
+                for job in job_store.iter_records(file_path):
+                    if job.get('url') != job_url:
+                        continue
+                    # 詳細情報の整形
+                    if 'detail_description' in job:
+                        job['detail_description'] = job['detail_description'].replace('\n', '<br>')
+                    return jsonify({
+                        'success': True,
+                        'job': job
+                    })
             except Exception as e:
                 logger.error(f"ファイル {file_path} の読み込み中にエラー: {str(e)}")
                 continue
         
-        # URLに一致する案件を探す
-        for job in all_jobs:
-            if job.get('url') == job_url:
-                # 詳細情報の整形
-                if 'detail_description' in job:
-                    job['detail_description'] = job['detail_description'].replace('\n', '<br>')
-                return jsonify({
-                    'success': True,
-                    'job': job
-                })
-        
         # 案件が見つからない場合
         return jsonify({
             'success': False,
@@ -1690,6 +2098,12 @@ def cleanup_resources():
     chromedriver_manager.stop_background_update()
     logger.info("ChromeDriverのバックグラウンド更新を停止しました")
     
+    # 定期クロールを停止する
+    adaptive_scheduler.shutdown()
+    
+    # クローラーデーモンを終了させる
+    crawler_daemon.stop_daemon()
+    
     # Nodeサーバーも終了させる
     stop_node_server()
 
@@ -1827,6 +2241,9 @@ def init_app():
     # バルク応募ルートの登録
     register_bulk_apply_routes(app)
     
+    # 定期クロールのスケジューラーを開始（実行するかどうかは設定の crawl_scheduler.enabled で切り替える）
+    adaptive_scheduler.start()
+    
     return app
 
 # ブラウザ終了通知を受け取るAPIエンドポイント
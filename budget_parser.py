@@ -0,0 +1,103 @@
+import re
+import unicodedata
+from typing import Dict, Optional
+
+# 予算種別
+BUDGET_TYPE_FIXED = 'fixed'
+BUDGET_TYPE_HOURLY = 'hourly'
+BUDGET_TYPE_UNSET = 'unset'
+
+# 金額（「1.5万」「1万5000」「10,000」などに対応）
+AMOUNT_PATTERN = re.compile(r'(\d+(?:,\d{3})*(?:\.\d+)?)\s*(万|千)?(\d+(?:,\d{3})*)?')
+
+# 範囲を表す記号（NFKC正規化後）
+RANGE_SEPARATORS = ('〜', '~', '-', '–', '—', 'ー', 'から')
+
+# 時間単価であることを示す表記
+HOURLY_PATTERN = re.compile(r'時間|時給|/\s*h(?:our|r)?\b', re.IGNORECASE)
+
+# 予算が設定されていないことを示す表記
+UNSET_PATTERN = re.compile(r'未設定|未定|相談')
+
+# 金額の前に付く通貨記号（NFKC正規化後）
+CURRENCY_PREFIXES = ('¥', '\\')
+
+UNIT_MULTIPLIERS = {
+    '万': 10000,
+    '千': 1000
+}
+
+def _to_amount(number: str, unit: Optional[str], remainder: Optional[str]) -> int:
+    """正規表現の一致部分を円単位の整数に変換"""
+    value = float(number.replace(',', ''))
+    if unit:
+        value *= UNIT_MULTIPLIERS[unit]
+        if remainder:
+            # 「1万5000円」のように単位の後ろに端数が続く場合
+            value += float(remainder.replace(',', ''))
+    return int(round(value))
+
+def parse_budget(text: Optional[str]) -> Dict:
+    """
+    予算文字列を数値化する
+
+    Args:
+        text: 「10,000円 〜 50,000円」「１．５万円」「1,000円 / 時間」「予算未設定」などの予算表記
+
+    Returns:
+        budget_min, budget_max（円、不明な場合はNone）、
+        budget_type（fixed / hourly / unset）、budget_currency を持つ辞書
+    """
+    result = {
+        'budget_min': None,
+        'budget_max': None,
+        'budget_type': BUDGET_TYPE_UNSET,
+        'budget_currency': None
+    }
+    if not text:
+        return result
+
+    # 全角数字・記号を半角に揃える（「～」は「~」に、「，」は「,」になる）
+    normalized = unicodedata.normalize('NFKC', text).strip()
+    is_hourly = bool(HOURLY_PATTERN.search(normalized))
+
+    matches = []
+    for match in AMOUNT_PATTERN.finditer(normalized):
+        number, unit, remainder = match.groups()
+        if remainder and not unit:
+            # 単位がない場合は連続した数字として扱わない
+            remainder = None
+        is_money = bool(unit) or normalized[match.end():].lstrip().startswith('円') \
+            or normalized[:match.start()].rstrip().endswith(CURRENCY_PREFIXES)
+        matches.append((match.start(), match.end(), _to_amount(number, unit, remainder), is_money))
+
+    # 「3件 10,000円」「1時間 1,000円」のように件数・時間などの数字が混ざる場合は、
+    # 円・万・千・通貨記号が付いた数字のみを金額とする
+    if any(is_money for *_, is_money in matches):
+        matches = [match for match in matches if match[3]]
+
+    if not matches:
+        if is_hourly and not UNSET_PATTERN.search(normalized):
+            result['budget_type'] = BUDGET_TYPE_HOURLY
+        return result
+
+    result['budget_type'] = BUDGET_TYPE_HOURLY if is_hourly else BUDGET_TYPE_FIXED
+    result['budget_currency'] = 'JPY'
+
+    if len(matches) >= 2:
+        amounts = sorted(amount for _, _, amount, _ in matches[:2])
+        result['budget_min'], result['budget_max'] = amounts
+        return result
+
+    start, end, amount, _ = matches[0]
+    before = normalized[:start].strip()
+    after = normalized[end:].strip().lstrip('円').strip()
+    if before.endswith(RANGE_SEPARATORS):
+        # 「〜 50,000円」は上限のみ
+        result['budget_max'] = amount
+    elif after.startswith(RANGE_SEPARATORS):
+        # 「10,000円 〜」は下限のみ
+        result['budget_min'] = amount
+    else:
+        result['budget_min'] = result['budget_max'] = amount
+    return result
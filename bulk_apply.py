@@ -17,8 +17,12 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from openai import OpenAI
 from fix_settings_patch import get_app_paths
+import session_store
+import page_waits
+import llm_filter
+import rate_limiter
+import llm_usage
 
 # アプリケーションパスを取得
 app_paths = get_app_paths()
@@ -75,6 +79,9 @@ def handle_error(e, error_type="一般エラー", user_message=None, status_code
         'detail': str(e)
     }), status_code
 
+# 条件待機ごとの実際の待機時間
+wait_recorder = page_waits.WaitRecorder()
+
 # グローバル変数で進捗状況を管理
 progress_queue = Queue()
 current_progress = {
@@ -161,9 +168,13 @@ def setup_driver():
         raise
 
 def login_to_crowdworks(driver, email: str, password: str) -> bool:
-    """クラウドワークスにログイン"""
+    """クラウドワークスにログイン（保存済みのセッションが有効な場合は再利用）"""
+    if session_store.restore_session(driver, email, 'bulk_apply'):
+        return True
+    
     try:
         logger.info("ログイン処理を開始")
+        rate_limiter.site_limiter("https://crowdworks.jp/login").acquire()
         driver.get("https://crowdworks.jp/login")
         wait = WebDriverWait(driver, 20)
         
@@ -173,15 +184,18 @@ def login_to_crowdworks(driver, email: str, password: str) -> bool:
         submit_button = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "button[type='submit']")))
         
         email_input.send_keys(email)
-        time.sleep(1)
         password_input.send_keys(password)
-        time.sleep(1)
         submit_button.click()
         
-        time.sleep(5)
+        # ログインページから遷移するか、エラーメッセージが表示されるまで待機
+        wait_recorder.wait_until(driver, page_waits.login_settled(), 15, "ログイン後の遷移")
         
         # ログイン成功の確認
-        return "/login" not in driver.current_url
+        if "/login" in driver.current_url:
+            return False
+        session_store.save_cookies(driver, email)
+        session_store.record_event('bulk_apply', 'fresh_login')
+        return True
         
     except Exception as e:
         logger.error(f"ログイン処理でエラー発生: {str(e)}")
@@ -191,15 +205,10 @@ def generate_application_content(job_detail: str, self_intro: str) -> Dict[str,
     """LLMを使用して応募内容を生成"""
     try:
         settings = load_settings()
+        model = settings.get('model', 'gpt-4')
         
         # モデルに応じてクライアントを選択
-        if settings.get('model') == 'deepseek-chat':
-            client = OpenAI(
-                api_key=settings.get('deepseek_api_key', ''),
-                base_url="https://api.deepseek.com"
-            )
-        else:
-            client = OpenAI(api_key=settings.get('api_key'))
+        client = llm_filter.create_client(model, settings)
         
         prompt = f"""
 以下の案件に対する応募メッセージと契約金額を生成してください。
@@ -218,13 +227,17 @@ def generate_application_content(job_detail: str, self_intro: str) -> Dict[str,
 }}
 """
         
-        response = client.chat.completions.create(
-            model=settings.get('model', 'gpt-4'),
-            messages=[
+        # クローラーのLLM呼び出しと同じプロバイダのレート制限に従う
+        response = llm_filter.create_chat_completion(
+            client,
+            model,
+            [
                 {"role": "system", "content": "あなたはフリーランスエンジニアの応募メッセージを作成する専門家です。"},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.7,
+            retry=llm_filter.get_retry_config(settings),
+            purpose='application',
             response_format={"type": "json_object"}
         )
         
@@ -242,6 +255,7 @@ def apply_to_job(driver, url: str, self_intro: str):
     try:
         logger.info(f"案件への応募を開始: {url}")
         # 新しいタブで開いて、そのタブに切り替える
+        rate_limiter.site_limiter(url).acquire()
         driver.execute_script(f"window.open('{url}', '_blank');")
         driver.switch_to.window(driver.window_handles[-1])
         wait = WebDriverWait(driver, 20)
@@ -289,7 +303,10 @@ def apply_to_job(driver, url: str, self_intro: str):
                 By.XPATH, '//*[@id="job_offer_detail"]/div/div[1]/div[2]/div/p/a'
             )))
             apply_button.click()
-            time.sleep(3)
+            # 応募フォームが表示されるまで待機
+            wait_recorder.wait_until(
+                driver, page_waits.element_present(By.ID, 'amount_dummy_'), 20, "応募フォーム"
+            )
         except TimeoutException:
             return {
                 "status": "error",
@@ -354,7 +371,10 @@ def bulk_apply_process(urls: List[str]):
         except FileNotFoundError:
             raise ValueError(f"{SELF_INTRO_FILE}が見つかりません")
         
+        rate_limiter.configure(settings)
+        llm_usage.configure(settings)
         driver = setup_driver()
+        wait_recorder.records.clear()
         
         try:
             # ログイン
@@ -413,6 +433,7 @@ def bulk_apply_process(urls: List[str]):
                 "details": results["messages"]
             })
             progress_queue.put(current_progress.copy())
+            wait_recorder.log_summary()
             
         except Exception as e:
             logger.error(f"一括応募処理でエラーが発生: {str(e)}")
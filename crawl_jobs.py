@@ -0,0 +1,188 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# ジョブの状態
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_CANCELLING = 'cancelling'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING, STATUS_CANCELLING)
+
+# 保持する完了済みジョブの件数
+HISTORY_SIZE = 20
+
+class CrawlCancelled(Exception):
+    """クロールジョブがキャンセルされた"""
+
+class CrawlJob:
+    """1回分のクロール要求の状態"""
+
+    def __init__(self, source: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.status = STATUS_QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.triggers = 1         # このジョブに合流した要求の数
+        self.message = ''
+        self.error_type = None
+        self.result = {}          # 実行関数の戻り値（result_file, job_count など）
+        self.done = threading.Event()
+        self.cancel_requested = threading.Event()
+        # 実行中の処理を中断する関数（実行関数が設定する）
+        self.cancel_callback: Optional[Callable[[], None]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def check_cancelled(self):
+        """キャンセルが要求されていればCrawlCancelledを送出"""
+        if self.cancel_requested.is_set():
+            raise CrawlCancelled("クロールはキャンセルされました")
+
+    def as_dict(self) -> Dict:
+        elapsed = None
+        if self.started_at:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 1)
+        return {
+            'id': self.id,
+            'source': self.source,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed': elapsed,
+            'triggers': self.triggers,
+            'message': self.message,
+            'error_type': self.error_type,
+            'result': self.result
+        }
+
+class CrawlJobManager:
+    """
+    クロールをバックグラウンドのワーカースレッドで実行し、ジョブとして管理するクラス
+
+    ブラウザは1つのため同時に実行するクロールは1件のみとし、
+    実行中に届いた要求は新しいジョブを作らず実行中のジョブに合流させる。
+    """
+
+    def __init__(self, runner: Callable[[CrawlJob], Dict], history_size: int = HISTORY_SIZE):
+        """
+        Args:
+            runner: ジョブを受け取ってクロールを実行し、結果の辞書を返す関数
+                    （キャンセル時はCrawlCancelled、失敗時はその他の例外を送出）
+            history_size: 保持する完了済みジョブの件数
+        """
+        self.runner = runner
+        self.history_size = history_size
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, source: str = 'manual') -> Tuple[CrawlJob, bool]:
+        """
+        クロールを要求する
+
+        Returns:
+            (ジョブ, 新しく作成したか)  実行中のジョブに合流した場合はFalse
+        """
+        with self._lock:
+            current = self._active_job()
+            if current is not None:
+                current.triggers += 1
+                logger.info(f"実行中のクロールジョブに合流します: {current.id}（要求元: {source}）")
+                return current, False
+            job = CrawlJob(source)
+            self._jobs[job.id] = job
+            self._trim_history()
+        threading.Thread(target=self._work, args=(job,), name=f'crawl-job-{job.id}', daemon=True).start()
+        logger.info(f"クロールジョブを開始します: {job.id}（要求元: {source}）")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[CrawlJob]:
+        """最後に作成したジョブ"""
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def list_jobs(self) -> List[CrawlJob]:
+        """保持しているジョブ（新しい順）"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[CrawlJob]:
+        """
+        ジョブのキャンセルを要求する（完了済みのジョブは変更しない）
+
+        Returns:
+            対象のジョブ（存在しない場合はNone）
+        """
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return job
+        with self._lock:
+            job.cancel_requested.set()
+            if job.status == STATUS_RUNNING:
+                job.status = STATUS_CANCELLING
+            callback = job.cancel_callback
+        logger.info(f"クロールジョブのキャンセルを要求しました: {job.id}")
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"クロールの中断処理に失敗: {str(e)}")
+        return job
+
+    def _active_job(self) -> Optional[CrawlJob]:
+        for job in reversed(self._jobs.values()):
+            if job.active:
+                return job
+        return None
+
+    def _trim_history(self):
+        """完了済みのジョブを古い順に削除して件数を抑える"""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def _work(self, job: CrawlJob):
+        with self._lock:
+            job.started_at = time.time()
+            if not job.cancel_requested.is_set():
+                job.status = STATUS_RUNNING
+        try:
+            job.check_cancelled()
+            result = self.runner(job) or {}
+            job.result = result
+            job.message = result.get('message', 'クロールが完了しました')
+            job.status = STATUS_SUCCEEDED
+        except CrawlCancelled as e:
+            job.message = str(e)
+            job.status = STATUS_CANCELLED
+        except Exception as e:
+            if job.cancel_requested.is_set():
+                # 中断処理によってクローラーがエラー終了した場合
+                job.message = "クロールはキャンセルされました"
+                job.status = STATUS_CANCELLED
+            else:
+                logger.error(f"クロールジョブでエラーが発生: {job.id}: {str(e)}")
+                job.message = str(e)
+                job.error_type = type(e).__name__
+                job.status = STATUS_FAILED
+        finally:
+            job.finished_at = time.time()
+            job.cancel_callback = None
+            job.done.set()
+            logger.info(f"クロールジョブが終了しました: {job.id}（状態: {job.status}）")
@@ -0,0 +1,262 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List
+
+from loguru import logger
+
+# パイプライン設定の既定値（設定の crawl_pipeline で上書き可能）
+DEFAULT_PIPELINE_CONFIG = {
+    'enabled': True,
+    'page_queue_size': 2,     # フィルタリング待ちのページ数の上限
+    'detail_queue_size': 20,  # 詳細取得待ちの案件数の上限
+    'detail_batch_size': 4    # 詳細取得1回あたりの最大案件数
+}
+
+# キューの待機時に停止要求を確認する間隔（秒）
+POLL_INTERVAL = 0.2
+
+# ステージの終了を下流に伝える目印
+_DONE = object()
+
+def get_config(settings: Dict) -> Dict:
+    """設定からパイプラインの設定を取得"""
+    return {**DEFAULT_PIPELINE_CONFIG, **(settings.get('crawl_pipeline') or {})}
+
+class PipelineStopped(Exception):
+    """他のステージでエラーが発生したため処理を中断した"""
+
+class StageStats:
+    """ステージごとの処理件数と、処理・入力待ち・出力待ち（背圧）の時間"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0      # 処理に要した時間
+        self.starved = 0.0   # 上流からの入力を待った時間
+        self.blocked = 0.0   # 下流のキューが満杯で待った時間（背圧）
+
+    def as_dict(self) -> Dict:
+        return {
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': round(self.busy, 2),
+            'starved_seconds': round(self.starved, 2),
+            'blocked_seconds': round(self.blocked, 2),
+            'throughput': round(self.items_out / self.busy, 2) if self.busy > 0 else 0.0
+        }
+
+class CrawlPipeline:
+    """
+    一覧取得 → フィルタリング → 詳細取得 を上限付きキューでつないで並行に実行するパイプライン
+
+    一覧取得とフィルタリングは別スレッドで、詳細取得は呼び出し元のスレッドで実行する。
+    各ステージは入力の順序を保つため、最終結果は一覧に表示された順になる。
+    """
+
+    def __init__(self, pages: Iterator[List[Dict]], select: Callable[[List[Dict]], List[Dict]],
+                 filter_page: Callable[[List[Dict]], List[Dict]],
+                 fetch_details: Callable[[List[str]], List[Dict]], config: Dict = None,
+                 on_complete: Callable[[List[Dict]], None] = None):
+        """
+        Args:
+            pages: 一覧ページごとの案件リストを返すイテレータ
+            select: 1ページ分の案件から処理対象（新規・更新）の案件を選ぶ関数
+            filter_page: 処理対象の案件から条件に合う案件を選ぶ関数
+            fetch_details: URLのリストを受け取り、同じ順序の詳細情報リストを返す関数
+            config: get_config() の戻り値
+            on_complete: 詳細取得まで完了した案件を受け取る関数（結果を逐次保存する場合に使用）
+        """
+        self.pages = pages
+        self.select = select
+        self.filter_page = filter_page
+        self.fetch_details = fetch_details
+        self.config = config or dict(DEFAULT_PIPELINE_CONFIG)
+        self.on_complete = on_complete
+
+        self.page_queue = queue.Queue(maxsize=max(1, self.config['page_queue_size']))
+        self.detail_queue = queue.Queue(maxsize=max(1, self.config['detail_queue_size']))
+        self.stats = {name: StageStats(name) for name in ('scrape', 'filter', 'detail')}
+
+        # 結果（途中でエラーになった場合もそこまでの結果を保持する）
+        self.scraped_jobs = []   # 一覧から取得した全ての案件
+        self.unique_jobs = []    # 新規・更新の案件
+        self.filtered_jobs = []  # 条件に合い、詳細取得まで完了した案件
+        self.elapsed = 0.0
+
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, target: queue.Queue, item, stats: StageStats):
+        """下流のキューに追加（満杯の間は待機し、その時間を背圧として記録）"""
+        start_time = time.monotonic()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise PipelineStopped()
+                try:
+                    target.put(item, timeout=POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            stats.blocked += time.monotonic() - start_time
+
+    def _get(self, source: queue.Queue, stats: StageStats):
+        """上流のキューから取得（空の間は待機し、その時間を入力待ちとして記録）"""
+        start_time = time.monotonic()
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise PipelineStopped()
+                try:
+                    return source.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+        finally:
+            stats.starved += time.monotonic() - start_time
+
+    def _run_stage(self, name: str, body: Callable, downstream: queue.Queue):
+        """ステージを実行し、エラーの場合は全ステージを停止する"""
+        try:
+            body()
+        except PipelineStopped:
+            return
+        except BaseException as e:
+            logger.error(f"パイプラインの{name}ステージでエラーが発生: {str(e)}")
+            self._errors.append(e)
+            self._stop.set()
+            return
+        try:
+            self._put(downstream, _DONE, self.stats[name])
+        except PipelineStopped:
+            pass
+
+    def _scrape_stage(self):
+        stats = self.stats['scrape']
+        pages = iter(self.pages)
+        try:
+            while True:
+                if self._stop.is_set():
+                    raise PipelineStopped()
+                start_time = time.monotonic()
+                try:
+                    page_jobs = next(pages)
+                except StopIteration:
+                    stats.busy += time.monotonic() - start_time
+                    return
+                selected = self.select(page_jobs) if page_jobs else []
+                stats.busy += time.monotonic() - start_time
+                stats.items_in += len(page_jobs)
+                self.scraped_jobs.extend(page_jobs)
+                if selected:
+                    self.unique_jobs.extend(selected)
+                    stats.items_out += len(selected)
+                    self._put(self.page_queue, selected, stats)
+        finally:
+            # 途中で停止した場合も一覧取得の後処理（セッションのクローズ等）を行う
+            close = getattr(pages, 'close', None)
+            if close:
+                close()
+
+    def _filter_stage(self):
+        stats = self.stats['filter']
+        while True:
+            page_jobs = self._get(self.page_queue, stats)
+            if page_jobs is _DONE:
+                return
+            start_time = time.monotonic()
+            accepted = self.filter_page(page_jobs)
+            stats.busy += time.monotonic() - start_time
+            stats.items_in += len(page_jobs)
+            stats.items_out += len(accepted)
+            for job in accepted:
+                self._put(self.detail_queue, job, stats)
+
+    def _detail_stage(self):
+        stats = self.stats['detail']
+        batch_size = max(1, self.config['detail_batch_size'])
+        done = False
+        while not done:
+            batch = [self._get(self.detail_queue, stats)]
+            # 待たずに取得できる分はまとめて取得する
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self.detail_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _DONE in batch:
+                batch = [job for job in batch if job is not _DONE]
+                done = True
+            if not batch:
+                continue
+            start_time = time.monotonic()
+            details = self.fetch_details([job['url'] for job in batch])
+            for job, detail_data in zip(batch, details):
+                job.update(detail_data)
+            stats.busy += time.monotonic() - start_time
+            stats.items_in += len(batch)
+            stats.items_out += len(batch)
+            self.filtered_jobs.extend(batch)
+            if self.on_complete:
+                self.on_complete(batch)
+
+    def run(self) -> List[Dict]:
+        """
+        パイプラインを実行する
+
+        Returns:
+            条件に合い、詳細情報を付与した案件リスト（一覧に表示された順）
+
+        Raises:
+            いずれかのステージで発生した最初の例外
+        """
+        start_time = time.monotonic()
+        threads = [
+            threading.Thread(target=self._run_stage, args=('scrape', self._scrape_stage, self.page_queue),
+                             name='crawl-pipeline-scrape', daemon=True),
+            threading.Thread(target=self._run_stage, args=('filter', self._filter_stage, self.detail_queue),
+                             name='crawl-pipeline-filter', daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._detail_stage()
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.monotonic() - start_time
+            self.log_summary()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.filtered_jobs
+
+    def summary(self) -> Dict:
+        """ステージごとの統計と全体の所要時間"""
+        return {
+            'elapsed_seconds': round(self.elapsed, 2),
+            'stages': {name: stats.as_dict() for name, stats in self.stats.items()}
+        }
+
+    def log_summary(self):
+        """ステージごとの統計をログに出力"""
+        for name, stats in self.stats.items():
+            item = stats.as_dict()
+            logger.info(
+                f"パイプライン [{name}]: 入力 {item['items_in']}件, 出力 {item['items_out']}件, "
+                f"処理 {item['busy_seconds']:.1f}秒, 入力待ち {item['starved_seconds']:.1f}秒, "
+                f"出力待ち {item['blocked_seconds']:.1f}秒"
+            )
+        slowest = max(self.stats.values(), key=lambda stats: stats.busy)
+        total_busy = sum(stats.busy for stats in self.stats.values())
+        logger.info(
+            f"パイプライン全体: {self.elapsed:.1f}秒（各ステージの処理時間の合計 {total_busy:.1f}秒, "
+            f"最も遅いステージ: {slowest.name} {slowest.busy:.1f}秒）"
+        )
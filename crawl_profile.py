@@ -0,0 +1,122 @@
+import json
+from typing import Dict, List
+
+from loguru import logger
+
+# 読み込みを遮断するURLパターン（画像・動画・フォント・外部トラッカー）
+BLOCKED_URL_PATTERNS = [
+    # 画像
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp', '*.avif',
+    # 動画・音声
+    '*.mp4', '*.webm', '*.mov', '*.mp3', '*.m4a', '*.ogg',
+    # フォント
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # 外部トラッカー・広告
+    '*google-analytics.com*', '*googletagmanager.com*', '*googleadservices.com*',
+    '*doubleclick.net*', '*googlesyndication.com*', '*connect.facebook.net*',
+    '*analytics.twitter.com*', '*ads-twitter.com*', '*hotjar.com*', '*clarity.ms*',
+    '*criteo.*', '*nr-data.net*'
+]
+
+# クロール用プロファイル設定の既定値（設定の crawl_profile で上書き可能）
+DEFAULT_PROFILE = {
+    'block_resources': True,
+    'page_load_strategy': 'eager'
+}
+
+def get_profile(settings: Dict) -> Dict:
+    """設定からクロール用プロファイルを取得"""
+    return {**DEFAULT_PROFILE, **(settings.get('crawl_profile') or {})}
+
+def apply_options(chrome_options, profile: Dict):
+    """ChromeOptionsにクロール用の設定を追加"""
+    chrome_options.page_load_strategy = profile['page_load_strategy']
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-component-update")
+    chrome_options.add_argument("--disable-default-apps")
+    chrome_options.add_argument("--disable-sync")
+    if profile['block_resources']:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    # 転送量を集計するためにネットワークイベントのログを有効化
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+def enable_resource_blocking(driver, patterns: List[str] = BLOCKED_URL_PATTERNS):
+    """CDPで画像・フォント・トラッカーなどのリクエストを遮断"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        logger.info(f"リソースの遮断を有効化しました（{len(patterns)}パターン）")
+    except Exception as e:
+        logger.warning(f"リソースの遮断設定に失敗: {str(e)}")
+
+class TrafficReport:
+    """クロール中の転送量とページごとの読み込み時間を集計するクラス"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """集計をリセット"""
+        self.bytes_transferred = 0
+        self.requests = 0
+        self.blocked = 0
+        self.pages = []
+
+    def collect_network(self, driver):
+        """パフォーマンスログから転送量を集計（取得済みのログは破棄される）"""
+        try:
+            entries = driver.get_log('performance')
+        except Exception:
+            return
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            if method == 'Network.loadingFinished':
+                self.requests += 1
+                self.bytes_transferred += int(message['params'].get('encodedDataLength', 0))
+            elif method == 'Network.loadingFailed' and message['params'].get('blockedReason'):
+                self.blocked += 1
+
+    def record_page(self, driver, label: str):
+        """現在のページのナビゲーション時間を記録"""
+        try:
+            timing = driver.execute_script("""
+                const nav = performance.getEntriesByType('navigation')[0];
+                if (!nav) { return null; }
+                return {
+                    url: location.href,
+                    dom_content_loaded: nav.domContentLoadedEventEnd,
+                    load: nav.loadEventEnd
+                };
+            """)
+        except Exception:
+            timing = None
+        if timing:
+            timing['label'] = label
+            self.pages.append(timing)
+        self.collect_network(driver)
+
+    def summary(self) -> Dict:
+        """転送量とページ時間の集計"""
+        dom_times = [page['dom_content_loaded'] for page in self.pages if page.get('dom_content_loaded')]
+        return {
+            'pages': len(self.pages),
+            'requests': self.requests,
+            'blocked_requests': self.blocked,
+            'bytes_transferred': self.bytes_transferred,
+            'avg_dom_content_loaded_ms': round(sum(dom_times) / len(dom_times), 1) if dom_times else 0.0
+        }
+
+    def log_summary(self, driver=None):
+        """集計結果をログに出力"""
+        if driver is not None:
+            self.collect_network(driver)
+        summary = self.summary()
+        logger.info(
+            f"転送量: {summary['bytes_transferred'] / 1024:.1f}KB（{summary['requests']}リクエスト, "
+            f"遮断 {summary['blocked_requests']}件）, ページ数: {summary['pages']}, "
+            f"平均DOMContentLoaded: {summary['avg_dom_content_loaded_ms']:.0f}ms"
+        )
@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from loguru import logger
+
+import crawl_jobs
+import url_index
+
+# 定期クロール設定の既定値（設定の crawl_scheduler で上書き可能）
+DEFAULT_SCHEDULER_CONFIG = {
+    'enabled': False,
+    'initial_interval_minutes': 30,
+    'min_interval_minutes': 10,
+    'max_interval_minutes': 180,
+    'target_new_jobs': 5,        # 1回のクロールで取得したい新着案件数（到着ペースから間隔を決める）
+    'smoothing': 0.5,            # 到着ペースの指数移動平均の重み（新しい観測値の比率）
+    'backoff_factor': 2.0,       # 新着がない・エラーの場合に間隔を延ばす倍率
+    'quiet_hours': {'start': '01:00', 'end': '07:00'}  # この時間帯はクロールしない（Noneで無効）
+}
+
+# 保持する実行履歴の件数
+HISTORY_SIZE = 20
+
+# スケジューラーのジョブID
+SCHEDULER_JOB_ID = 'adaptive_crawl'
+
+def get_config(settings: Dict) -> Dict:
+    """設定から定期クロールの設定を取得"""
+    return {**DEFAULT_SCHEDULER_CONFIG, **(settings.get('crawl_scheduler') or {})}
+
+def _parse_clock(value: str) -> Optional[tuple]:
+    """'HH:MM' 形式の時刻を (時, 分) に変換（不正な値はNone）"""
+    try:
+        hour, minute = (int(part) for part in value.split(':'))
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour, minute
+
+def quiet_hours_end(moment: datetime, quiet_hours: Optional[Dict]) -> Optional[datetime]:
+    """
+    指定時刻が休止時間帯に含まれる場合、その休止時間帯が終わる時刻を返す
+
+    日付をまたぐ時間帯（例: 23:00〜06:00）にも対応する。
+    休止時間帯でない場合や設定がない場合はNone。
+    """
+    if not quiet_hours:
+        return None
+    start = _parse_clock(quiet_hours.get('start'))
+    end = _parse_clock(quiet_hours.get('end'))
+    if start is None or end is None or start == end:
+        return None
+    start_at = moment.replace(hour=start[0], minute=start[1], second=0, microsecond=0)
+    end_at = moment.replace(hour=end[0], minute=end[1], second=0, microsecond=0)
+    if start < end:
+        if start_at <= moment < end_at:
+            return end_at
+        return None
+    # 日付をまたぐ時間帯
+    if moment >= start_at:
+        return end_at + timedelta(days=1)
+    if moment < end_at:
+        return end_at
+    return None
+
+class AdaptiveCrawlScheduler:
+    """
+    新着案件の到着ペースに合わせてクロール間隔を調整する定期クロールのスケジューラー
+
+    クロールごとに新しく記録されたURL数から到着ペース（件/分）を推定し、
+    target_new_jobs 件がたまる頃に次のクロールを予約する。
+    新着がない場合やクロールが失敗した場合は間隔を延ばす。
+    """
+
+    def __init__(self, submit: Callable[[], crawl_jobs.CrawlJob], load_settings: Callable[[], Dict]):
+        """
+        Args:
+            submit: クロールジョブを開始（実行中の場合は合流）してジョブを返す関数
+            load_settings: 現在の設定を返す関数（実行のたびに読み直す）
+        """
+        self.submit = submit
+        self.load_settings = load_settings
+        self.scheduler = BackgroundScheduler(daemon=True)
+        self.interval_minutes = None
+        self.arrival_rate = None      # 推定した新着案件の到着ペース（件/分）
+        self.consecutive_errors = 0
+        self.next_run_at = None
+        self.last_crawl_at = None
+        self.last_known_count = None  # 前回の定期クロール完了時のURLインデックスの件数
+        self.running = False
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._lock = threading.Lock()
+
+    def start(self):
+        """スケジューラーを開始して最初のクロールを予約"""
+        config = get_config(self.load_settings())
+        self.interval_minutes = float(config['initial_interval_minutes'])
+        self.scheduler.start()
+        self._schedule_next(config, self.interval_minutes)
+        logger.info("定期クロールのスケジューラーを開始しました")
+
+    def shutdown(self):
+        """スケジューラーを停止（実行中のクロールは待たない）"""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+
+    def _schedule_next(self, config: Dict, minutes: float):
+        """指定した分数の後（休止時間帯の場合はその終了後）にクロールを予約"""
+        run_at = datetime.now() + timedelta(minutes=minutes)
+        quiet_end = quiet_hours_end(run_at, config.get('quiet_hours'))
+        if quiet_end is not None:
+            run_at = quiet_end
+        with self._lock:
+            self.next_run_at = run_at
+        self.scheduler.add_job(self._tick, 'date', run_date=run_at, id=SCHEDULER_JOB_ID,
+                               replace_existing=True, misfire_grace_time=None)
+        logger.info(f"次回の定期クロール: {run_at.strftime('%Y-%m-%d %H:%M')}")
+
+    def _tick(self):
+        """予約時刻に呼び出され、クロールを実行して次回を予約する"""
+        config = get_config(self.load_settings())
+        try:
+            if not config['enabled']:
+                # 設定で無効化された場合も、再び有効化されたときのために確認は続ける
+                return
+            if quiet_hours_end(datetime.now(), config.get('quiet_hours')) is not None:
+                return
+            self._run_crawl(config)
+        except Exception as e:
+            logger.error(f"定期クロールの実行中にエラーが発生: {str(e)}")
+        finally:
+            self._schedule_next(config, self.interval_minutes)
+
+    def _run_crawl(self, config: Dict):
+        """クロールを1回実行し、結果に応じて間隔を調整する"""
+        index = url_index.get_index()
+        # 手動のクロールで見つかった新着も到着ペースに含めるため、前回の定期クロールからの増分を数える
+        known_before = index.count() if self.last_known_count is None else self.last_known_count
+        started_at = time.time()
+        window_minutes = ((started_at - self.last_crawl_at) / 60 if self.last_crawl_at
+                          else self.interval_minutes)
+
+        with self._lock:
+            self.running = True
+        try:
+            job = self.submit()
+            job.done.wait()
+        finally:
+            with self._lock:
+                self.running = False
+
+        self.last_known_count = index.count()
+        new_urls = max(0, self.last_known_count - known_before)
+        succeeded = job.status == crawl_jobs.STATUS_SUCCEEDED
+        self.last_crawl_at = started_at
+        previous_interval = self.interval_minutes
+        self._adapt(config, succeeded, new_urls, window_minutes)
+
+        self.history.append({
+            'at': datetime.fromtimestamp(started_at).isoformat(),
+            'job_id': job.id,
+            'status': job.status,
+            'new_urls': new_urls,
+            'elapsed': round(time.time() - started_at, 1),
+            'previous_interval_minutes': round(previous_interval, 1),
+            'interval_minutes': round(self.interval_minutes, 1)
+        })
+        logger.info(
+            f"定期クロール完了: 状態 {job.status}, 新着 {new_urls}件, "
+            f"間隔 {previous_interval:.0f}分 → {self.interval_minutes:.0f}分"
+        )
+
+    def _adapt(self, config: Dict, succeeded: bool, new_urls: int, window_minutes: float):
+        """到着ペースの推定値を更新し、次回までの間隔を決める"""
+        min_interval = float(config['min_interval_minutes'])
+        max_interval = float(config['max_interval_minutes'])
+        backoff = max(1.0, float(config['backoff_factor']))
+
+        if not succeeded:
+            # サイトのエラーやログイン失敗が続く間は間隔を延ばす
+            self.consecutive_errors += 1
+            interval = self.interval_minutes * backoff
+        else:
+            self.consecutive_errors = 0
+            observed = new_urls / max(window_minutes, 1.0)
+            smoothing = min(1.0, max(0.0, float(config['smoothing'])))
+            if self.arrival_rate is None:
+                self.arrival_rate = observed
+            else:
+                self.arrival_rate = smoothing * observed + (1 - smoothing) * self.arrival_rate
+            if new_urls == 0 or self.arrival_rate <= 0:
+                # 一覧に変化がない場合は間隔を延ばす
+                interval = self.interval_minutes * backoff
+            else:
+                interval = float(config['target_new_jobs']) / self.arrival_rate
+        self.interval_minutes = min(max_interval, max(min_interval, interval))
+
+    def status(self) -> Dict:
+        """スケジューラーの状態"""
+        config = get_config(self.load_settings())
+        with self._lock:
+            next_run_at = self.next_run_at
+            running = self.running
+        return {
+            'enabled': config['enabled'],
+            'running': running,
+            'in_quiet_hours': quiet_hours_end(datetime.now(), config.get('quiet_hours')) is not None,
+            'quiet_hours': config.get('quiet_hours'),
+            'next_run_at': next_run_at.isoformat() if next_run_at and config['enabled'] else None,
+            'interval_minutes': round(self.interval_minutes, 1) if self.interval_minutes else None,
+            'arrival_rate_per_hour': round(self.arrival_rate * 60, 2) if self.arrival_rate is not None else None,
+            'consecutive_errors': self.consecutive_errors,
+            'history': list(self.history)
+        }
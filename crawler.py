@@ -1,14 +1,12 @@
 import os
 import json
 from datetime import datetime, timedelta
-from pathlib import Path
 import time  # timeモジュールをインポート
-from typing import Dict, List
+from typing import Dict, Iterator, List
 import random
 import sys
+import threading
 
-import pandas as pd
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from loguru import logger
 from selenium import webdriver
@@ -27,6 +25,31 @@ from tkinter import messagebox
 # 自作のChromeDriver管理モジュールをインポート
 import chromedriver_manager
 
+# LLMフィルタリングエンジンと判定キャッシュ
+import llm_filter
+import llm_cache
+
+# LLMに問い合わせる前のルールフィルタ
+import rule_filter
+import relevance_ranker
+import verdict_classifier
+
+# 案件情報の抽出とHTTPでの一覧取得
+import job_extractor
+import listing_fetcher
+import detail_fetcher
+import session_store
+import page_waits
+import crawl_profile
+import high_water_mark
+import url_index
+import crawl_pipeline
+import rate_limiter
+import llm_usage
+import run_journal
+import job_store
+from crawl_jobs import CrawlCancelled
+
 # 設定ファイルパス用に修正モジュールをインポート
 from fix_settings_patch import get_app_paths, get_data_dir_from_env
 
@@ -145,86 +168,137 @@ def filter_jobs_by_gpt(jobs, config):
     settings = load_settings()
     
     # モデルに応じてクライアントを選択
-    if config['model'] == 'deepseek-chat':
-        client = OpenAI(
-            api_key=settings.get('deepseek_api_key', ''),
-            base_url="https://api.deepseek.com"
-        )
-    else:
-        client = OpenAI(
-            api_key=settings.get('api_key', '')
-        )
+    client = llm_filter.create_client(config['model'], settings)
+    max_workers = llm_filter.get_max_workers(config['model'], settings)
+    batch_options = llm_filter.get_batch_options(settings)
     
     filtered_jobs = []
     total_jobs = len(jobs)
     
     logger.info(f"LLMフィルタリングを開始します。対象案件数: {total_jobs}")
-    logger.info(f"使用モデル: {config['model']}")
+    logger.info(f"使用モデル: {config['model']}（同時実行数: {max_workers}, バッチサイズ: {batch_options['batch_size']}）")
     logger.info(f"フィルター条件: {config['prompt']}")
     
-    for i, job in enumerate(jobs, 1):
-        logger.info(f"\n案件 {i}/{total_jobs} を処理中...")
-        logger.info(f"タイトル: {job['title']}")
-        logger.info(f"予算: {job['budget']}")
+    # 過去の判定から学習した分類器で確信度の高い案件を先に判定し、残りのみLLMに送る
+    classifier = verdict_classifier.get_classifier(settings, config.get('prompt', ''))
+    classifier_config = verdict_classifier.get_config(settings)
+    local_decisions, llm_jobs, audited_ids = {}, jobs, set()
+    if classifier is not None:
+        local_decisions, llm_jobs, audited_ids = classifier.split(jobs, classifier_config)
+        logger.info(
+            f"判定の分類器: ローカルで判定 {len(local_decisions)}件, LLM判定 {len(llm_jobs) - len(audited_ids)}件, "
+            f"一致率の確認用にLLMへ送る案件 {len(audited_ids)}件"
+        )
+    
+    cache = llm_cache.get_cache(settings)
+    retry_config = llm_filter.get_retry_config(settings)
+    engine = llm_filter.LLMFilterEngine(client, config, max_workers=max_workers, cache=cache,
+                                        retry_config=retry_config, **batch_options)
+    try:
+        # 失敗した案件は再試行・後回しの再審査を行い、失敗率が許容値を超えた場合のみ中断する
+        results = engine.run(llm_jobs, fail_fast=False, max_error_rate=retry_config['max_error_rate']) if llm_jobs else []
+    except llm_filter.LLMCallError as e:
+        logger.error(f"Error in LLM filtering for job {e.job['title'] if e.job else 'N/A'}: {e}")
+        logger.error(f"完全なエラー内容: {str(e)}")
+        raise FilteringError(f"LLMフィルタリング処理中にエラーが発生しました: {e}")
+    llm_results = {id(job): result for job, result in zip(llm_jobs, results)}
+    
+    if classifier is not None:
+        verdict_classifier.record_outcome(jobs, local_decisions, audited_ids, llm_results)
+    
+    # 入力と同じ順序で判定結果を反映（一致率の確認用にLLMでも判定した案件はLLMの判定を優先する）
+    for job in jobs:
+        result = llm_results.get(id(job))
+        job['decided_by'] = verdict_classifier.STAGE_LLM
+        if result is None:
+            decision, probability = local_decisions[id(job)]
+            result = {'decision': decision, 'reason': f"ローカル分類器: 採用の確率 {probability:.2f}"}
+            job['decided_by'] = verdict_classifier.STAGE_CLASSIFIER
+        logger.info(f"LLMの判断: {result}")
         
-        # LLMに送信するメッセージを作成
-        messages = [
-            {"role": "system", "content": """あなたは案件の審査員です。与えられた条件に基づいて、案件を評価してください。
-レスポンスは以下のJSON形式で返してください：
-{
-    "decision": "yes" or "no",
-    "reason": "判断理由を1文で"
-}"""},
-            {"role": "user", "content": f"""
-以下の案件が条件を満たすか判断してください。条件: {config['prompt']}
-
-案件情報:
-タイトル: {job['title']}
-予算: {job['budget']}
-クライアント: {job['client']}
-            """}
-        ]
-
-        try:
-            # LLMに問い合わせ（設定を使用）
-            response = client.chat.completions.create(
-                model=config['model'],
-                messages=messages,
-                temperature=config['temperature'],
-                max_tokens=100,
-                response_format={"type": "json_object"}
-            )
-            
-            # レスポンスを取得してJSONとしてパース
-            result = json.loads(response.choices[0].message.content)
-            logger.info(f"LLMの判断: {result}")
-            
-            # 'yes'の場合のみ案件を追加
-            if result.get('decision', '').lower() == 'yes':
-                # 判断理由を案件情報に追加
-                job['gpt_reason'] = result.get('reason', '')
-                filtered_jobs.append(job)
-                logger.info(f"✓ 案件が条件に適合: {job['title']}")
-                logger.info(f"理由: {result.get('reason', '')}")
-            else:
-                logger.info(f"✗ 案件が条件に不適合: {job['title']}")
-                logger.info(f"理由: {result.get('reason', '')}")
-                
-        except Exception as e:
-            logger.error(f"Error in LLM filtering for job {job['title']}: {e}")
-            logger.error(f"完全なエラー内容: {str(e)}")
-            # エラーの場合は安全のため、その案件を含める -> 変更: FilteringErrorを送出
-            # filtered_jobs.append(job)
-            raise FilteringError(f"LLMフィルタリング処理中にエラーが発生しました: {e}")
+        if result['decision'] == 'error':
+            job['decided_by'] = verdict_classifier.STAGE_ERROR
+            # 再試行しても判定できなかった案件は安全のため含める
+            job['gpt_reason'] = "判定エラー（安全のため含める）"
+            filtered_jobs.append(job)
+            logger.warning(f"? 案件を判定できませんでした: {job['title']}")
+            continue
+        
+        # 'yes'の場合のみ案件を追加
+        if result['decision'] == 'yes':
+            # 判断理由を案件情報に追加
+            job['gpt_reason'] = result['reason']
+            filtered_jobs.append(job)
+            logger.info(f"✓ 案件が条件に適合: {job['title']}")
+        else:
+            logger.info(f"✗ 案件が条件に不適合: {job['title']}")
+        logger.info(f"理由: {result['reason']}")
     
+    if cache is not None:
+        logger.info(f"LLM判定キャッシュの状態: {cache.stats()}")
     logger.info(f"\nLLMフィルタリング完了。{len(filtered_jobs)}/{total_jobs} 件が条件に適合")
     return filtered_jobs
 
+# ルールによる事前判定とGPTフィルタリング
+def filter_jobs_with_rules(jobs, config):
+    """
+    設定のfilter_rulesで判定できる案件はローカルで採否を決め、
+    判定できない案件のみGPTフィルタリングに回す
+    """
+    settings = load_settings()
+    rules = rule_filter.RuleFilter.from_settings(settings)
+    decisions, stats = rules.split(jobs)
+    
+    ambiguous_jobs = [job for job, (decision, _) in zip(jobs, decisions) if decision is None]
+    
+    # フィルタ条件・チェック済み案件との類似度が低い案件はLLMに送らずに除外する
+    llm_jobs = ambiguous_jobs
+    ranker = relevance_ranker.RelevanceRanker.from_settings(settings, config.get('prompt', ''))
+    if ranker is not None and ambiguous_jobs:
+        llm_jobs, locally_rejected, audited_ids, ranking_stats = ranker.split(ambiguous_jobs)
+        logger.info(
+            f"事前ランキング: LLM判定 {ranking_stats['kept']}件, ローカルで除外 {ranking_stats['rejected']}件, "
+            f"再現率の確認用にLLMへ送る除外案件 {ranking_stats['audited']}件"
+        )
+    
+    llm_accepted = filter_jobs_by_gpt(llm_jobs, config) if llm_jobs else []
+    llm_accepted_ids = {id(job) for job in llm_accepted}
+    if ranker is not None and ambiguous_jobs:
+        ranker.record_outcome(llm_jobs, llm_accepted, audited_ids, len(locally_rejected))
+    
+    # 元の順序を保ったまま結果をまとめる
+    llm_job_ids = {id(job) for job in llm_jobs}
+    filtered_jobs = []
+    for job, (decision, reason) in zip(jobs, decisions):
+        if decision is not None:
+            job['decided_by'] = verdict_classifier.STAGE_RULE
+        elif id(job) not in llm_job_ids:
+            job['decided_by'] = verdict_classifier.STAGE_RANKER
+        if decision == rule_filter.ACCEPT:
+            job['gpt_reason'] = reason
+            filtered_jobs.append(job)
+        elif decision is None and id(job) in llm_accepted_ids:
+            filtered_jobs.append(job)
+    # 判定したステージを記録し、分類器の学習にはLLMの判定のみを使う
+    verdict_classifier.record_verdicts(jobs, filtered_jobs, config.get('prompt', ''))
+    
+    # 削減できたLLM呼び出し数（バッチ分割を考慮した概算）
+    batch_options = llm_filter.get_batch_options(settings)
+    saved_calls = (
+        len(llm_filter.split_batches(jobs, batch_options['batch_size'], batch_options['batch_token_budget']))
+        - len(llm_filter.split_batches(llm_jobs, batch_options['batch_size'], batch_options['batch_token_budget']))
+    )
+    logger.info(
+        f"ルールフィルタ: 採用 {stats['accepted']}件, 不採用 {stats['rejected']}件, "
+        f"LLM判定 {len(llm_jobs)}件（LLM判定を省略: {len(jobs) - len(llm_jobs)}件, "
+        f"削減したLLM呼び出し: {saved_calls}回）"
+    )
+    return filtered_jobs
+
 def save_filtered_jobs(jobs, base_filename):
-    """フィルタリング済みの案件をJSONファイルに保存"""
-    filtered_filename = base_filename.replace('.json', '_filtered.json')
-    with open(filtered_filename, 'w', encoding='utf-8') as f:
-        json.dump(jobs, f, ensure_ascii=False, indent=2)
+    """フィルタリング済みの案件をファイルに保存（既存の内容は置き換える）"""
+    filtered_filename = job_store.filtered_path(base_filename)
+    job_store.write_records(filtered_filename, jobs, job_store.get_config(load_settings()))
     print(f"フィルタリング済み案件を保存: {filtered_filename}")
     return filtered_filename
 
@@ -237,36 +311,115 @@ def process_crawled_data(jobs, crawler=None):
     
     # 現在時刻を取得してファイル名を生成
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    base_filename = str(save_dir / f'jobs_{timestamp}.json')
+    base_filename = str(save_dir / f'jobs_{timestamp}{job_store.JSONL_SUFFIX}')
     
     # 生のデータを保存
-    with open(base_filename, 'w', encoding='utf-8') as f:
-        json.dump(jobs, f, ensure_ascii=False, indent=2)
+    job_store.write_records(base_filename, jobs, job_store.get_config(load_settings()))
     print(f"生データを保存: {base_filename}")
     
+    # 中断した場合に再開できるよう、進捗をジャーナルに記録する
+    journal = run_journal.RunJournal.create(base_filename)
+    journal.record_page(jobs, jobs)
+    
     # GPTフィルタリングを実行
     config = load_config()
     try:
-        filtered_jobs = filter_jobs_by_gpt(jobs, config)
+        filtered_jobs = filter_jobs_with_rules(jobs, config)
     except FilteringError as e:
         logger.error(f"フィルタリング処理でエラー: {e}")
+        logger.info(f"再開するには --resume {journal.run_id} を指定して実行してください")
         raise  # FilteringErrorを再度送出してメイン処理に伝える
+    journal.record_verdicts(jobs, filtered_jobs)
     
     # フィルタリング済み案件の詳細情報を取得
     if crawler and filtered_jobs:
         print(f"フィルタリング済み案件の詳細情報を取得中...")
-        for job in filtered_jobs:
-            detail_data = crawler.scrape_job_detail(job['url'])
+        urls = [job['url'] for job in filtered_jobs]
+        details = crawler.scrape_job_details(urls)
+        journal.record_details(urls, details)
+        for job, detail_data in zip(filtered_jobs, details):
             job.update(detail_data)
     
     # フィルタリング済みデータを保存
-    filtered_filename = base_filename.replace('.json', '_filtered.json')
-    with open(filtered_filename, 'w', encoding='utf-8') as f:
-        json.dump(filtered_jobs, f, ensure_ascii=False, indent=2)
-    print(f"フィルタリング済みデータを保存: {filtered_filename}")
+    filtered_filename = save_filtered_jobs(filtered_jobs, base_filename)
+    journal.complete(filtered_filename)
     
     return base_filename, filtered_filename
 
+def process_crawled_pages(crawler, pipeline_config):
+    """
+    一覧取得・重複チェック・GPTフィルタリング・詳細取得をパイプラインで並行して実行し、結果を保存
+
+    新規・更新の案件は一覧ページごとに生データへ、詳細取得まで完了した案件は
+    フィルタリング済みデータへ、それぞれ完了した順にJSONLで追記する。
+
+    Returns:
+        (一覧から取得した全ての案件, 生データのファイル名, フィルタリング済みデータのファイル名)
+        新規・更新の案件がない場合、ファイル名はNone
+    """
+    save_dir = data_dir / 'crawled_data'
+    os.makedirs(save_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base_filename = str(save_dir / f'jobs_{timestamp}{job_store.JSONL_SUFFIX}')
+    filtered_filename = job_store.filtered_path(base_filename)
+    
+    config = load_config()
+    store_config = job_store.get_config(load_settings())
+    raw_writer = job_store.JsonlWriter(base_filename, store_config)
+    filtered_writer = job_store.JsonlWriter(filtered_filename, store_config)
+    # 各ステージの結果を完了した順にジャーナルへ記録し、中断しても残りの処理だけで再開できるようにする
+    journal = run_journal.RunJournal.create(base_filename)
+    
+    def select(page_jobs):
+        selected = crawler.check_duplicates(page_jobs)
+        raw_writer.extend(selected)
+        journal.record_page(page_jobs, selected)
+        return selected
+    
+    def filter_page(jobs):
+        accepted = filter_jobs_with_rules(jobs, config)
+        journal.record_verdicts(jobs, accepted)
+        return accepted
+    
+    def fetch_details(urls):
+        details = crawler.scrape_job_details(urls)
+        journal.record_details(urls, details)
+        return details
+    
+    pipeline = crawl_pipeline.CrawlPipeline(
+        pages=crawler.iter_job_pages(),
+        select=select,
+        filter_page=filter_page,
+        fetch_details=fetch_details,
+        config=pipeline_config,
+        on_complete=filtered_writer.extend
+    )
+    try:
+        filtered_jobs = pipeline.run()
+    except Exception:
+        logger.info(f"再開するには --resume {journal.run_id} を指定して実行してください")
+        raise
+    finally:
+        # フィルタリングでエラーになった場合も、それまでに追記した内容はファイルに残る
+        raw_writer.close()
+        filtered_writer.close()
+        if pipeline.unique_jobs:
+            print(f"生データを保存: {base_filename}（{raw_writer.count}件）")
+        else:
+            # 新規・更新の案件がない場合は空のファイルを残さない
+            for path in (base_filename, filtered_filename):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    if not pipeline.unique_jobs:
+        journal.complete(None)
+        return pipeline.scraped_jobs, None, None
+    
+    print(f"フィルタリング済み案件を保存: {filtered_filename}（{len(filtered_jobs)}件）")
+    journal.complete(filtered_filename)
+    
+    return pipeline.scraped_jobs, base_filename, filtered_filename
+
 class CrowdWorksCrawler:
     def __init__(self, email: str, password: str):
         """
@@ -284,6 +437,15 @@ class CrowdWorksCrawler:
         self.driver = None
         self.wait = None
         self.logger = logger  # loggerをインスタンス変数として設定
+        self.detail_fetch_records = []  # 詳細ページごとの取得時間と失敗の記録
+        self.driver_lock = threading.RLock()  # 一覧と詳細の取得を並行して行う場合のブラウザ操作の排他
+        self.logged_in = False
+        self.pages_loaded = 0  # ブラウザで読み込んだページ数（デーモンでのリサイクル判定に使用）
+        self.waits = page_waits.WaitRecorder()  # 条件待機ごとの実際の待機時間
+        self.traffic = crawl_profile.TrafficReport()  # 転送量とページごとの読み込み時間
+        # ブラウザ内での案件抽出の照合結果（None: 未照合, True: 一致, False: 不一致のためHTML解析を使用）
+        self.script_extraction_verified = None
+        self.cancel_event = threading.Event()  # クロールジョブのキャンセル要求
         self.setup_driver()
 
     def setup_driver(self):
@@ -307,6 +469,10 @@ class CrowdWorksCrawler:
         }
         chrome_options.add_experimental_option("prefs", prefs)
         
+        # DOMのテキストのみを読むため、eager読み込みと不要なバックグラウンド通信の無効化を行う
+        profile = crawl_profile.get_profile(load_settings())
+        crawl_profile.apply_options(chrome_options, profile)
+        
         try:
             # ChromeDriver自動管理モジュールを使用してドライバーパスを取得
             driver_path = chromedriver_manager.setup_driver()
@@ -333,31 +499,58 @@ class CrowdWorksCrawler:
                 """
             })
             
+            # 画像・フォント・外部トラッカーの読み込みを遮断
+            if profile['block_resources']:
+                crawl_profile.enable_resource_blocking(self.driver)
+            
             self.wait = WebDriverWait(self.driver, 20)  # 待機時間を20秒に延長
             logger.info("ChromeDriverの設定が完了しました")
         except Exception as e:
             logger.error(f"ChromeDriverの設定に失敗: {str(e)}")
             raise
 
-    def wait_for_page_load(self):
-        """ページの完全な読み込みを待機"""
+    def wait_for_page_load(self, ready_selector: str = None, timeout: float = 20, label: str = "ページ読み込み"):
+        """
+        ページの完全な読み込みを待機
+
+        Args:
+            ready_selector: 指定した場合、このCSSセレクタの要素が描画されるまで待機
+            timeout: タイムアウト（秒）
+            label: 待機時間の記録名
+
+        Returns:
+            タイムアウトまでに読み込みが完了した場合はTrue
+        """
         try:
-            self.wait.until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            time.sleep(2)  # sleepをtime.sleepに修正
+            if not self.waits.wait_until(self.driver, page_waits.document_ready, timeout, label):
+                return False
+            ready = True
+            if ready_selector:
+                ready = self.waits.wait_until(
+                    self.driver, page_waits.element_present(By.CSS_SELECTOR, ready_selector), timeout, label
+                )
+            self.traffic.record_page(self.driver, label)
+            return ready
         except Exception as e:
             logger.error(f"ページの読み込み待機に失敗: {str(e)}")
+            return False
 
     def login(self) -> bool:
         """クラウドワークスにログイン"""
+        # 保存済みのセッションが有効であればフォームからのログインを省略
+        if self.email and session_store.restore_session(self.driver, self.email, 'crawler'):
+            self.logged_in = True
+            return True
+        
         try:
             logger.info("ログイン処理を開始")
+            rate_limiter.site_limiter(self.login_url).acquire()
             self.driver.get(self.login_url)
+            self.pages_loaded += 1
             logger.info(f"現在のURL: {self.driver.current_url}")
             
-            # ページの完全な読み込みを待機
-            self.wait_for_page_load()
+            # ログインフォームが描画されるまで待機
+            self.wait_for_page_load('input[name="username"]', label="ログインフォーム")
             
             try:
                 # メールアドレスとパスワードを入力
@@ -402,14 +595,12 @@ class CrowdWorksCrawler:
                     arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
                     arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
                 """, form_elements['email'], self.email)
-                time.sleep(1)  # sleepをtime.sleepに修正
                 
                 self.driver.execute_script("""
                     arguments[0].value = arguments[1];
                     arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
                     arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
                 """, form_elements['password'], self.password)
-                time.sleep(1)  # sleepをtime.sleepに修正
 
                 if not submit_found:
                     logger.error("ログインボタンが見つかりません。フォームを直接送信します")
@@ -424,7 +615,8 @@ class CrowdWorksCrawler:
                         arguments[0].dispatchEvent(new Event('click', { bubbles: true }));
                     """, form_elements['submit'])
                 
-                time.sleep(5)  # sleepをtime.sleepに修正
+                # ログインページから遷移するか、エラーメッセージが表示されるまで待機
+                self.waits.wait_until(self.driver, page_waits.login_settled(), 15, "ログイン後の遷移")
 
                 # ログイン成功の確認（URLが変わったことを確認）
                 current_url = self.driver.current_url
@@ -443,6 +635,9 @@ class CrowdWorksCrawler:
                 
                 if "/login" not in current_url:
                     logger.info("ログイン成功")
+                    self.logged_in = True
+                    session_store.save_cookies(self.driver, self.email)
+                    session_store.record_event('crawler', 'fresh_login')
                     return True
                 else:
                     logger.error("ログイン失敗: ログインページから移動できません")
@@ -488,182 +683,204 @@ class CrowdWorksCrawler:
             self.logger.error(f"ページソースの保存に失敗: {str(e)}")
 
     def scrape_job_detail(self, url: str) -> Dict:
-        """個別の仕事詳細ページから情報を取得"""
-        try:
-            self.logger.info(f"仕事詳細の取得を開始: {url}")
-            self.driver.get(url)
-            time.sleep(3)  # ページの読み込みを待つ
-            
-            # ページのHTMLを取得してBeautifulSoupで解析
-            html = self.driver.page_source
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # 仕事詳細テーブルを取得
-            detail_table = soup.find('table', class_='job_offer_detail_table')
-            if detail_table:
-                # 改行を保持したまま取得
-                # 1. 不要な空白行を削除
-                # 2. 意味のある改行は保持
-                lines = []
-                for text in detail_table.stripped_strings:
-                    lines.append(text)
-                detail_text = '\n'.join(lines)
-                
-                return {
-                    "detail_description": detail_text,
-                    "crawled_detail_at": datetime.now().isoformat()
-                }
-            else:
-                self.logger.warning(f"仕事詳細が見つかりませんでした: {url}")
-                return {}
-                
-        except Exception as e:
-            self.logger.error(f"仕事詳細の取得中にエラーが発生: {str(e)}")
-            return {}
+        """個別の仕事詳細ページから情報を取得（一覧を表示中のタブは移動しない）"""
+        return self.scrape_job_details([url])[0]
+
+    def check_cancelled(self):
+        """キャンセルが要求されていればCrawlCancelledを送出（ページ・詳細取得の区切りごとに確認）"""
+        if self.cancel_event.is_set():
+            raise CrawlCancelled("クロールはキャンセルされました")
+
+    def scrape_job_details(self, urls: List[str]) -> List[Dict]:
+        """
+        複数の仕事詳細ページを複数タブで並行して取得（入力と同じ順序で返す）
+
+        detail_concurrency が1以下の場合も別のタブを1つずつ開いて取得する。
+        パイプライン実行中は一覧のページ送りと交互に呼び出されるため、
+        一覧を表示中のタブで詳細ページに移動すると次のページが見つからず巡回が途切れる。
+        """
+        self.check_cancelled()
+        settings = load_settings()
+        concurrency = max(1, int(settings.get('detail_concurrency', detail_fetcher.DEFAULT_CONCURRENCY)))
+        with self.driver_lock:
+            fetcher = detail_fetcher.DetailFetcher(self.driver, concurrency=concurrency, traffic=self.traffic)
+            details = fetcher.fetch_all(urls)
+        self.pages_loaded += len(urls)
+        self.detail_fetch_records.extend(fetcher.records)
+        return details
 
     def scrape_jobs(self):
+        """設定された取得方式で案件一覧を取得する（HTTP取得に失敗した場合はSeleniumで取得）"""
+        return [job for page_jobs in self.iter_job_pages() for job in page_jobs]
+
+    def iter_job_pages(self) -> Iterator[List[Dict]]:
+        """
+        設定された取得方式で案件一覧をページごとに取得する（HTTP取得に失敗した場合はSeleniumで取得）
+
+        Yields:
+            1ページ分の案件情報リスト
+        """
+        # 設定から最大取得件数と取得方式を取得
+        settings = load_settings()
+        max_items = settings.get('max_items', 20)  # デフォルトは20件
+        backend = settings.get('listing_fetch_backend', 'http')
+        
+        # 差分クロール: 新着順の一覧で取得済みの位置に達したらページ送りを止める
+        incremental = high_water_mark.get_config(settings)
+        index = url_index.get_index()
+        has_history = incremental['enabled'] and index.count() > 0
+        newest_posted_date = index.newest_posted_date() if has_history else None
+        
+        def new_mark():
+            if not has_history:
+                return None
+            return high_water_mark.HighWaterMark(index, newest_posted_date, incremental['stop_after_known'])
+        
+        if backend == 'http':
+            fetcher = listing_fetcher.ListingFetcher(self.search_url)
+            total = 0
+            pages = 0
+            try:
+                self.logger.info("案件情報の取得を開始（HTTP）")
+                # ログイン済みのブラウザのCookieを引き継ぐ
+                if self.driver:
+                    with self.driver_lock:
+                        fetcher.load_cookies_from_driver(self.driver)
+                mark = new_mark()
+                for page_jobs in fetcher.iter_pages(max_items, stop_when=mark.should_stop if mark else None):
+                    self.check_cancelled()
+                    total += len(page_jobs)
+                    pages += 1
+                    yield page_jobs
+                if pages:
+                    self.logger.info(f"合計{total}件の案件を取得しました（{pages}ページ分）")
+                    return
+                self.logger.warning("HTTPでの案件取得に失敗したため、Seleniumで取得します")
+            except Exception as e:
+                if pages or isinstance(e, CrawlCancelled):
+                    raise
+                self.logger.warning(f"HTTPでの案件取得中にエラーが発生したため、Seleniumで取得します: {str(e)}")
+            finally:
+                fetcher.close()
+        
+        mark = new_mark()
+        for page_jobs in self.iter_job_pages_with_driver(max_items, stop_when=mark.should_stop if mark else None):
+            self.check_cancelled()
+            yield page_jobs
+
+    def extract_page_jobs(self) -> List[Dict]:
+        """
+        表示中の一覧ページから案件情報を抽出する
+
+        設定の card_extraction が 'script'（既定）の場合はブラウザ内で抽出し、
+        失敗した場合や初回の照合でHTML解析の結果と一致しない場合はHTML解析に切り替える。
+        """
+        settings = load_settings()
+        if settings.get('card_extraction', 'script') == 'script' and self.script_extraction_verified is not False:
+            try:
+                jobs = job_extractor.extract_job_cards_in_browser(self.driver)
+                if jobs and self.script_extraction_verified:
+                    return jobs
+                if jobs:
+                    # 初回のみHTML解析の結果と照合する（設定のバックエンドではなく基準のhtml.parserと比べる）
+                    soup_jobs = job_extractor.extract_job_cards(
+                        self.driver.page_source, job_extractor.BACKEND_HTML_PARSER
+                    )
+                    self.script_extraction_verified = job_extractor.same_jobs(jobs, soup_jobs)
+                    if self.script_extraction_verified:
+                        self.logger.info("ブラウザ内での案件抽出をHTML解析の結果と照合しました")
+                        return jobs
+                    self.logger.warning("ブラウザ内での抽出結果がHTML解析と一致しないため、HTML解析に切り替えます")
+                    return soup_jobs
+            except Exception as e:
+                self.logger.warning(f"ブラウザ内での案件抽出に失敗したため、HTML解析で抽出します: {str(e)}")
+
+        # ページのHTMLから案件情報を抽出
+        return job_extractor.extract_job_cards(self.driver.page_source)
+
+    def scrape_jobs_with_driver(self, max_items: int, stop_when=None):
+        """
+        Seleniumで案件一覧ページを巡回して案件情報を取得
+
+        Args:
+            max_items: 最大取得件数
+            stop_when: ページごとの案件リストを受け取り、Trueを返した場合にページ送りを止める関数
+        """
+        return [job for page_jobs in self.iter_job_pages_with_driver(max_items, stop_when) for job in page_jobs]
+
+    def iter_job_pages_with_driver(self, max_items: int, stop_when=None) -> Iterator[List[Dict]]:
+        """
+        Seleniumで案件一覧ページを巡回し、ページごとに案件情報を返す
+
+        ブラウザの操作中は driver_lock を保持する（詳細ページの取得と並行して呼び出されるため）。
+        """
         try:
-            self.logger.info("案件情報の取得を開始")
-            self.driver.get(self.search_url)
-            time.sleep(5)  # ページの読み込みを待つ
+            with self.driver_lock:
+                self.logger.info("案件情報の取得を開始")
+                rate_limiter.site_limiter(self.search_url).acquire()
+                self.driver.get(self.search_url)
+                self.pages_loaded += 1
+                # 案件カードが描画されるまで待機
+                self.wait_for_page_load(job_extractor.JOB_CARD_SELECTOR, timeout=15, label="案件一覧")
             
-            # 設定から最大取得件数を取得
-            settings = load_settings()
-            max_items = settings.get('max_items', 20)  # デフォルトは20件
-            jobs_data = []
+            total = 0
             current_page = 1
             
-            while len(jobs_data) < max_items:
-                # ページのHTMLを取得してBeautifulSoupで解析
-                html = self.driver.page_source
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # 案件要素を取得
-                job_elements = soup.find_all('div', class_='UNzN7')
+            while total < max_items:
+                # ページから案件情報を抽出
+                with self.driver_lock:
+                    page_jobs = self.extract_page_jobs()
 
                 # 最初のページで案件要素が見つからない場合、エラーとする
-                if current_page == 1 and not job_elements:
+                if current_page == 1 and not page_jobs:
                     logger.error("案件リストの要素が見つかりません。サイト構造が変更された可能性があります。")
-                    self.save_page_source("scrape_error_page.html")
+                    with self.driver_lock:
+                        self.save_page_source("scrape_error_page.html")
                     raise ScrapingError("案件リストの取得に失敗しました。サイト構造の変更の可能性があります。")
                 
-                for job_element in job_elements:
-                    if len(jobs_data) >= max_items:
-                        break
-                        
-                    try:
-                        # タイトルとURL
-                        title_element = job_element.find('h3', class_='iCeus').find('a')
-                        title = title_element.text.strip()
-                        url = f"https://crowdworks.jp{title_element['href']}"
-                        
-                        # 予算
-                        budget_element = job_element.find('span', class_='Yh37y')
-                        budget = budget_element.text.strip() if budget_element else "予算未設定"
-                        
-                        # クライアント名
-                        client_element = job_element.find('a', class_='uxHdW')
-                        client = client_element.text.strip() if client_element else "クライアント名非公開"
-                        
-                        # 投稿日
-                        posted_date_element = job_element.find('time')
-                        posted_date = posted_date_element['datetime'] if posted_date_element else None
-                        
-                        job_data = {
-                            "title": title,
-                            "url": url,
-                            "budget": budget,
-                            "client": client,
-                            "posted_date": posted_date,
-                            "crawled_at": datetime.now().isoformat()
-                        }
-                        
-                        self.logger.info(f"求人情報を取得しました: {title}")
-                        jobs_data.append(job_data)
-                        
-                    except Exception as e:
-                        self.logger.error(f"案件データの取得中にエラーが発生: {str(e)}")
-                        continue
+                page_jobs = page_jobs[:max_items - total]
+                total += len(page_jobs)
+                yield page_jobs
+                
+                # 取得済みの案件に達した場合は次ページへ進まない
+                if stop_when and stop_when(page_jobs):
+                    break
                 
                 # 次のページが存在し、まだ必要な件数に達していない場合は次ページへ
-                if len(jobs_data) < max_items:
-                    try:
-                        next_button = self.driver.find_element(By.XPATH, '//*[@id="vue-container"]/div/div[2]/div/div[3]/div[2]/section/div[4]/a')
-                        self.driver.execute_script("arguments[0].click();", next_button)
-                        current_page += 1
-                        self.logger.info(f"次のページ（{current_page}ページ目）に移動します")
-                        time.sleep(5)  # ページ遷移を待つ
-                    except NoSuchElementException:
-                        self.logger.info("最後のページに到達しました")
-                        break
-                    except Exception as e:
-                        self.logger.error(f"ページ遷移中にエラーが発生: {str(e)}")
-                        self.save_page_source("scrape_error_page.html")
-                        raise ScrapingError(f"案件一覧のページ遷移中にエラーが発生しました: {e}")
+                if total < max_items:
+                    with self.driver_lock:
+                        try:
+                            first_href = page_waits.first_link_href(self.driver, job_extractor.JOB_LINK_SELECTOR)
+                            next_button = self.driver.find_element(By.XPATH, '//*[@id="vue-container"]/div/div[2]/div/div[3]/div[2]/section/div[4]/a')
+                            rate_limiter.site_limiter(self.search_url).acquire()
+                            self.driver.execute_script("arguments[0].click();", next_button)
+                            current_page += 1
+                            self.pages_loaded += 1
+                            self.logger.info(f"次のページ（{current_page}ページ目）に移動します")
+                            # 案件カードが次のページのものに入れ替わるまで待機
+                            self.waits.wait_until(
+                                self.driver, page_waits.first_link_changed(job_extractor.JOB_LINK_SELECTOR, first_href), 15, "ページ遷移"
+                            )
+                        except NoSuchElementException:
+                            self.logger.info("最後のページに到達しました")
+                            break
+                        except Exception as e:
+                            self.logger.error(f"ページ遷移中にエラーが発生: {str(e)}")
+                            self.save_page_source("scrape_error_page.html")
+                            raise ScrapingError(f"案件一覧のページ遷移中にエラーが発生しました: {e}")
             
-            self.logger.info(f"合計{len(jobs_data)}件の案件を取得しました（{current_page}ページ分）")
-            return jobs_data
+            self.logger.info(f"合計{total}件の案件を取得しました（{current_page}ページ分）")
             
         except Exception as e:
             self.logger.error(f"案件一覧の取得中にエラーが発生: {str(e)}")
-            self.save_page_source("scrape_error_page.html")
+            with self.driver_lock:
+                self.save_page_source("scrape_error_page.html")
             # return []
             raise ScrapingError(f"案件一覧の取得中に予期しないエラーが発生しました: {e}")
 
-    def save_jobs(self, jobs: List[Dict]):
-        """取得した案件情報を保存"""
-        if not jobs:
-            logger.warning("保存する案件データがありません")
-            return
-
-        # 保存先ディレクトリの作成（アプリケーション初期化で既に作成されている可能性がありますが、
-        # クローラーが単体で実行される場合のために残しています）
-        save_dir = Path("crawled_data")
-        save_dir.mkdir(exist_ok=True)
-
-        # 現在の日時をファイル名に使用
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # JSONとして保存
-        json_path = save_dir / f"jobs_{timestamp}.json"
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(jobs, f, ensure_ascii=False, indent=2)
-        
-        # CSVとして保存
-        csv_path = save_dir / f"jobs_{timestamp}.csv"
-        df = pd.DataFrame(jobs)
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-
-        logger.info(f"データを保存しました: {json_path}, {csv_path}")
-
-    def load_previous_jobs(self) -> Dict[str, Dict]:
-        """前回のクロール結果を読み込む"""
-        # アプリケーション初期化で既に作成されている可能性がありますが、
-        # クローラーが単体で実行される場合のためにチェックします
-        save_dir = data_dir / 'crawled_data'
-        if not save_dir.exists():
-            os.makedirs(save_dir, exist_ok=True)
-            return {}
-        
-        # 最新のJSONファイルを探す
-        json_files = list(save_dir.glob("jobs_*.json"))
-        if not json_files:
-            return {}
-        
-        latest_file = max(json_files, key=lambda x: x.stat().st_mtime)
-        
-        try:
-            with open(latest_file, "r", encoding="utf-8") as f:
-                jobs = json.load(f)
-                # URL をキーとした辞書に変換
-                return {job["url"]: job for job in jobs}
-        except Exception as e:
-            self.logger.error(f"前回のデータ読み込みに失敗: {str(e)}")
-            return {}
-
     def check_duplicates(self, new_jobs: List[Dict]) -> List[Dict]:
-        """重複チェックを行い、新規または更新が必要な案件のみを返す"""
-        previous_jobs = self.load_previous_jobs()
+        """重複チェックを行い、新規または更新が必要な案件のみを返す（全てのクロール履歴が対象）"""
+        previous_jobs = url_index.get_index().lookup([job["url"] for job in new_jobs])
         updated_jobs = []
         
         for new_job in new_jobs:
@@ -672,37 +889,155 @@ class CrowdWorksCrawler:
                 # 新規案件
                 self.logger.info(f"新規案件を追加: {new_job['title']}")
                 updated_jobs.append(new_job)
-            else:
-                # 既存案件の場合、投稿日時を比較
-                prev_date = datetime.fromisoformat(previous_jobs[url]["posted_date"])
-                new_date = datetime.fromisoformat(new_job["posted_date"])
-                
-                if new_date > prev_date:
-                    # 更新があった場合
-                    self.logger.info(f"案件を更新: {new_job['title']}")
-                    updated_jobs.append(new_job)
+            elif url_index.is_newer(new_job.get("posted_date"), previous_jobs[url]["posted_date"]):
+                # 投稿日時が更新された場合
+                self.logger.info(f"案件を更新: {new_job['title']}")
+                updated_jobs.append(new_job)
+            elif url_index.content_hash(new_job) != previous_jobs[url]["content_hash"]:
+                # タイトル・予算などの内容が変わった場合
+                self.logger.info(f"案件の内容が変更されました: {new_job['title']}")
+                updated_jobs.append(new_job)
         
         self.logger.info(f"新規/更新案件: {len(updated_jobs)}件")
         return updated_jobs
 
-    def run(self):
-        """クローラーのメイン処理"""
+    def crawl(self):
+        """
+        案件の取得からフィルタリング・保存までを1回実行する
+
+        ログイン済みの場合はログインを省略し、ブラウザは終了しない（デーモンから繰り返し呼び出される）。
+        """
+        self.cancel_event.clear()
+        settings = load_settings()
+        job_extractor.configure(settings)
+        rate_limiter.configure(settings)
+        llm_usage.configure(settings)
+        llm_usage.start_run('crawl')
+        if not self.logged_in and not self.login():
+            self.logger.error("ログインに失敗したため、処理を中止します")
+            return
+        
+        pipeline_config = crawl_pipeline.get_config(settings)
+        if pipeline_config['enabled']:
+            # 一覧取得・フィルタリング・詳細取得を並行して実行
+            jobs, base_filename, filtered_filename = process_crawled_pages(self, pipeline_config)
+            if base_filename:
+                self.logger.info(f"生データを保存: {base_filename}")
+                self.logger.info(f"フィルタリング済みデータを保存: {filtered_filename}")
+            elif jobs:
+                self.logger.info("新規または更新された案件はありません")
+            if jobs:
+                # 処理が完了した案件を取得済みとして記録
+                url_index.get_index().record(jobs)
+            self.log_crawl_stats()
+            return
+        
+        jobs = self.scrape_jobs()
+        self.check_cancelled()
+        if jobs:
+            # 重複チェックを実行
+            unique_jobs = self.check_duplicates(jobs)
+            if unique_jobs:
+                # GPTフィルタリングを含むデータ処理を実行（crawlerインスタンスを渡す）
+                base_filename, filtered_filename = process_crawled_data(unique_jobs, self)
+                self.logger.info(f"生データを保存: {base_filename}")
+                self.logger.info(f"フィルタリング済みデータを保存: {filtered_filename}")
+            else:
+                self.logger.info("新規または更新された案件はありません")
+            # 処理が完了した案件を取得済みとして記録
+            url_index.get_index().record(jobs)
+        self.log_crawl_stats()
+
+    def resume(self, journal: run_journal.RunJournal):
+        """
+        中断した実行をジャーナルの最後の記録から再開する
+
+        フィルタリング結果が記録されていない案件のみフィルタリングし、
+        詳細情報が記録されていない案件のみ詳細を取得する。
+        """
+        state = journal.load_state()
+        if state.completed:
+            self.logger.info(f"実行 {journal.run_id} は完了済みです")
+            return
+        if not state.base_filename:
+            raise ValueError(f"ジャーナルに実行開始の記録がありません: {journal.run_id}")
+        
+        settings = load_settings()
+        job_extractor.configure(settings)
+        rate_limiter.configure(settings)
+        llm_usage.configure(settings)
+        llm_usage.start_run(f'resume:{journal.run_id}')
+        base_filename = state.base_filename
+        self.logger.info(
+            f"実行 {journal.run_id} を再開します（新規・更新の案件 {len(state.unique_jobs)}件, "
+            f"判定済み {len(state.verdicts)}件, 詳細取得済み {len(state.details)}件）"
+        )
+        
+        # 生データの保存前または追記の途中で中断していた場合は、ジャーナルの内容で保存し直す
+        if state.unique_jobs and (not os.path.exists(base_filename)
+                                  or job_store.count_records(base_filename) != len(state.unique_jobs)):
+            job_store.write_records(base_filename, state.unique_jobs, job_store.get_config(settings))
+            self.logger.info(f"生データを保存: {base_filename}")
+        
+        pending_jobs = state.pending_filter()
+        if pending_jobs:
+            self.logger.info(f"未判定の{len(pending_jobs)}件の案件をGPTフィルタリングします")
+            accepted = filter_jobs_with_rules(pending_jobs, load_config())
+            journal.record_verdicts(pending_jobs, accepted)
+            state = journal.load_state()
+        
+        filtered_jobs = state.accepted_jobs()
+        missing_jobs = [job for job in filtered_jobs if job['url'] not in state.details]
+        if missing_jobs:
+            # 詳細取得が必要な場合のみログインする
+            if not self.logged_in and not self.login():
+                raise LoginError("ログインに失敗したため、詳細情報を取得できません")
+            urls = [job['url'] for job in missing_jobs]
+            details = self.scrape_job_details(urls)
+            journal.record_details(urls, details)
+            for job, detail_data in zip(missing_jobs, details):
+                job.update(detail_data)
+        
+        filtered_filename = None
+        if state.unique_jobs:
+            filtered_filename = save_filtered_jobs(filtered_jobs, base_filename)
+            self.logger.info(f"フィルタリング済みデータを保存: {filtered_filename}")
+        if state.scraped_jobs:
+            url_index.get_index().record(state.scraped_jobs)
+        journal.complete(filtered_filename)
+        self.logger.info(f"実行 {journal.run_id} の再開処理が完了しました")
+        self.log_crawl_stats()
+
+    def log_crawl_stats(self):
+        """待機時間・転送量・HTML解析時間の集計をログに出力してリセット"""
+        self.waits.log_summary()
+        self.waits.records.clear()
+        self.traffic.log_summary(self.driver)
+        self.traffic.reset()
+        job_extractor.parse_stats.log_summary()
+        job_extractor.parse_stats.reset()
+        # 送信レートの利用状況はAPIから参照できるよう保存する（累計のためリセットしない）
+        rate_limiter.log_metrics()
+        rate_limiter.save_metrics('crawler')
+        # LLMの呼び出しは実行ごとの集計を保存し、プロセスの累計も保存する
+        llm_usage.finish_run()
+        llm_usage.save_metrics('crawler')
+
+    def run(self, journal: run_journal.RunJournal = None):
+        """
+        クローラーのメイン処理
+
+        Args:
+            journal: 再開する実行のジャーナル（省略時は新しく実行する）
+        """
         try:
-            if self.login():
-                jobs = self.scrape_jobs()
-                if jobs:
-                    # 重複チェックを実行
-                    unique_jobs = self.check_duplicates(jobs)
-                    if unique_jobs:
-                        # GPTフィルタリングを含むデータ処理を実行（crawlerインスタンスを渡す）
-                        base_filename, filtered_filename = process_crawled_data(unique_jobs, self)
-                        self.logger.info(f"生データを保存: {base_filename}")
-                        self.logger.info(f"フィルタリング済みデータを保存: {filtered_filename}")
-                    else:
-                        self.logger.info("新規または更新された案件はありません")
+            if journal:
+                self.resume(journal)
             else:
-                self.logger.error("ログインに失敗したため、処理を中止します")
+                self.crawl()
         finally:
+            # 途中で終了した場合も、それまでのLLMの利用状況を保存する（正常終了時は保存済み）
+            llm_usage.finish_run(status='failed')
             self.driver.quit()
             self.logger.info("クローラーを終了します")
 
@@ -720,12 +1055,23 @@ if __name__ == "__main__":
         
         logger.info(f"認証情報: email={bool(email)}, password={bool(password)}")
         
+        # --resume [実行ID] が指定された場合は中断した実行を再開する
+        journal = None
+        if '--resume' in sys.argv:
+            arg_index = sys.argv.index('--resume')
+            run_id = sys.argv[arg_index + 1] if len(sys.argv) > arg_index + 1 else None
+            journal = run_journal.RunJournal.find(run_id)
+            if journal is None:
+                logger.info("再開できる実行がありません")
+                print("再開できる実行がありません")
+                sys.exit(0)
+        
         # クローラーを実行
         logger.info("クローラーを初期化しています...")
         crawler = CrowdWorksCrawler(email, password)
         
         logger.info("クローラーの実行を開始します")
-        crawler.run()
+        crawler.run(journal)
         
         # 正常終了
         logger.info("クローラーが正常に終了しました")
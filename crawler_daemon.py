@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ログイン済みのヘッドレスブラウザを保持し続けるクローラーデーモン
+
+app.py からローカルソケット経由でクロール要求を受け取り、
+ブラウザの起動とログインを毎回やり直さずにクロールを実行する。
+"""
+
+import json
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+from typing import Dict, Optional
+
+from fix_settings_patch import get_app_paths
+
+# アプリケーションパスを取得
+app_paths = get_app_paths()
+data_dir = app_paths['data_dir']
+
+# 認証キーと状態ファイルのパス
+DAEMON_KEY_FILE = data_dir / '.crawler_daemon.key'
+DAEMON_STATE_FILE = data_dir / 'crawler_daemon.json'
+
+# デーモン設定の既定値（設定の crawler_daemon で上書き可能）
+# 有効にした場合も、デーモンは最初のクロール要求時に起動する
+DEFAULT_DAEMON_CONFIG = {
+    'enabled': False,
+    'port': 8766,
+    'recycle_after_pages': 200,
+    'recycle_memory_mb': 1500
+}
+
+# クロール要求の応答待ちタイムアウト（秒）
+CRAWL_TIMEOUT = 1800
+
+# デーモン起動時の応答待ちタイムアウト（秒）
+START_TIMEOUT = 30
+
+# 停止要求後、デーモンのプロセスが終了するまで待つ時間（秒）
+STOP_TIMEOUT = 60
+
+# 親プロセス（アプリ）の生存を確認する間隔（秒）
+PARENT_CHECK_INTERVAL = 5
+
+class DaemonTimeout(Exception):
+    """コマンドはデーモンに届いたが、応答が制限時間内に返らなかった（デーモンは処理を継続している可能性がある）"""
+
+def get_config(settings: Dict) -> Dict:
+    """設定からデーモンの設定を取得"""
+    return {**DEFAULT_DAEMON_CONFIG, **(settings.get('crawler_daemon') or {})}
+
+def _load_settings() -> Dict:
+    """設定ファイルを読み込む"""
+    try:
+        with open(app_paths['settings_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _load_authkey() -> bytes:
+    """ソケット認証用のキーを読み込む（存在しない場合は生成）"""
+    if not DAEMON_KEY_FILE.exists():
+        DAEMON_KEY_FILE.write_bytes(secrets.token_bytes(32))
+        os.chmod(DAEMON_KEY_FILE, 0o600)
+    return DAEMON_KEY_FILE.read_bytes()
+
+def send_command(command: Dict, timeout: float = 5, port: Optional[int] = None) -> Dict:
+    """
+    デーモンにコマンドを送信して応答を受け取る
+
+    Raises:
+        ConnectionError: デーモンに接続できない、またはコマンドを送信できない場合
+        DaemonTimeout: コマンドの送信後、応答が制限時間内に返らない場合
+    """
+    port = port or get_config(_load_settings())['port']
+    try:
+        conn = Client(('127.0.0.1', port), authkey=_load_authkey())
+    except Exception as e:
+        raise ConnectionError(f"クローラーデーモンに接続できません: {e}")
+    try:
+        conn.send(command)
+        if not conn.poll(timeout):
+            raise DaemonTimeout(f"クローラーデーモンからの応答が{timeout}秒以内に返りませんでした")
+        return conn.recv()
+    finally:
+        conn.close()
+
+def is_running() -> bool:
+    """デーモンが応答可能かどうかを確認"""
+    try:
+        return send_command({'cmd': 'ping'}, timeout=3).get('status') == 'ok'
+    except Exception:
+        return False
+
+def _daemon_pid() -> Optional[int]:
+    """状態ファイルからデーモンのプロセスIDを取得"""
+    try:
+        return int(json.loads(DAEMON_STATE_FILE.read_text())['pid'])
+    except Exception:
+        return None
+
+def start_daemon() -> bool:
+    """デーモンを別プロセスとして起動し、応答可能になるまで待機（デーモンは呼び出し元のプロセスの終了時に終了する）"""
+    if is_running():
+        return True
+    script_path = os.path.abspath(__file__)
+    subprocess.Popen(
+        [sys.executable, script_path, '--parent-pid', str(os.getpid())],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if is_running():
+            return True
+        time.sleep(0.5)
+    return False
+
+def stop_daemon(wait: bool = False):
+    """
+    デーモンを終了させる
+
+    Args:
+        wait: Trueの場合は実行中のクロールを中断させ、プロセスが終了するまで待つ
+              （STOP_TIMEOUT 秒以内に終了しない場合はブラウザごと強制終了する）
+    """
+    pid = _daemon_pid() if wait else None
+    if wait:
+        try:
+            cancel_crawl()
+        except Exception:
+            pass
+    try:
+        send_command({'cmd': 'shutdown'}, timeout=10)
+    except Exception:
+        pass
+    if pid is None:
+        return
+
+    import psutil
+    try:
+        process = psutil.Process(pid)
+        process.wait(timeout=STOP_TIMEOUT)
+    except psutil.NoSuchProcess:
+        return
+    except psutil.TimeoutExpired:
+        for child in process.children(recursive=True):
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+        process.kill()
+        try:
+            DAEMON_STATE_FILE.unlink()
+        except FileNotFoundError:
+            pass
+
+def cancel_crawl() -> Dict:
+    """実行中のクロールの中断を要求する（現在のページまたは詳細取得の区切りで中断される）"""
+    return send_command({'cmd': 'cancel'}, timeout=5)
+
+def request_crawl() -> Dict:
+    """
+    デーモンにクロールを要求し、完了まで待機する（必要に応じてデーモンを起動）
+
+    Raises:
+        ConnectionError: デーモンを起動できない、または接続できない場合（クロールは開始されていない）
+        DaemonTimeout: CRAWL_TIMEOUT 秒以内に完了しない場合（デーモンのクロールは継続している可能性がある）
+    """
+    if not start_daemon():
+        raise ConnectionError("クローラーデーモンを起動できませんでした")
+    return send_command({'cmd': 'crawl'}, timeout=CRAWL_TIMEOUT)
+
+class CrawlerDaemon:
+    """ログイン済みのCrowdWorksCrawlerを保持してクロール要求を処理するデーモン"""
+
+    def __init__(self, config: Dict, parent_pid: Optional[int] = None):
+        """
+        Args:
+            config: デーモンの設定
+            parent_pid: 親プロセス（アプリ）のプロセスID。指定した場合は親の終了時にデーモンも終了する
+        """
+        # crawlerモジュールはロガー設定を上書きするため、デーモンプロセス内でのみ読み込む
+        import crawler
+        self.crawler_module = crawler
+        self.logger = crawler.logger
+        self.config = config
+        self.parent_pid = parent_pid
+        self.crawler = None
+        self.credentials = None
+        self.crawl_count = 0
+        self.recycle_count = 0
+        self.started_at = time.time()
+        # ブラウザは1つなのでクロールは直列に実行する
+        self._crawl_lock = threading.Lock()
+
+    def _ensure_crawler(self):
+        """ブラウザを用意し、未ログインであればログインする"""
+        settings = self.crawler_module.load_settings()
+        credentials = (settings.get('crowdworks_email'), settings.get('crowdworks_password'))
+        if not all(credentials):
+            raise self.crawler_module.LoginError("CrowdWorksのメールアドレスまたはパスワードが設定されていません")
+
+        # 認証情報が変更された場合はブラウザを作り直す
+        if self.crawler is not None and credentials != self.credentials:
+            self.logger.info("認証情報が変更されたため、ブラウザを再作成します")
+            self._quit_browser()
+
+        if self.crawler is None:
+            self.crawler = self.crawler_module.CrowdWorksCrawler(*credentials)
+            self.credentials = credentials
+
+        if not self.crawler.logged_in:
+            self.crawler.login()
+
+    def _browser_memory_mb(self) -> float:
+        """ChromeDriverと配下のChromeプロセスのメモリ使用量（MB）"""
+        try:
+            import psutil
+            process = psutil.Process(self.crawler.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def _quit_browser(self):
+        """ブラウザを終了する"""
+        if self.crawler is not None:
+            try:
+                self.crawler.driver.quit()
+            except Exception as e:
+                self.logger.warning(f"ブラウザの終了に失敗: {str(e)}")
+        self.crawler = None
+
+    def _maybe_recycle(self):
+        """ページ数またはメモリ使用量が上限を超えたらブラウザを作り直す"""
+        if self.crawler is None:
+            return
+        memory_mb = self._browser_memory_mb()
+        if (self.crawler.pages_loaded >= self.config['recycle_after_pages']
+                or memory_mb >= self.config['recycle_memory_mb']):
+            self.logger.info(
+                f"ブラウザをリサイクルします（ページ数: {self.crawler.pages_loaded}, メモリ: {memory_mb:.0f}MB）"
+            )
+            self._quit_browser()
+            self.recycle_count += 1
+
+    def warm_up(self):
+        """起動直後にブラウザを立ち上げてログインしておく"""
+        try:
+            with self._crawl_lock:
+                self._ensure_crawler()
+            self.logger.info("クローラーデーモンのウォームアップが完了しました")
+        except Exception as e:
+            self.logger.warning(f"クローラーデーモンのウォームアップに失敗: {str(e)}")
+
+    def _watch_parent(self):
+        """親プロセスが終了したら、実行中のクロールを中断してデーモンを終了させる"""
+        import psutil
+        try:
+            parent = psutil.Process(self.parent_pid)
+        except psutil.NoSuchProcess:
+            parent = None
+        # is_running は起動時刻も比較するため、プロセスIDが再利用された場合も終了と判定される
+        while parent is not None and parent.is_running():
+            time.sleep(PARENT_CHECK_INTERVAL)
+
+        self.logger.info("アプリが終了したため、クローラーデーモンを終了します")
+        self.cancel()
+        try:
+            send_command({'cmd': 'shutdown'}, timeout=10, port=self.config['port'])
+        except Exception as e:
+            self.logger.warning(f"クローラーデーモンの終了要求に失敗したため、強制終了します: {str(e)}")
+            self._quit_browser()
+            os._exit(1)
+
+    def crawl(self) -> Dict:
+        """クロールを1回実行（実行中の場合は完了を待ってから実行）"""
+        with self._crawl_lock:
+            return self._crawl()
+
+    def _crawl(self) -> Dict:
+        start_time = time.monotonic()
+        try:
+            self._ensure_crawler()
+            self.crawler.crawl()
+            self.crawl_count += 1
+            return {
+                'status': 'success',
+                'message': 'クロールが完了しました',
+                'elapsed': round(time.monotonic() - start_time, 1)
+            }
+        except self.crawler_module.CrawlCancelled as e:
+            # ページの区切りで中断しているため、ブラウザとログイン状態はそのまま使える
+            self.logger.info("デーモンでのクロールを中断しました")
+            self.crawler_module.llm_usage.finish_run(status='cancelled')
+            return {
+                'status': 'cancelled',
+                'error_type': type(e).__name__,
+                'message': str(e)
+            }
+        except Exception as e:
+            self.logger.error(f"デーモンでのクロール中にエラーが発生: {str(e)}\n{traceback.format_exc()}")
+            self.crawler_module.llm_usage.finish_run(status='failed')
+            # ログイン状態が不明になるため、次回はブラウザを作り直す
+            self._quit_browser()
+            return {
+                'status': 'error',
+                'error_type': type(e).__name__,
+                'message': str(e)
+            }
+        finally:
+            self._maybe_recycle()
+
+    def status(self) -> Dict:
+        """デーモンの状態を取得"""
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 1),
+            'busy': self._crawl_lock.locked(),
+            'browser_ready': self.crawler is not None and self.crawler.logged_in,
+            'pages_loaded': self.crawler.pages_loaded if self.crawler else 0,
+            'browser_memory_mb': round(self._browser_memory_mb(), 1) if self.crawler else 0.0,
+            'crawl_count': self.crawl_count,
+            'recycle_count': self.recycle_count
+        }
+
+    def cancel(self) -> Dict:
+        """実行中のクロールに中断を要求する"""
+        if self.crawler is None or not self._crawl_lock.locked():
+            return {'status': 'ok', 'cancelled': False}
+        self.crawler.cancel_event.set()
+        self.logger.info("クロールの中断を要求しました")
+        return {'status': 'ok', 'cancelled': True}
+
+    def _handle_crawl(self, conn):
+        """クロール要求を別スレッドで処理し、完了後に応答する"""
+        try:
+            conn.send(self.crawl())
+        except Exception as e:
+            self.logger.error(f"クロール結果の送信に失敗: {str(e)}")
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        """ローカルソケットでコマンドを待ち受ける（クロール中もping・statusに応答する）"""
+        listener = Listener(('127.0.0.1', self.config['port']), authkey=_load_authkey())
+        DAEMON_STATE_FILE.write_text(json.dumps({'pid': os.getpid(), 'port': self.config['port']}))
+        self.logger.info(f"クローラーデーモンを起動しました（ポート: {self.config['port']}）")
+        threading.Thread(target=self.warm_up, daemon=True).start()
+        if self.parent_pid is not None:
+            threading.Thread(target=self._watch_parent, daemon=True).start()
+
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    self.logger.warning(f"接続の受け付けに失敗: {str(e)}")
+                    continue
+                try:
+                    command = conn.recv()
+                    cmd = command.get('cmd') if isinstance(command, dict) else None
+                    if cmd == 'crawl':
+                        threading.Thread(target=self._handle_crawl, args=(conn,), daemon=True).start()
+                        continue
+                    if cmd == 'ping':
+                        conn.send({'status': 'ok'})
+                    elif cmd == 'status':
+                        conn.send(self.status())
+                    elif cmd == 'cancel':
+                        conn.send(self.cancel())
+                    elif cmd == 'shutdown':
+                        conn.send({'status': 'ok'})
+                        break
+                    else:
+                        conn.send({'status': 'error', 'message': f"不明なコマンド: {cmd}"})
+                except Exception as e:
+                    self.logger.error(f"コマンド処理中にエラーが発生: {str(e)}")
+                conn.close()
+        finally:
+            with self._crawl_lock:
+                self._quit_browser()
+            listener.close()
+            try:
+                DAEMON_STATE_FILE.unlink()
+            except FileNotFoundError:
+                pass
+            self.logger.info("クローラーデーモンを終了しました")
+
+if __name__ == "__main__":
+    # --parent-pid で指定したプロセスが終了したらデーモンも終了する
+    parent_pid = None
+    if '--parent-pid' in sys.argv:
+        arg_index = sys.argv.index('--parent-pid')
+        parent_pid = int(sys.argv[arg_index + 1]) if len(sys.argv) > arg_index + 1 else None
+    CrawlerDaemon(get_config(_load_settings()), parent_pid=parent_pid).serve_forever()
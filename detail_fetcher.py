@@ -0,0 +1,125 @@
+import time
+from typing import Dict, List
+
+from loguru import logger
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+import job_extractor
+import page_waits
+import rate_limiter
+
+# 詳細ページ1件あたりの読み込みタイムアウト（秒）
+DEFAULT_TIMEOUT = 20
+
+# 同時に開くタブ数の既定値（設定の detail_concurrency で上書き可能）
+DEFAULT_CONCURRENCY = 4
+
+class DetailFetcher:
+    """
+    ログイン済みのブラウザで複数のタブを同時に開き、案件詳細ページを並行して読み込むクラス
+
+    全てのタブは同じブラウザのセッション（Cookie）を共有する。
+    """
+
+    def __init__(self, driver, concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT,
+                 traffic=None):
+        """
+        Args:
+            driver: ログイン済みのWebDriver
+            concurrency: 同時に開くタブ数の上限
+            timeout: 1ページあたりの読み込みタイムアウト（秒）
+            traffic: ページ時間を記録するcrawl_profile.TrafficReport（省略可）
+        """
+        self.driver = driver
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.traffic = traffic
+        self.records = []
+
+    def _open_tab(self, url: str) -> str:
+        """新しいタブでURLの読み込みを開始し、タブのハンドルを返す（読み込み完了は待たない）"""
+        before = set(self.driver.window_handles)
+        rate_limiter.site_limiter(url).acquire()
+        self.driver.execute_script("window.open(arguments[0], '_blank');", url)
+        new_handles = [handle for handle in self.driver.window_handles if handle not in before]
+        if not new_handles:
+            raise RuntimeError("新しいタブを開けませんでした")
+        return new_handles[0]
+
+    def _read_tab(self, handle: str) -> Dict:
+        """タブの読み込み完了を待って詳細情報を抽出する"""
+        self.driver.switch_to.window(handle)
+        WebDriverWait(self.driver, self.timeout).until(page_waits.document_ready)
+        try:
+            # 仕事詳細テーブルが描画されるまで待機（タイムアウト時も取得を試みる）
+            WebDriverWait(self.driver, self.timeout).until(
+                page_waits.element_present(By.CSS_SELECTOR, job_extractor.DETAIL_TABLE_SELECTOR)
+            )
+        except TimeoutException:
+            pass
+        if self.traffic is not None:
+            self.traffic.record_page(self.driver, "仕事詳細")
+        return job_extractor.extract_job_detail(self.driver.page_source)
+
+    def fetch_all(self, urls: List[str]) -> List[Dict]:
+        """
+        複数の詳細ページを取得する
+
+        Returns:
+            入力と同じ順序の詳細情報リスト（取得できなかったURLは空の辞書）
+        """
+        results = [{} for _ in urls]
+        main_handle = self.driver.current_window_handle
+        start_time = time.monotonic()
+
+        for chunk_start in range(0, len(urls), self.concurrency):
+            chunk = list(enumerate(urls[chunk_start:chunk_start + self.concurrency], chunk_start))
+
+            # まとめてタブを開いて並行に読み込ませる
+            opened = []
+            for index, url in chunk:
+                self.driver.switch_to.window(main_handle)
+                try:
+                    opened.append((index, url, self._open_tab(url), time.monotonic()))
+                except Exception as e:
+                    self._record(url, 0.0, False, str(e))
+
+            # 開いた順に読み込み完了を待って抽出する
+            for index, url, handle, opened_at in opened:
+                try:
+                    results[index] = self._read_tab(handle)
+                    self._record(url, time.monotonic() - opened_at, bool(results[index]),
+                                 None if results[index] else "仕事詳細が見つかりませんでした")
+                except Exception as e:
+                    self._record(url, time.monotonic() - opened_at, False, str(e))
+                finally:
+                    try:
+                        self.driver.switch_to.window(handle)
+                        self.driver.close()
+                    except Exception:
+                        pass
+
+            self.driver.switch_to.window(main_handle)
+
+        elapsed = time.monotonic() - start_time
+        failures = sum(1 for record in self.records if not record['success'])
+        logger.info(
+            f"案件詳細の取得完了: {len(urls)}件, 失敗 {failures}件, {elapsed:.1f}秒 "
+            f"（同時タブ数: {self.concurrency}）"
+        )
+        return results
+
+    def _record(self, url: str, elapsed: float, success: bool, error=None):
+        """URLごとの取得時間と失敗を記録"""
+        self.records.append({
+            'url': url,
+            'elapsed': round(elapsed, 3),
+            'success': success,
+            'error': error
+        })
+        if success:
+            logger.info(f"仕事詳細を取得: {url}（{elapsed:.2f}秒）")
+        else:
+            logger.warning(f"仕事詳細の取得に失敗: {url}（{elapsed:.2f}秒）: {error}")
@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Container, Dict, List, Optional
+
+from loguru import logger
+
+# 差分クロール設定の既定値（設定の incremental_crawl で上書き可能）
+DEFAULT_INCREMENTAL_CONFIG = {
+    'enabled': True,
+    'stop_after_known': 5
+}
+
+def get_config(settings: Dict) -> Dict:
+    """設定から差分クロールの設定を取得"""
+    return {**DEFAULT_INCREMENTAL_CONFIG, **(settings.get('incremental_crawl') or {})}
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    """投稿日時を解析（不明な場合はNone）"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+class HighWaterMark:
+    """
+    新着順の一覧で、前回までに取得済みの位置に達したかを判定するクラス
+
+    取得済みのURL、または前回の最新投稿日時より古い案件が
+    stop_after_known 件連続した時点で、それ以降は既知の案件とみなす。
+    （上部に固定表示される案件があるため、1件目の既知URLでは止めない）
+    """
+
+    def __init__(self, known_urls: Container[str], newest_posted_date: Optional[str] = None,
+                 stop_after_known: int = DEFAULT_INCREMENTAL_CONFIG['stop_after_known']):
+        """
+        Args:
+            known_urls: 取得済みの案件URL（inで判定できるもの。url_index.UrlIndexも可）
+            newest_posted_date: 前回取得した案件の最新投稿日時（ISO形式）
+            stop_after_known: 停止するまでに連続して必要な既知案件の件数
+        """
+        self.known_urls = known_urls
+        self.newest_posted = _parse_date(newest_posted_date)
+        self.stop_after_known = max(1, stop_after_known)
+        self.known_run = 0
+        self.reached = False
+
+    @classmethod
+    def from_jobs(cls, jobs: List[Dict], stop_after_known: int) -> 'HighWaterMark':
+        """前回の案件リストから作成"""
+        posted_dates = [job.get('posted_date') for job in jobs if _parse_date(job.get('posted_date'))]
+        newest = None
+        if posted_dates:
+            try:
+                newest = max(posted_dates, key=_parse_date)
+            except TypeError:
+                # タイムゾーンの有無が混在している場合は日時による判定を行わない
+                newest = None
+        return cls({job['url'] for job in jobs if job.get('url')}, newest, stop_after_known)
+
+    def _is_known(self, job: Dict) -> bool:
+        if job.get('url') in self.known_urls:
+            return True
+        posted = _parse_date(job.get('posted_date'))
+        if posted is None or self.newest_posted is None:
+            return False
+        try:
+            return posted < self.newest_posted
+        except TypeError:
+            return False
+
+    def should_stop(self, page_jobs: List[Dict]) -> bool:
+        """
+        取得した1ページ分の案件を順に確認し、既知の位置に達した場合はTrueを返す
+
+        Args:
+            page_jobs: 一覧ページに表示された順の案件リスト
+        """
+        for job in page_jobs:
+            self.known_run = self.known_run + 1 if self._is_known(job) else 0
+            if self.known_run >= self.stop_after_known:
+                self.reached = True
+                logger.info(f"取得済みの案件が{self.known_run}件連続したため、一覧の取得を打ち切ります")
+                return True
+        return False
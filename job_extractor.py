@@ -0,0 +1,445 @@
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+from loguru import logger
+
+import budget_parser
+
+# クラウドワークスのベースURL
+BASE_URL = "https://crowdworks.jp"
+
+# ブラウザでの描画待ちに使用するセレクタ
+JOB_CARD_SELECTOR = 'div.UNzN7'
+JOB_LINK_SELECTOR = 'div.UNzN7 h3.iCeus a'
+DETAIL_TABLE_SELECTOR = 'table.job_offer_detail_table'
+
+# lxmlが利用できる場合は高速なlxmlパーサーを使用
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# selectolaxは任意の依存（インストールされている場合のみ選択可能）
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+# パーサーバックエンド
+# - html.parser: ページ全体の木を構築する従来の方式
+# - lxml: lxmlでSoupStrainerに一致する要素のみを構築する
+# - selectolax: lexborベースのパーサーでCSSセレクタにより抽出する
+BACKEND_HTML_PARSER = 'html.parser'
+BACKEND_LXML = 'lxml'
+BACKEND_SELECTOLAX = 'selectolax'
+BACKENDS = (BACKEND_HTML_PARSER, BACKEND_LXML, BACKEND_SELECTOLAX)
+
+# パーサー設定の既定値（設定の html_parser で上書き可能）
+DEFAULT_PARSER_CONFIG = {
+    'backend': BACKEND_LXML if HTML_PARSER == 'lxml' else BACKEND_HTML_PARSER,
+    'measure_memory': False
+}
+
+def _has_class(name: str):
+    """class属性に指定のクラスを含むかを判定する関数
+
+    lxmlで解析中のSoupStrainerには class="UNzN7 foo" のような値が分割されずに渡されるため、
+    文字列の完全一致ではなくクラスごとに判定する。
+    """
+    return lambda value: bool(value) and name in (value.split() if isinstance(value, str) else value)
+
+# 抽出対象の要素のみを構築するためのフィルタ
+JOB_CARD_STRAINER = SoupStrainer('div', class_=_has_class('UNzN7'))
+DETAIL_TABLE_STRAINER = SoupStrainer('table', class_=_has_class('job_offer_detail_table'))
+
+# BeautifulSoupのget_text / stripped_strings が対象外とする要素
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+class ParseStats:
+    """ページごとの解析時間とメモリ使用量を記録するクラス"""
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, kind: str, backend: str, size: int, elapsed_ms: float, peak_kb: Optional[float]):
+        """1ページ分の解析結果を記録"""
+        self.records.append({
+            'kind': kind,
+            'backend': backend,
+            'bytes': size,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'peak_kb': None if peak_kb is None else round(peak_kb, 1)
+        })
+
+    def summary(self) -> Dict[str, Dict]:
+        """種類（cards / detail）ごとの平均解析時間と最大メモリ使用量"""
+        result = {}
+        for record in self.records:
+            item = result.setdefault(record['kind'], {'pages': 0, 'total_ms': 0.0, 'max_peak_kb': None})
+            item['pages'] += 1
+            item['total_ms'] += record['elapsed_ms']
+            if record['peak_kb'] is not None:
+                item['max_peak_kb'] = max(item['max_peak_kb'] or 0.0, record['peak_kb'])
+        for item in result.values():
+            item['avg_ms'] = round(item.pop('total_ms') / item['pages'], 2)
+        return result
+
+    def log_summary(self):
+        """集計結果をログに出力"""
+        for kind, item in self.summary().items():
+            memory = f", 最大メモリ{item['max_peak_kb']:.0f}KB" if item['max_peak_kb'] is not None else ""
+            logger.info(
+                f"HTML解析 [{kind}]（{_config['backend']}）: {item['pages']}ページ, 平均{item['avg_ms']:.1f}ms{memory}"
+            )
+
+    def reset(self):
+        """記録をリセット"""
+        self.records = []
+
+_config = dict(DEFAULT_PARSER_CONFIG)
+parse_stats = ParseStats()
+
+def configure(settings: Dict):
+    """設定からパーサーバックエンドを選択（利用できない場合は既定のバックエンドを使用）"""
+    config = {**DEFAULT_PARSER_CONFIG, **(settings.get('html_parser') or {})}
+    backend = config['backend']
+    if backend not in BACKENDS:
+        logger.warning(f"不明なHTMLパーサーバックエンドです: {backend}")
+        config['backend'] = DEFAULT_PARSER_CONFIG['backend']
+    elif backend == BACKEND_SELECTOLAX and SelectolaxParser is None:
+        logger.warning("selectolaxがインストールされていないため、既定のパーサーを使用します")
+        config['backend'] = DEFAULT_PARSER_CONFIG['backend']
+    elif backend == BACKEND_LXML and HTML_PARSER != 'lxml':
+        logger.warning("lxmlがインストールされていないため、html.parserを使用します")
+        config['backend'] = BACKEND_HTML_PARSER
+    _config.update(config)
+
+def _available_backends() -> List[str]:
+    """インストール済みの依存で利用できるバックエンド"""
+    return [backend for backend in BACKENDS
+            if not (backend == BACKEND_SELECTOLAX and SelectolaxParser is None)
+            and not (backend == BACKEND_LXML and HTML_PARSER != 'lxml')]
+
+def _measure(kind: str, html: str, parse, backend: Optional[str] = None):
+    """解析処理の時間と（有効な場合は）メモリ使用量を計測して記録"""
+    measure_memory = _config['measure_memory'] and not tracemalloc.is_tracing()
+    if measure_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        return parse(html)
+    finally:
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        peak_kb = None
+        if measure_memory:
+            peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        parse_stats.add(kind, backend or _config['backend'], len(html), elapsed_ms, peak_kb)
+
+def _build_job(title: str, href: str, budget: Optional[str], client: Optional[str],
+               posted_date: Optional[str]) -> Dict:
+    """抽出した値から案件情報を組み立てる（要素がない項目はNone）"""
+    budget = budget if budget is not None else "予算未設定"
+    job_data = {
+        "title": title,
+        "url": f"{BASE_URL}{href}",
+        "budget": budget,
+        "client": client if client is not None else "クライアント名非公開",
+        "posted_date": posted_date,
+        "crawled_at": datetime.now().isoformat()
+    }
+    # 予算を数値化（budget_min / budget_max / budget_type / budget_currency）
+    job_data.update(budget_parser.parse_budget(budget))
+    return job_data
+
+def _cards_with_soup(html: str, parser: str, parse_only=None) -> List[Dict]:
+    soup = BeautifulSoup(html, parser, parse_only=parse_only)
+    jobs = []
+
+    # 案件要素を取得
+    for job_element in soup.find_all('div', class_='UNzN7'):
+        try:
+            # タイトルとURL
+            title_element = job_element.find('h3', class_='iCeus').find('a')
+            title = title_element.text.strip()
+            href = title_element['href']
+
+            # 予算
+            budget_element = job_element.find('span', class_='Yh37y')
+            budget = budget_element.text.strip() if budget_element else None
+
+            # クライアント名
+            client_element = job_element.find('a', class_='uxHdW')
+            client = client_element.text.strip() if client_element else None
+
+            # 投稿日
+            posted_date_element = job_element.find('time')
+            posted_date = posted_date_element['datetime'] if posted_date_element else None
+
+            logger.info(f"求人情報を取得しました: {title}")
+            jobs.append(_build_job(title, href, budget, client, posted_date))
+
+        except Exception as e:
+            logger.error(f"案件データの取得中にエラーが発生: {str(e)}")
+            continue
+
+    return jobs
+
+def _selectolax_strings(node):
+    """子孫のテキストノードを文書順に列挙（script / style / template の中身は除く）
+
+    traverse() は要素の外（後続の兄弟要素）まで走査するため、子要素を再帰的にたどる。
+    """
+    for child in node.iter(include_text=True):
+        if child.tag == '-text':
+            yield child.text_content
+        elif child.tag not in NON_TEXT_TAGS:
+            yield from _selectolax_strings(child)
+
+def _selectolax_text(node) -> str:
+    """BeautifulSoupの .text と同じテキストを取得"""
+    return ''.join(_selectolax_strings(node))
+
+def _cards_with_selectolax(html: str) -> List[Dict]:
+    tree = SelectolaxParser(html)
+    jobs = []
+
+    for job_element in tree.css('div.UNzN7'):
+        try:
+            title_element = job_element.css_first('h3.iCeus').css_first('a')
+            title = _selectolax_text(title_element).strip()
+            href = title_element.attributes['href']
+
+            budget_element = job_element.css_first('span.Yh37y')
+            budget = _selectolax_text(budget_element).strip() if budget_element else None
+
+            client_element = job_element.css_first('a.uxHdW')
+            client = _selectolax_text(client_element).strip() if client_element else None
+
+            posted_date_element = job_element.css_first('time')
+            posted_date = posted_date_element.attributes['datetime'] if posted_date_element else None
+
+            logger.info(f"求人情報を取得しました: {title}")
+            jobs.append(_build_job(title, href, budget, client, posted_date))
+
+        except Exception as e:
+            logger.error(f"案件データの取得中にエラーが発生: {str(e)}")
+            continue
+
+    return jobs
+
+def _detail_lines_with_soup(html: str, parser: str, parse_only=None) -> Optional[List[str]]:
+    soup = BeautifulSoup(html, parser, parse_only=parse_only)
+    detail_table = soup.find('table', class_='job_offer_detail_table')
+    if not detail_table:
+        return None
+    return list(detail_table.stripped_strings)
+
+def _detail_lines_with_selectolax(html: str) -> Optional[List[str]]:
+    detail_table = SelectolaxParser(html).css_first('table.job_offer_detail_table')
+    if detail_table is None:
+        return None
+    return [text.strip() for text in _selectolax_strings(detail_table) if text.strip()]
+
+def _card_parser(backend: str):
+    """バックエンドに対応する一覧ページの解析関数"""
+    if backend == BACKEND_SELECTOLAX:
+        return _cards_with_selectolax
+    if backend == BACKEND_LXML:
+        return lambda html: _cards_with_soup(html, 'lxml', JOB_CARD_STRAINER)
+    return lambda html: _cards_with_soup(html, 'html.parser')
+
+def _detail_parser(backend: str):
+    """バックエンドに対応する詳細ページの解析関数"""
+    if backend == BACKEND_SELECTOLAX:
+        return _detail_lines_with_selectolax
+    if backend == BACKEND_LXML:
+        return lambda html: _detail_lines_with_soup(html, 'lxml', DETAIL_TABLE_STRAINER)
+    return lambda html: _detail_lines_with_soup(html, 'html.parser')
+
+def extract_job_cards(html: str, backend: Optional[str] = None) -> List[Dict]:
+    """
+    案件一覧ページのHTMLから案件情報を抽出する
+
+    Args:
+        html: 案件一覧ページのHTML
+        backend: 使用するバックエンド（省略時は設定のバックエンド。照合には基準の BACKEND_HTML_PARSER を指定する）
+
+    Returns:
+        ページ内の順序どおりの案件情報リスト（案件要素がない場合は空リスト）
+    """
+    backend = backend or _config['backend']
+    return _measure('cards', html, _card_parser(backend), backend)
+
+# ブラウザ内で案件カードを走査し、必要な値のみを返すスクリプト
+# textContent は script / style の中身も含むため、BeautifulSoupの .text と同じく
+# それらの中のテキストノードを除いて連結する（innerText は表示状態やCSSで変わるため使わない）
+JOB_CARDS_SCRIPT = """
+    const text = el => {
+        if (!el) return null;
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        let result = '';
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            if (!node.parentElement || !node.parentElement.closest('script, style, template')) {
+                result += node.nodeValue;
+            }
+        }
+        return result;
+    };
+    return Array.from(document.querySelectorAll('div.UNzN7')).map(card => {
+        const heading = card.querySelector('h3.iCeus');
+        const link = heading ? heading.querySelector('a') : null;
+        const time = card.querySelector('time');
+        return {
+            title: text(link),
+            href: link ? link.getAttribute('href') : null,
+            budget: text(card.querySelector('span.Yh37y')),
+            client: text(card.querySelector('a.uxHdW')),
+            has_time: time !== null,
+            datetime: time ? time.getAttribute('datetime') : null
+        };
+    });
+"""
+
+def extract_job_cards_in_browser(driver) -> List[Dict]:
+    """
+    ブラウザ内で案件カードを抽出する（page_sourceの転送と再解析を行わない）
+
+    Returns:
+        extract_job_cards と同じ形式の案件情報リスト
+    """
+    start_time = time.perf_counter()
+    cards = driver.execute_script(JOB_CARDS_SCRIPT) or []
+    jobs = []
+    for card in cards:
+        # BeautifulSoupでの抽出で例外となる要素は同様に読み飛ばす
+        if card['title'] is None or card['href'] is None:
+            logger.error("案件データの取得中にエラーが発生: タイトルまたはURLの要素が見つかりません")
+            continue
+        if card['has_time'] and card['datetime'] is None:
+            logger.error("案件データの取得中にエラーが発生: 投稿日時の属性が見つかりません")
+            continue
+        title = card['title'].strip()
+        logger.info(f"求人情報を取得しました: {title}")
+        jobs.append(_build_job(
+            title,
+            card['href'],
+            card['budget'].strip() if card['budget'] is not None else None,
+            card['client'].strip() if card['client'] is not None else None,
+            card['datetime']
+        ))
+    parse_stats.add('cards_in_browser', 'script', 0, (time.perf_counter() - start_time) * 1000, None)
+    return jobs
+
+def same_jobs(jobs: List[Dict], other: List[Dict]) -> bool:
+    """取得日時を除いて2つの案件情報リストが一致するか"""
+    return _without_timestamps(jobs) == _without_timestamps(other)
+
+def extract_job_detail(html: str) -> Dict:
+    """
+    案件詳細ページのHTMLから詳細情報を抽出する
+
+    Returns:
+        detail_description と crawled_detail_at を持つ辞書（詳細がない場合は空の辞書）
+    """
+    lines = _measure('detail', html, _detail_parser(_config['backend']))
+    if lines is None:
+        return {}
+
+    # 改行を保持したまま取得
+    # 1. 不要な空白行を削除
+    # 2. 意味のある改行は保持
+    return {
+        "detail_description": '\n'.join(lines),
+        "crawled_detail_at": datetime.now().isoformat()
+    }
+
+def _without_timestamps(jobs: List[Dict]) -> List[Dict]:
+    """比較用に取得日時を除外"""
+    return [{k: v for k, v in job.items() if k != 'crawled_at'} for job in jobs]
+
+def compare_backends(html: str, kind: str = 'cards', repeat: int = 5) -> Dict[str, Dict]:
+    """
+    利用可能な全バックエンドで同じHTMLを解析し、解析時間・メモリ使用量と結果の一致を比較する
+
+    Args:
+        html: 一覧ページ（kind='cards'）または詳細ページ（kind='detail'）のHTML
+        kind: 'cards' または 'detail'
+        repeat: 解析時間を計測する回数
+
+    Returns:
+        バックエンドごとの avg_ms, peak_kb, identical（html.parserの結果と一致するか）
+    """
+    make_parser = _card_parser if kind == 'cards' else _detail_parser
+    baseline = None
+    results = {}
+    for backend in _available_backends():
+        parse = make_parser(backend)
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            parsed = parse(html)
+            timings.append((time.perf_counter() - start_time) * 1000)
+
+        tracemalloc.start()
+        parse(html)
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+        if kind == 'cards':
+            parsed = _without_timestamps(parsed)
+        if baseline is None:
+            baseline = parsed
+        results[backend] = {
+            'avg_ms': round(sum(timings) / len(timings), 2),
+            'peak_kb': round(peak_kb, 1),
+            'identical': parsed == baseline
+        }
+    return results
+
+# バックエンド間の抽出結果の一致を確認するためのHTML
+# （複数クラスを持つ要素、入れ子の要素、script要素、省略された項目、後続の兄弟要素を含む）
+SAMPLE_CARDS_HTML = """
+<html><body><div class="list">
+  <div class="UNzN7 foo"><h3 class="iCeus"><a href="/public/jobs/1">案件 <b>その1</b></a></h3>
+    <span class="Yh37y">10,000円</span><a class="uxHdW">クライアントA</a><time datetime="2024-01-01T00:00:00">1日前</time></div>
+  <div class="bar UNzN7"><h3 class="iCeus extra"><a href="/public/jobs/2">案件その2<script>var a = 1;</script></a></h3>
+    <span class="Yh37y">5,000円 〜 8,000円</span><a class="uxHdW">クライアントB</a></div>
+  <div class="UNzN7"><h3 class="iCeus"><a href="/public/jobs/3">案件その3</a></h3></div>
+  <div class="UNzN7x"><h3 class="iCeus"><a href="/public/jobs/4">対象外</a></h3></div>
+</div></body></html>
+"""
+
+SAMPLE_DETAIL_HTML = """
+<html><body>
+  <table class="job_offer_detail_table wide"><tr><th>概要</th><td>本文 <b>強調</b><style>td { color: red; }</style></td></tr></table>
+  <p>表の後の段落</p>
+</body></html>
+"""
+
+def check_backends() -> bool:
+    """組み込みのHTMLで、利用可能な全バックエンドの抽出結果がhtml.parserと一致するかを確認"""
+    identical = True
+    for kind, html in (('cards', SAMPLE_CARDS_HTML), ('detail', SAMPLE_DETAIL_HTML)):
+        for name, result in compare_backends(html, kind, repeat=1).items():
+            print(f"{kind:6s} {name:12s} 一致: {result['identical']}")
+            identical = identical and result['identical']
+    return identical
+
+if __name__ == "__main__":
+    # 組み込みのHTMLでバックエンド間の一致を確認する: python job_extractor.py --check
+    if sys.argv[1:2] == ['--check']:
+        sys.exit(0 if check_backends() else 1)
+    # 保存したHTMLでバックエンドを比較する: python job_extractor.py page.html [cards|detail]
+    if len(sys.argv) < 2:
+        print("使い方: python job_extractor.py <HTMLファイル> [cards|detail] | --check")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        page_html = f.read()
+    for name, result in compare_backends(page_html, sys.argv[2] if len(sys.argv) > 2 else 'cards').items():
+        print(f"{name:12s} 平均{result['avg_ms']:8.2f}ms  最大メモリ{result['peak_kb']:8.1f}KB  一致: {result['identical']}")
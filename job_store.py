@@ -0,0 +1,202 @@
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+# 案件データファイルの拡張子（JSONLは追記形式、JSONは従来の配列形式）
+JSONL_SUFFIX = '.jsonl'
+JSON_SUFFIX = '.json'
+
+# フィルタリング済みデータのファイル名の接尾辞
+FILTERED_MARK = '_filtered'
+
+# 書き込み設定の既定値（設定の job_store で上書き可能）
+DEFAULT_JOB_STORE_CONFIG = {
+    'fsync_every_records': 20,      # この件数を追記するごとにディスクへ同期する
+    'fsync_interval_seconds': 2.0   # 前回の同期からこの秒数が経過した場合も同期する
+}
+
+def get_config(settings: Dict) -> Dict:
+    """設定から案件データの書き込み設定を取得"""
+    return {**DEFAULT_JOB_STORE_CONFIG, **(settings.get('job_store') or {})}
+
+def filtered_path(base_filename: str) -> str:
+    """生データのファイル名から対応するフィルタリング済みデータのファイル名を返す"""
+    root, ext = os.path.splitext(base_filename)
+    return f"{root}{FILTERED_MARK}{ext}"
+
+def raw_path(filtered_filename: str) -> str:
+    """フィルタリング済みデータのファイル名から対応する生データのファイル名を返す"""
+    root, ext = os.path.splitext(filtered_filename)
+    if root.endswith(FILTERED_MARK):
+        root = root[:-len(FILTERED_MARK)]
+    return f"{root}{ext}"
+
+def is_job_file(path: str) -> bool:
+    """案件データファイル（.json または .jsonl）かどうか"""
+    return path.endswith(JSON_SUFFIX) or path.endswith(JSONL_SUFFIX)
+
+def is_filtered(path: str) -> bool:
+    """フィルタリング済みデータのファイルかどうか"""
+    return is_job_file(path) and os.path.splitext(path)[0].endswith(FILTERED_MARK)
+
+def list_files(directory, filtered: Optional[bool] = None) -> List[str]:
+    """
+    ディレクトリ内の案件データファイル（jobs_*.json / jobs_*.jsonl）の一覧
+
+    Args:
+        filtered: Trueでフィルタリング済みのみ、Falseで生データのみ、Noneで両方
+    """
+    paths = []
+    for suffix in (JSON_SUFFIX, JSONL_SUFFIX):
+        paths.extend(glob.glob(os.path.join(str(directory), f'jobs_*{suffix}')))
+    if filtered is not None:
+        paths = [path for path in paths if is_filtered(path) == filtered]
+    return paths
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """
+    案件データファイルのレコードを1件ずつ返す
+
+    JSONLは1行ずつ読み込むため、ファイルが大きくてもメモリ使用量は一定。
+    書き込み途中の最終行など解析できない行は読み飛ばす。
+    従来のJSON配列のファイルはまとめて読み込んでから1件ずつ返す。
+
+    Raises:
+        json.JSONDecodeError: JSON配列のファイルが破損している場合
+    """
+    if not path.endswith(JSONL_SUFFIX):
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        for record in records if isinstance(records, list) else []:
+            if isinstance(record, dict):
+                yield record
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"案件データの解析できない行を読み飛ばします: {path}:{line_number}")
+                continue
+            if isinstance(record, dict):
+                yield record
+
+def load_records(path: str) -> List[Dict]:
+    """案件データファイルの全レコードを読み込む"""
+    return list(iter_records(path))
+
+def count_records(path: str) -> int:
+    """案件データファイルのレコード数（JSONLは空行以外の行数を数え、解析はしない）"""
+    if not path.endswith(JSONL_SUFFIX):
+        return len(load_records(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+class JsonlWriter:
+    """
+    案件を1件ずつJSONLファイルに追記するライター
+
+    追記ごとにOSへ書き出し（他のプロセスからすぐ読める）、
+    一定件数または一定時間ごとにfsyncしてクラッシュ時に失うデータを抑える。
+    複数のスレッドから呼び出してもよい。
+    """
+
+    def __init__(self, path: str, config: Dict = None, truncate: bool = False):
+        """
+        Args:
+            path: 書き込むファイルのパス
+            config: get_config() の戻り値
+            truncate: Trueの場合は既存の内容を消して書き直す
+        """
+        config = config or DEFAULT_JOB_STORE_CONFIG
+        self.path = path
+        self.fsync_every = max(1, int(config['fsync_every_records']))
+        self.fsync_interval = max(0.0, float(config['fsync_interval_seconds']))
+        self.count = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if not truncate and os.path.exists(path) and os.path.getsize(path) > 0:
+            # 前回の書き込みが行の途中で途切れていても、次の行と混ざらないようにする
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+            self._file = open(path, 'a', encoding='utf-8')
+            if torn:
+                self._file.write('\n')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+    def append(self, record: Dict):
+        """1件追記する"""
+        self.extend([record])
+
+    def extend(self, records: Iterable[Dict]):
+        """複数件をまとめて追記する（1件ずつ書き出すため、全体を1つの文字列にはしない）"""
+        with self._lock:
+            added = 0
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                added += 1
+            if not added:
+                return
+            self._file.flush()
+            self.count += added
+            self._unsynced += added
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._synced_at >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        """未同期の内容をディスクに同期してファイルを閉じる"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            if self._unsynced:
+                self._sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def write_records(path: str, records: Iterable[Dict], config: Dict = None) -> int:
+    """
+    案件をファイルに書き直す（既存の内容は置き換える）
+
+    .jsonl はJSONLで書き込み、従来の .json のファイルは形式を変えずにJSON配列で書き込む。
+
+    Returns:
+        書き込んだ件数
+    """
+    if path.endswith(JSONL_SUFFIX):
+        with JsonlWriter(path, config, truncate=True) as writer:
+            writer.extend(records)
+            return writer.count
+    records = list(records)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return len(records)
@@ -0,0 +1,143 @@
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import job_extractor
+import rate_limiter
+
+# Seleniumと同じUser-Agentを使用
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 1ページあたりのリクエストタイムアウト（秒）
+REQUEST_TIMEOUT = 10
+
+# 取得するページ数の上限（max_itemsに達しない場合の安全策）
+MAX_PAGES = 50
+
+# 429を受けた場合に、Retry-Afterの待機後に再取得する回数
+RATE_LIMIT_RETRIES = 1
+
+class ListingFetcher:
+    """requestsのコネクションプールを使って案件一覧ページを取得するクラス"""
+
+    def __init__(self, search_url: str):
+        """
+        Args:
+            search_url: 案件検索ページのURL（?order=new などのクエリを含む）
+        """
+        self.search_url = search_url
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml',
+            'Accept-Language': 'ja,en;q=0.8'
+        })
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.page_timings = []
+
+    def load_cookies_from_driver(self, driver):
+        """ブラウザのセッションCookieをrequestsのセッションに引き継ぐ"""
+        try:
+            for cookie in driver.get_cookies():
+                self.session.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain'),
+                    path=cookie.get('path', '/')
+                )
+        except Exception as e:
+            logger.warning(f"ブラウザのCookieの引き継ぎに失敗: {str(e)}")
+
+    def page_url(self, page: int) -> str:
+        """ページ番号に対応する一覧ページのURLを生成"""
+        if page <= 1:
+            return self.search_url
+        separator = '&' if '?' in self.search_url else '?'
+        return f"{self.search_url}{separator}page={page}"
+
+    def fetch_page(self, page: int) -> str:
+        """一覧ページのHTMLを取得"""
+        url = self.page_url(page)
+        limiter = rate_limiter.site_limiter(url)
+        for _ in range(RATE_LIMIT_RETRIES + 1):
+            limiter.acquire()
+            start_time = time.monotonic()
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+            if response.status_code != 429:
+                break
+            # 次のacquire()がRetry-Afterの間待機する
+            limiter.report_rate_limited(rate_limiter.parse_retry_after(response.headers.get('Retry-After')))
+        response.raise_for_status()
+        limiter.report_success()
+        elapsed_ms = (time.monotonic() - start_time) * 1000
+        self.page_timings.append(elapsed_ms)
+        logger.info(f"一覧ページ {page} をHTTPで取得しました（{elapsed_ms:.0f}ms, {len(response.content)}バイト）")
+        return response.text
+
+    def iter_pages(self, max_items: int,
+                   stop_when: Optional[Callable[[List[Dict]], bool]] = None) -> Iterator[List[Dict]]:
+        """
+        一覧ページを順に取得し、ページごとに案件情報を返す
+
+        Args:
+            max_items: 最大取得件数
+            stop_when: ページごとの案件リストを受け取り、Trueを返した場合にページ送りを止める関数
+
+        Yields:
+            1ページ分の案件情報リスト。1ページ目から案件を抽出できない場合
+            （サーバーサイドで描画されていない等）は何も返さない
+        """
+        total = 0
+        seen_urls = set()
+        page = 1
+        while total < max_items and page <= MAX_PAGES:
+            try:
+                html = self.fetch_page(page)
+            except requests.RequestException as e:
+                if page == 1:
+                    raise
+                # 2ページ目以降の失敗は取得済みの案件で打ち切る
+                logger.warning(f"一覧ページ {page} の取得に失敗したため打ち切ります: {str(e)}")
+                break
+            page_jobs = job_extractor.extract_job_cards(html)
+            if not page_jobs and page == 1:
+                logger.warning("HTTP取得した一覧ページから案件を抽出できませんでした")
+                return
+
+            # ページ指定が無視された場合に同じ案件を繰り返し取得しないようにする
+            new_jobs = [job for job in page_jobs if job['url'] not in seen_urls]
+            if not new_jobs:
+                logger.info("最後のページに到達しました")
+                break
+            seen_urls.update(job['url'] for job in new_jobs)
+            new_jobs = new_jobs[:max_items - total]
+            total += len(new_jobs)
+            yield new_jobs
+            if stop_when and stop_when(new_jobs):
+                break
+            page += 1
+
+        if self.page_timings:
+            average = sum(self.page_timings) / len(self.page_timings)
+            logger.info(f"HTTPでの一覧取得: {len(self.page_timings)}ページ, 平均{average:.0f}ms/ページ")
+
+    def fetch_jobs(self, max_items: int, stop_when: Optional[Callable[[List[Dict]], bool]] = None) -> Optional[List[Dict]]:
+        """
+        一覧ページを順に取得して案件情報を抽出する
+
+        Returns:
+            案件情報リスト。1ページ目から案件を抽出できない場合はNone
+        """
+        jobs = [job for page_jobs in self.iter_pages(max_items, stop_when) for job in page_jobs]
+        return jobs or None
+
+    def close(self):
+        """セッションを閉じる"""
+        self.session.close()
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from fix_settings_patch import get_app_paths
+
+# キャッシュDBのパス
+CACHE_DB_FILE = get_app_paths()['data_dir'] / 'crawled_data' / 'llm_verdicts.sqlite3'
+
+# キャッシュ設定の既定値（設定の llm_cache で上書き可能）
+DEFAULT_CACHE_CONFIG = {
+    'enabled': True,
+    'max_entries': 50000,
+    'max_age_days': 30
+}
+
+# 書き込みがこの件数に達するごとに退避処理を行う
+EVICT_EVERY_PUTS = 500
+
+def make_key(prompt: str, model: str, job: Dict) -> str:
+    """フィルター条件・モデル・案件内容からキャッシュキーを生成"""
+    payload = json.dumps([
+        prompt,
+        model,
+        job.get('title', ''),
+        job.get('budget', ''),
+        job.get('client', ''),
+        job.get('detail_description') or job.get('description', '')
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class VerdictCache:
+    """LLMの審査結果をSQLiteに保存する永続キャッシュ"""
+
+    def __init__(self, db_path: Path = CACHE_DB_FILE, max_entries: int = DEFAULT_CACHE_CONFIG['max_entries'],
+                 max_age_days: float = DEFAULT_CACHE_CONFIG['max_age_days']):
+        """
+        Args:
+            db_path: キャッシュDBのパス
+            max_entries: 保持する最大件数（超過分は最終利用が古い順に削除）
+            max_age_days: 保持期間（日）
+        """
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                decision TEXT NOT NULL,
+                reason TEXT,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_last_used ON verdicts(last_used_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.evict()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """
+        複数のキーをまとめて参照する
+
+        Returns:
+            キャッシュに存在したキーをキーとした審査結果
+        """
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            # SQLiteのパラメータ数上限を避けるため分割して問い合わせる
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, decision, reason FROM verdicts WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, decision, reason in rows:
+                    found[key] = {'decision': decision, 'reason': reason or ''}
+            if found:
+                self._conn.executemany(
+                    "UPDATE verdicts SET last_used_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+            self._increment_counters(hits, len(keys) - hits)
+            self._conn.commit()
+        return found
+
+    def get(self, key: str) -> Optional[Dict]:
+        """1件のキーを参照する"""
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, result: Dict):
+        """審査結果を保存する（yes/no以外の結果は保存しない）"""
+        if result.get('decision') not in ('yes', 'no'):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, decision, reason, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, result['decision'], result.get('reason', ''), now, now)
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            should_evict = self._puts_since_evict >= EVICT_EVERY_PUTS
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """保持期間を過ぎたエントリと上限件数を超えたエントリを削除"""
+        with self._lock:
+            cutoff = time.time() - self.max_age_days * 86400
+            deleted = self._conn.execute("DELETE FROM verdicts WHERE created_at < ?", (cutoff,)).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            if count > self.max_entries:
+                deleted += self._conn.execute(
+                    "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY last_used_at ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+            self._puts_since_evict = 0
+        if deleted:
+            logger.info(f"LLM判定キャッシュから{deleted}件を削除しました")
+        return deleted
+
+    def _increment_counters(self, hits: int, misses: int):
+        """累計のヒット数・ミス数を更新（ロック取得済みの状態で呼び出す）"""
+        for name, value in (('hits', hits), ('misses', misses)):
+            if value:
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, value)
+                )
+
+    def stats(self) -> Dict:
+        """キャッシュの統計情報を取得"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            totals = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = self.hits + self.misses
+        total_lookups = totals.get('hits', 0) + totals.get('misses', 0)
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+            'total_hit_rate': totals.get('hits', 0) / total_lookups if total_lookups else 0.0,
+            'max_entries': self.max_entries,
+            'max_age_days': self.max_age_days
+        }
+
+# シングルトンインスタンス
+_instance = None
+
+def get_cache(settings: Dict) -> Optional[VerdictCache]:
+    """設定に応じてVerdictCacheのシングルトンインスタンスを取得（無効時はNone）"""
+    global _instance
+    config = {**DEFAULT_CACHE_CONFIG, **(settings.get('llm_cache') or {})}
+    if not config['enabled']:
+        return None
+    if _instance is None:
+        try:
+            _instance = VerdictCache(
+                max_entries=int(config['max_entries']),
+                max_age_days=float(config['max_age_days'])
+            )
+        except Exception as e:
+            logger.error(f"LLM判定キャッシュの初期化に失敗: {str(e)}")
+            return None
+    return _instance
@@ -0,0 +1,513 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+from openai import OpenAI
+
+import llm_cache
+import llm_usage
+import rate_limiter
+
+# DeepseekのAPIエンドポイント
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+# プロバイダごとの同時実行数の既定値（設定の llm_concurrency で上書き可能）
+DEFAULT_PROVIDER_CONCURRENCY = {
+    'openai': 8,
+    'deepseek': 4
+}
+
+# バッチ審査の既定値（設定の llm_batch_size / llm_batch_token_budget で上書き可能）
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_BATCH_TOKEN_BUDGET = 2000
+
+# バッチ審査で1件あたりに確保する出力トークン数
+BATCH_OUTPUT_TOKENS_PER_JOB = 80
+
+# max_tokensを指定しない呼び出しでレート制限用に見込む出力トークン数
+DEFAULT_OUTPUT_TOKEN_ESTIMATE = 1000
+
+# API呼び出しのリトライ設定の既定値（設定の llm_retry で上書き可能）
+DEFAULT_RETRY_CONFIG = {
+    'max_attempts': 4,       # 1回の呼び出しあたりの最大試行回数
+    'base_delay': 1.0,       # 最初の再試行までの待機（秒）。以降は試行ごとに倍にする
+    'max_delay': 30.0,       # 再試行までの待機の上限（秒）
+    'timeout': 30.0,         # 1回の呼び出しのタイムアウト（秒）
+    'max_error_rate': 0.2    # 後回しにした再審査の後も失敗した案件の割合がこれを超えたら中断する
+}
+
+# 再試行しても結果が変わらないエラーのHTTPステータス（リクエスト不正・認証エラーなど）
+NON_RETRYABLE_STATUS = (400, 401, 403, 404, 422)
+
+# 案件審査用のシステムプロンプト
+JOB_SYSTEM_PROMPT = """あなたは案件の審査員です。与えられた条件に基づいて、案件を評価してください。
+レスポンスは以下のJSON形式で返してください：
+{
+    "decision": "yes" or "no",
+    "reason": "判断理由を1文で"
+}"""
+
+# 複数案件を一括審査するためのシステムプロンプト
+BATCH_SYSTEM_PROMPT = """あなたは案件の審査員です。与えられた条件に基づいて、複数の案件をそれぞれ評価してください。
+レスポンスは以下のJSON形式で、全ての案件について返してください：
+{
+    "results": [
+        {"id": 案件ID, "decision": "yes" or "no", "reason": "判断理由を1文で"}
+    ]
+}"""
+
+class LLMCallError(Exception):
+    """LLM API呼び出しの失敗を示す例外"""
+    def __init__(self, message, job=None):
+        super().__init__(message)
+        self.job = job
+
+class LLMErrorRateExceeded(LLMCallError):
+    """再試行後も失敗した案件の割合が許容値を超えた"""
+
+def get_provider(model: str) -> str:
+    """モデル名からプロバイダ名を判定"""
+    if model and model.startswith('deepseek'):
+        return 'deepseek'
+    return 'openai'
+
+def create_client(model: str, settings: Dict) -> OpenAI:
+    """モデルに応じたOpenAI互換クライアントを生成"""
+    # 再試行は create_chat_completion で行うため、クライアント側の自動リトライは無効にする
+    if get_provider(model) == 'deepseek':
+        return OpenAI(
+            api_key=settings.get('deepseek_api_key', ''),
+            base_url=DEEPSEEK_BASE_URL,
+            max_retries=0
+        )
+    return OpenAI(
+        api_key=settings.get('api_key', ''),
+        max_retries=0
+    )
+
+def get_retry_config(settings: Dict) -> Dict:
+    """設定からAPI呼び出しのリトライ設定を取得"""
+    return {**DEFAULT_RETRY_CONFIG, **(settings.get('llm_retry') or {})}
+
+def is_retryable(error: Exception) -> bool:
+    """再試行で解消する可能性のあるエラーか（タイムアウト・接続エラー・429・5xxなど）"""
+    response = getattr(error, 'response', None)
+    status_code = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    return status_code not in NON_RETRYABLE_STATUS
+
+def backoff_delay(attempt: int, retry: Dict, retry_after: Optional[float] = None) -> float:
+    """
+    再試行までの待機秒数（指数バックオフ＋ジッター）
+
+    同時に失敗した呼び出しが一斉に再試行しないよう、上限の半分から上限までの間でランダムにずらす。
+    429でRetry-Afterが指定されている場合はそれより短くしない。
+    """
+    cap = min(float(retry['max_delay']), float(retry['base_delay']) * (2 ** attempt))
+    delay = random.uniform(cap / 2, cap)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def create_chat_completion(client: OpenAI, model: str, messages: List[Dict],
+                           max_tokens: Optional[int] = None, retry: Optional[Dict] = None,
+                           on_retry: Optional[Callable[[], None]] = None, purpose: str = 'other', **kwargs):
+    """
+    プロバイダのレート制限を守ってChat Completions APIを呼び出す
+
+    送信前にリクエスト数とトークン数（入力の概算＋max_tokens）の枠を確保し、
+    429を受けた場合はRetry-Afterに従って同じプロバイダへの送信をまとめて止める。
+    タイムアウトや一時的なエラーは指数バックオフで再試行する。
+    呼び出しごとの応答時間・トークン数・エラーは llm_usage に記録する。
+
+    Args:
+        retry: get_retry_config() の戻り値（省略時は既定値）
+        on_retry: 再試行するたびに呼び出す関数（統計用）
+        purpose: 利用状況を集計する用途名（filter / filter_batch / application など）
+    """
+    retry = retry or DEFAULT_RETRY_CONFIG
+    limiter = rate_limiter.llm_limiter(get_provider(model))
+    estimated = sum(estimate_tokens(message['content']) for message in messages)
+    estimated += max_tokens or DEFAULT_OUTPUT_TOKEN_ESTIMATE
+    if max_tokens is not None:
+        kwargs['max_tokens'] = max_tokens
+    kwargs.setdefault('timeout', float(retry['timeout']))
+    attempts = max(1, int(retry['max_attempts']))
+    for attempt in range(attempts):
+        limiter.acquire(estimated)
+        start_time = time.monotonic()
+        try:
+            response = client.chat.completions.create(model=model, messages=messages, **kwargs)
+            llm_usage.record_call(model, purpose, time.monotonic() - start_time,
+                                  usage=getattr(response, 'usage', None))
+            break
+        except Exception as e:
+            llm_usage.record_call(model, purpose, time.monotonic() - start_time, error=e)
+            retry_after = rate_limiter.retry_after_from_error(e)
+            if retry_after is not None:
+                limiter.report_rate_limited(retry_after)
+            if attempt + 1 >= attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, retry, retry_after)
+            logger.warning(
+                f"LLM APIの呼び出しに失敗したため、{delay:.1f}秒後に再試行します"
+                f"（{attempt + 1}/{attempts - 1}回目）: {e}"
+            )
+            if on_retry:
+                on_retry()
+            time.sleep(delay)
+    limiter.report_success()
+    usage = getattr(response, 'usage', None)
+    if getattr(usage, 'total_tokens', None):
+        limiter.adjust_tokens(usage.total_tokens - estimated)
+    return response
+
+def get_max_workers(model: str, settings: Dict) -> int:
+    """設定からプロバイダごとの同時実行数を取得"""
+    provider = get_provider(model)
+    concurrency = settings.get('llm_concurrency') or {}
+    try:
+        value = int(concurrency.get(provider, DEFAULT_PROVIDER_CONCURRENCY[provider]))
+    except (TypeError, ValueError):
+        logger.warning(f"llm_concurrencyの値が不正です: {concurrency}")
+        value = DEFAULT_PROVIDER_CONCURRENCY[provider]
+    return max(1, value)
+
+def get_batch_options(settings: Dict) -> Dict:
+    """設定からバッチ審査のオプションを取得"""
+    try:
+        batch_size = int(settings.get('llm_batch_size', DEFAULT_BATCH_SIZE))
+        token_budget = int(settings.get('llm_batch_token_budget', DEFAULT_BATCH_TOKEN_BUDGET))
+    except (TypeError, ValueError):
+        logger.warning("llm_batch_size / llm_batch_token_budget の値が不正なため既定値を使用します")
+        batch_size, token_budget = DEFAULT_BATCH_SIZE, DEFAULT_BATCH_TOKEN_BUDGET
+    return {
+        'batch_size': max(1, batch_size),
+        'batch_token_budget': max(1, token_budget)
+    }
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（日本語は1文字1トークン、ASCIIは4文字1トークンとみなす）"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+def format_job_for_batch(job_id: int, job: Dict) -> str:
+    """バッチ審査用に案件を1行のテキストに変換"""
+    return (
+        f"ID: {job_id} | タイトル: {job.get('title', 'N/A')} | "
+        f"予算: {job.get('budget', 'N/A')} | クライアント: {job.get('client', 'N/A')}"
+    )
+
+def split_batches(jobs: List[Dict], batch_size: int, token_budget: int) -> List[List[int]]:
+    """
+    案件を件数とトークン予算の両方を満たすバッチに分割する
+
+    Returns:
+        各バッチに含まれる案件インデックスのリスト
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for index, job in enumerate(jobs):
+        tokens = estimate_tokens(format_job_for_batch(len(current) + 1, job))
+        if current and (len(current) >= batch_size or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def build_batch_messages(jobs: List[Dict], prompt: str) -> List[Dict]:
+    """複数の案件を一括審査するためのメッセージを作成（IDは1始まりの連番）"""
+    job_lines = '\n'.join(format_job_for_batch(job_id, job) for job_id, job in enumerate(jobs, 1))
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""
+以下の各案件が条件を満たすか判断してください。条件: {prompt}
+
+案件一覧:
+{job_lines}
+            """}
+    ]
+
+def parse_batch_response(content: str, count: int) -> Dict[int, Dict]:
+    """
+    バッチ審査のレスポンスを解析する
+
+    Returns:
+        案件ID（1始まり）をキーとした審査結果。解析できなかった案件は含まれない
+    """
+    data = json.loads(content)
+    if isinstance(data, dict):
+        items = data.get('results')
+        if items is None:
+            # キー名が異なる場合は最初に見つかった配列を使用
+            items = next((value for value in data.values() if isinstance(value, list)), [])
+    else:
+        items = data
+    if not isinstance(items, list):
+        raise ValueError("バッチ審査のレスポンスに結果の配列がありません")
+
+    parsed = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            job_id = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        decision = str(item.get('decision', '')).strip().lower()
+        if 1 <= job_id <= count and decision in ('yes', 'no'):
+            parsed[job_id] = {'decision': decision, 'reason': item.get('reason', '')}
+    return parsed
+
+def parse_job_response(content: str) -> Dict:
+    """
+    1件の審査のレスポンスを解析する
+
+    Raises:
+        ValueError: JSONとして解析できない、またはdecisionがyes / no以外の場合
+            （不正な回答を不採用として扱ったり、キャッシュしたりしない）
+    """
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("審査のレスポンスがJSONオブジェクトではありません")
+    decision = str(data.get('decision', '')).strip().lower()
+    if decision not in ('yes', 'no'):
+        raise ValueError(f"審査のレスポンスのdecisionが不正です: {data.get('decision')!r}")
+    return {'decision': decision, 'reason': data.get('reason', '')}
+
+def build_job_messages(job: Dict, prompt: str) -> List[Dict]:
+    """1件の案件を審査するためのメッセージを作成"""
+    return [
+        {"role": "system", "content": JOB_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""
+以下の案件が条件を満たすか判断してください。条件: {prompt}
+
+案件情報:
+タイトル: {job.get('title', 'N/A')}
+予算: {job.get('budget', 'N/A')}
+クライアント: {job.get('client', 'N/A')}
+            """}
+    ]
+
+class LLMFilterEngine:
+    """同時実行数を制限してLLMによる案件審査を並列実行するエンジン"""
+
+    def __init__(self, client: OpenAI, config: Dict, max_workers: int = 1,
+                 batch_size: int = 1, batch_token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+                 cache: Optional[llm_cache.VerdictCache] = None, retry_config: Optional[Dict] = None):
+        """
+        Args:
+            client: OpenAI互換クライアント
+            config: フィルタリング設定（model, prompt, temperature）
+            max_workers: 同時に発行するAPI呼び出しの上限
+            batch_size: 1回のリクエストにまとめる案件数の上限（1なら案件ごとに問い合わせ）
+            batch_token_budget: 1回のリクエストに含める案件情報のトークン数の上限
+            cache: 審査結果の永続キャッシュ（Noneの場合は常にAPIに問い合わせる）
+            retry_config: API呼び出しのリトライ設定（get_retry_config() の戻り値）
+        """
+        self.client = client
+        self.config = config
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_token_budget = batch_token_budget
+        self.cache = cache
+        self.retry_config = retry_config or dict(DEFAULT_RETRY_CONFIG)
+        self.stats = {
+            'total': 0,
+            'completed': 0,
+            'cache_hits': 0,
+            'requests': 0,
+            'batch_fallbacks': 0,
+            'retries': 0,
+            'deferred': 0,
+            'errors': 0,
+            'elapsed': 0.0,
+            'throughput': 0.0
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, value: int = 1):
+        """ワーカースレッドから統計値を加算"""
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def judge(self, job: Dict) -> Dict:
+        """1件の案件をLLMで審査し、decisionとreasonを返す"""
+        try:
+            self._count('requests')
+            response = create_chat_completion(
+                self.client,
+                self.config['model'],
+                build_job_messages(job, self.config['prompt']),
+                purpose='filter',
+                temperature=self.config.get('temperature', 0),
+                max_tokens=100,
+                retry=self.retry_config,
+                on_retry=lambda: self._count('retries'),
+                response_format={"type": "json_object"}
+            )
+            # yes / no 以外の回答はエラーとして扱い、再審査の対象にする
+            return parse_job_response(response.choices[0].message.content)
+        except Exception as e:
+            raise LLMCallError(f"{job.get('title', 'N/A')}: {e}", job=job) from e
+
+    def _judge_or_error(self, job: Dict, fail_fast: bool) -> Dict:
+        """1件を審査し、fail_fastでない場合は失敗を審査結果として返す"""
+        try:
+            return self.judge(job)
+        except LLMCallError as e:
+            if fail_fast:
+                raise
+            logger.error(f"LLM審査に失敗: {e}")
+            return {'decision': 'error', 'reason': str(e)}
+
+    def judge_batch(self, jobs: List[Dict], fail_fast: bool = True) -> List[Dict]:
+        """
+        複数の案件を1回のリクエストで審査する
+
+        レスポンスを解析できなかった案件は案件ごとの問い合わせにフォールバックする
+        """
+        if len(jobs) == 1:
+            return [self._judge_or_error(jobs[0], fail_fast)]
+
+        parsed = {}
+        try:
+            self._count('requests')
+            response = create_chat_completion(
+                self.client,
+                self.config['model'],
+                build_batch_messages(jobs, self.config['prompt']),
+                purpose='filter_batch',
+                temperature=self.config.get('temperature', 0),
+                max_tokens=BATCH_OUTPUT_TOKENS_PER_JOB * len(jobs),
+                retry=self.retry_config,
+                on_retry=lambda: self._count('retries'),
+                response_format={"type": "json_object"}
+            )
+            parsed = parse_batch_response(response.choices[0].message.content, len(jobs))
+        except Exception as e:
+            logger.warning(f"バッチ審査のレスポンスを解析できませんでした（{len(jobs)}件）: {e}")
+
+        missing = [job_id for job_id in range(1, len(jobs) + 1) if job_id not in parsed]
+        if missing:
+            self._count('batch_fallbacks', len(missing))
+            logger.warning(f"バッチ審査で結果が得られなかった{len(missing)}件を個別に審査します")
+            for job_id in missing:
+                parsed[job_id] = self._judge_or_error(jobs[job_id - 1], fail_fast)
+
+        return [parsed[job_id] for job_id in range(1, len(jobs) + 1)]
+
+    def run(self, jobs: List[Dict], fail_fast: bool = True, max_error_rate: Optional[float] = None) -> List[Dict]:
+        """
+        案件リストをバッチに分割して並列に審査する
+
+        Args:
+            jobs: 審査対象の案件リスト
+            fail_fast: Trueの場合は最初の失敗で中断し、Falseの場合は失敗した案件を
+                後回しにして最後に1件ずつ再審査し、それでも失敗した案件のdecisionを'error'として返す
+            max_error_rate: fail_fastでない場合に、APIに問い合わせた案件のうち
+                失敗した案件の割合がこれを超えたら中断する（Noneの場合は中断しない）
+
+        Returns:
+            入力と同じ順序の審査結果リスト
+
+        Raises:
+            LLMCallError: fail_fastが有効で、いずれかのAPI呼び出しに失敗した場合
+            LLMErrorRateExceeded: 失敗した案件の割合がmax_error_rateを超えた場合
+        """
+        total = len(jobs)
+        self.stats.update({
+            'total': total, 'completed': 0, 'cache_hits': 0, 'requests': 0, 'batch_fallbacks': 0,
+            'retries': 0, 'deferred': 0, 'errors': 0
+        })
+        results = [None] * total
+        start_time = time.monotonic()
+
+        # キャッシュ済みの案件はAPIに問い合わせない
+        keys = []
+        pending = list(range(total))
+        if self.cache is not None:
+            keys = [llm_cache.make_key(self.config['prompt'], self.config['model'], job) for job in jobs]
+            cached = self.cache.get_many(keys)
+            pending = []
+            for index, key in enumerate(keys):
+                if key in cached:
+                    results[index] = cached[key]
+                else:
+                    pending.append(index)
+            self.stats['cache_hits'] = total - len(pending)
+            self.stats['completed'] = self.stats['cache_hits']
+            if self.stats['cache_hits']:
+                logger.info(f"LLM判定キャッシュにヒット: {self.stats['cache_hits']}/{total}件")
+
+        pending_jobs = [jobs[i] for i in pending]
+        batches = [
+            [pending[i] for i in batch]
+            for batch in split_batches(pending_jobs, self.batch_size, self.batch_token_budget)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.judge_batch, [jobs[i] for i in batch], fail_fast): batch
+                for batch in batches
+            }
+            try:
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    for index, result in zip(batch, future.result()):
+                        results[index] = result
+                        if self.cache is not None and result['decision'] != 'error':
+                            self.cache.put(keys[index], result)
+                    self.stats['completed'] += len(batch)
+                    logger.info(f"案件 {self.stats['completed']}/{total} の審査完了")
+            except LLMCallError:
+                # 未着手の呼び出しを取り消してから失敗を伝える
+                for pending_future in futures:
+                    pending_future.cancel()
+                raise
+
+        if not fail_fast:
+            self._retry_deferred(jobs, results, pending, keys)
+            errors = self.stats['errors']
+            if errors:
+                logger.warning(f"LLM審査に失敗した案件: {errors}/{len(pending)}件")
+            if max_error_rate is not None and pending and errors / len(pending) > max_error_rate:
+                raise LLMErrorRateExceeded(
+                    f"LLM審査の失敗率が許容値を超えました（{errors}/{len(pending)}件, 許容値 {max_error_rate:.0%}）"
+                )
+
+        elapsed = time.monotonic() - start_time
+        self.stats['elapsed'] = elapsed
+        self.stats['throughput'] = total / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"LLM審査の処理時間: {elapsed:.2f}秒 "
+            f"（{self.stats['throughput']:.2f}件/秒, 同時実行数: {self.max_workers}, "
+            f"キャッシュヒット: {self.stats['cache_hits']}件, "
+            f"リクエスト数: {self.stats['requests']}, 個別フォールバック: {self.stats['batch_fallbacks']}件, "
+            f"再試行: {self.stats['retries']}回, 後回し: {self.stats['deferred']}件）"
+        )
+        return results
+
+    def _retry_deferred(self, jobs: List[Dict], results: List[Dict], pending: List[int], keys: List[str]):
+        """
+        失敗した案件を後回しキューに入れ、他の案件の審査が終わった後に1件ずつ再審査する
+
+        一時的な障害が続いている間に再試行を使い切った案件も、時間をおくことで救済できる。
+        """
+        deferred = [index for index in pending if results[index]['decision'] == 'error']
+        self.stats['deferred'] = len(deferred)
+        if deferred:
+            logger.info(f"審査に失敗した{len(deferred)}件を後回しにして再審査します")
+            time.sleep(backoff_delay(0, self.retry_config))
+        for index in deferred:
+            result = self._judge_or_error(jobs[index], fail_fast=False)
+            results[index] = result
+            if result['decision'] == 'error':
+                self.stats['errors'] += 1
+            elif self.cache is not None:
+                self.cache.put(keys[index], result)
@@ -0,0 +1,278 @@
+import json
+import math
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+import job_store
+from fix_settings_patch import get_app_paths
+
+# プロセスごとの累計（クローラーはapp.pyとは別プロセスで動くため）と、実行ごとの集計の保存先
+METRICS_FILE = get_app_paths()['data_dir'] / 'llm_usage_metrics.json'
+RUNS_FILE = get_app_paths()['data_dir'] / 'llm_usage_runs.jsonl'
+
+# モデルごとの料金（USD / 100万トークン、設定の llm_pricing で上書き・追加可能）
+# モデル名が一致しない場合は、前方一致する最も長い名前の料金を使う
+DEFAULT_LLM_PRICING = {
+    'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+    'gpt-4o': {'input': 2.50, 'cached_input': 1.25, 'output': 10.00},
+    'gpt-4': {'input': 30.00, 'cached_input': 30.00, 'output': 60.00},
+    'deepseek-chat': {'input': 0.27, 'cached_input': 0.07, 'output': 1.10},
+    'deepseek-reasoner': {'input': 0.55, 'cached_input': 0.14, 'output': 2.19}
+}
+
+# パーセンタイルの計算に保持する直近の応答時間の件数（モデル・用途ごと）
+LATENCY_SAMPLES = 2000
+
+def get_pricing(settings: Dict) -> Dict[str, Dict]:
+    """設定からモデルごとの料金を取得"""
+    pricing = {model: dict(price) for model, price in DEFAULT_LLM_PRICING.items()}
+    for model, price in (settings.get('llm_pricing') or {}).items():
+        pricing[model] = {**pricing.get(model, {}), **price}
+    return pricing
+
+def find_price(pricing: Dict[str, Dict], model: str) -> Optional[Dict]:
+    """モデルの料金（不明な場合はNone）"""
+    if model in pricing:
+        return pricing[model]
+    matches = [name for name in pricing if model and model.startswith(name)]
+    return pricing[max(matches, key=len)] if matches else None
+
+def error_class(error: Exception) -> str:
+    """エラーの分類名（HTTPステータスがある場合は併記する。例: RateLimitError(429)）"""
+    response = getattr(error, 'response', None)
+    status_code = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    name = type(error).__name__
+    return f"{name}({status_code})" if status_code else name
+
+def _cached_tokens(usage) -> int:
+    """プロンプトのうちプロバイダ側のキャッシュで処理されたトークン数（OpenAI・DeepSeekの両形式に対応）"""
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', None)
+    if cached is None:
+        cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+    return int(cached or 0)
+
+def _percentile(sorted_values: List[float], percent: float) -> Optional[float]:
+    """最近傍順位法によるパーセンタイル"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values), max(1, math.ceil(percent / 100 * len(sorted_values))))
+    return round(sorted_values[rank - 1], 3)
+
+class UsageStats:
+    """1つのモデル・用途の呼び出し回数・応答時間・トークン数・推定料金・エラー分類"""
+
+    def __init__(self, max_samples: Optional[int] = LATENCY_SAMPLES):
+        """
+        Args:
+            max_samples: 保持する応答時間の件数（Noneで無制限。集計をまとめる場合に使う）
+        """
+        self.calls = 0
+        self.errors = Counter()
+        self.latencies = deque(maxlen=max_samples)
+        self.total_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost = 0.0
+        self.unpriced_calls = 0
+
+    def add(self, latency: float, usage=None, error: Optional[Exception] = None, price: Optional[Dict] = None):
+        self.calls += 1
+        if error is not None:
+            self.errors[error_class(error)] += 1
+            return
+        self.latencies.append(latency)
+        self.total_latency += latency
+        prompt_tokens = int(getattr(usage, 'prompt_tokens', 0) or 0)
+        completion_tokens = int(getattr(usage, 'completion_tokens', 0) or 0)
+        cached_tokens = min(_cached_tokens(usage), prompt_tokens)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cached_tokens += cached_tokens
+        if price is None:
+            self.unpriced_calls += 1
+            return
+        self.cost += (
+            (prompt_tokens - cached_tokens) * price.get('input', 0.0)
+            + cached_tokens * price.get('cached_input', price.get('input', 0.0))
+            + completion_tokens * price.get('output', 0.0)
+        ) / 1_000_000
+
+    def merge(self, other: 'UsageStats'):
+        self.calls += other.calls
+        self.errors.update(other.errors)
+        self.latencies.extend(other.latencies)
+        self.total_latency += other.total_latency
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.cost += other.cost
+        self.unpriced_calls += other.unpriced_calls
+
+    def as_dict(self) -> Dict:
+        """集計値（応答時間は成功した呼び出しのみ、秒）"""
+        latencies = sorted(self.latencies)
+        succeeded = self.calls - sum(self.errors.values())
+        return {
+            'calls': self.calls,
+            'succeeded': succeeded,
+            'errors': dict(self.errors),
+            'error_rate': round(sum(self.errors.values()) / self.calls, 4) if self.calls else 0.0,
+            'latency': {
+                'avg': round(self.total_latency / succeeded, 3) if succeeded else None,
+                'p50': _percentile(latencies, 50),
+                'p90': _percentile(latencies, 90),
+                'p99': _percentile(latencies, 99),
+                'max': round(latencies[-1], 3) if latencies else None
+            },
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cached_tokens': self.cached_tokens,
+            'cache_ratio': round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            'estimated_cost_usd': round(self.cost, 6),
+            'unpriced_calls': self.unpriced_calls
+        }
+
+class UsageRecorder:
+    """LLM呼び出しをモデル・用途ごとに集計する（複数のスレッドから記録してよい）"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._stats: Dict[tuple, UsageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, purpose: str, latency: float, usage=None, error: Optional[Exception] = None,
+               price: Optional[Dict] = None):
+        with self._lock:
+            stats = self._stats.get((model, purpose))
+            if stats is None:
+                stats = self._stats[(model, purpose)] = UsageStats()
+            stats.add(latency, usage, error, price)
+
+    def snapshot(self) -> Dict:
+        """全体・モデルごと・用途ごとの集計"""
+        with self._lock:
+            items = list(self._stats.items())
+        total = UsageStats(max_samples=None)
+        by_model: Dict[str, UsageStats] = {}
+        by_purpose: Dict[str, UsageStats] = {}
+        for (model, purpose), stats in items:
+            total.merge(stats)
+            by_model.setdefault(model, UsageStats(max_samples=None)).merge(stats)
+            by_purpose.setdefault(purpose, UsageStats(max_samples=None)).merge(stats)
+        return {
+            'started_at': self.started_at.isoformat(),
+            'total': total.as_dict(),
+            'by_model': {model: stats.as_dict() for model, stats in by_model.items()},
+            'by_purpose': {purpose: stats.as_dict() for purpose, stats in by_purpose.items()}
+        }
+
+_pricing = get_pricing({})
+_process_recorder = UsageRecorder()
+_run_state = {'run_id': None, 'source': None, 'recorder': None}
+_run_lock = threading.Lock()
+
+def configure(settings: Dict):
+    """設定の料金を反映する"""
+    global _pricing
+    _pricing = get_pricing(settings)
+
+def record_call(model: str, purpose: str, latency: float, usage=None, error: Optional[Exception] = None):
+    """
+    LLM APIの呼び出し1回（再試行は別の呼び出しとして数える）を記録する
+
+    Args:
+        latency: 呼び出しにかかった秒数
+        usage: レスポンスの usage（成功時）
+        error: 発生した例外（失敗時）
+    """
+    price = find_price(_pricing, model)
+    _process_recorder.record(model, purpose, latency, usage, error, price)
+    with _run_lock:
+        recorder = _run_state['recorder']
+    if recorder is not None:
+        recorder.record(model, purpose, latency, usage, error, price)
+
+def start_run(source: str) -> str:
+    """
+    実行ごとの集計を開始する（前回の実行が終了していない場合は中断として保存する）
+
+    Returns:
+        実行ID
+    """
+    finish_run(status='interrupted')
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    with _run_lock:
+        _run_state.update(run_id=run_id, source=source, recorder=UsageRecorder())
+    return run_id
+
+def finish_run(status: str = 'completed') -> Optional[Dict]:
+    """
+    実行ごとの集計を終了してファイルに追記する（LLMを呼び出さなかった実行は保存しない）
+
+    Returns:
+        実行の集計（実行中でない場合はNone）
+    """
+    with _run_lock:
+        run_id, source, recorder = _run_state['run_id'], _run_state['source'], _run_state['recorder']
+        _run_state.update(run_id=None, source=None, recorder=None)
+    if recorder is None:
+        return None
+    summary = {
+        'run_id': run_id,
+        'source': source,
+        'status': status,
+        'finished_at': datetime.now().isoformat(),
+        **recorder.snapshot()
+    }
+    if summary['total']['calls']:
+        try:
+            with job_store.JsonlWriter(str(RUNS_FILE)) as writer:
+                writer.append(summary)
+        except Exception as e:
+            logger.warning(f"LLM利用状況の保存に失敗: {str(e)}")
+        log_summary(summary)
+    return summary
+
+def log_summary(summary: Dict):
+    """実行の集計をログに出力"""
+    for model, item in summary['by_model'].items():
+        latency = item['latency']
+        logger.info(
+            f"LLM利用状況 [{model}]: {item['calls']}回（エラー {sum(item['errors'].values())}回）, "
+            f"応答時間 p50 {latency['p50']}秒 / p90 {latency['p90']}秒 / p99 {latency['p99']}秒, "
+            f"トークン 入力 {item['prompt_tokens']}（キャッシュ {item['cached_tokens']}）/ 出力 {item['completion_tokens']}, "
+            f"推定料金 ${item['estimated_cost_usd']:.4f}"
+        )
+
+def metrics() -> Dict:
+    """このプロセスで起動してからの累計"""
+    return _process_recorder.snapshot()
+
+def save_metrics(process_name: str):
+    """このプロセスの累計をファイルに保存（他プロセスの記録は残す）"""
+    try:
+        saved = load_saved_metrics()
+        saved[process_name] = {'updated_at': datetime.now().isoformat(), **metrics()}
+        METRICS_FILE.write_text(json.dumps(saved, ensure_ascii=False, indent=2), encoding='utf-8')
+    except Exception as e:
+        logger.warning(f"LLM利用状況の保存に失敗: {str(e)}")
+
+def load_saved_metrics() -> Dict[str, Dict]:
+    """プロセスごとに保存された累計を読み込む"""
+    try:
+        return json.loads(METRICS_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def load_runs(limit: int = 20) -> List[Dict]:
+    """保存された実行ごとの集計を新しい順に取得"""
+    if not RUNS_FILE.exists():
+        return []
+    runs = deque(job_store.iter_records(str(RUNS_FILE)), maxlen=max(1, limit))
+    return list(reversed(runs))
@@ -0,0 +1,97 @@
+import time
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# 条件を確認する間隔（秒）
+POLL_INTERVAL = 0.2
+
+class WaitRecorder:
+    """条件待機ごとの実際の待機時間とタイムアウトを記録するクラス"""
+
+    def __init__(self):
+        self.records = []
+
+    def wait_until(self, driver, condition: Callable, timeout: float, label: str) -> bool:
+        """
+        条件が満たされるまで待機する（固定時間のsleepの代わりに使用）
+
+        Args:
+            driver: WebDriver
+            condition: driverを受け取り、満たされた場合に真となる値を返す関数
+            timeout: タイムアウト（秒）
+            label: 記録用の待機名
+
+        Returns:
+            タイムアウトまでに条件が満たされた場合はTrue
+        """
+        start_time = time.monotonic()
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+            success = True
+        except TimeoutException:
+            success = False
+        waited = time.monotonic() - start_time
+        self.records.append({
+            'label': label,
+            'waited': round(waited, 3),
+            'timeout': timeout,
+            'success': success
+        })
+        if not success:
+            logger.warning(f"待機がタイムアウトしました: {label}（{timeout}秒）")
+        return success
+
+    def summary(self) -> Dict[str, Dict]:
+        """待機名ごとの回数・合計/最大待機時間・タイムアウト回数を集計"""
+        result = {}
+        for record in self.records:
+            item = result.setdefault(record['label'], {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            item['count'] += 1
+            item['total'] = round(item['total'] + record['waited'], 3)
+            item['max'] = max(item['max'], record['waited'])
+            item['timeouts'] += 0 if record['success'] else 1
+        return result
+
+    def log_summary(self):
+        """待機時間の集計をログに出力"""
+        for label, item in self.summary().items():
+            logger.info(
+                f"待機時間 [{label}]: {item['count']}回, 合計{item['total']:.2f}秒, "
+                f"最大{item['max']:.2f}秒, タイムアウト{item['timeouts']}回"
+            )
+
+def document_ready(driver) -> bool:
+    """DOMの構築が完了している（eager読み込みのため画像等の読み込み完了は待たない）"""
+    return driver.execute_script("return document.readyState") in ("interactive", "complete")
+
+def element_present(by: str, value: str) -> Callable:
+    """要素が存在する"""
+    return lambda driver: len(driver.find_elements(by, value)) > 0
+
+def url_left(path: str) -> Callable:
+    """URLに指定のパスが含まれなくなった（ログイン後の遷移など）"""
+    return lambda driver: path not in driver.current_url
+
+def login_settled(error_selector: str = '.alert-danger, .error-message') -> Callable:
+    """ログインページから遷移した、またはエラーメッセージが表示された"""
+    return lambda driver: ('/login' not in driver.current_url
+                           or len(driver.find_elements(By.CSS_SELECTOR, error_selector)) > 0)
+
+def first_link_changed(css_selector: str, previous_href: Optional[str]) -> Callable:
+    """一覧の先頭要素のリンクが切り替わった（ページ遷移後に案件カードが入れ替わったことの判定）"""
+    def condition(driver):
+        try:
+            elements = driver.find_elements(By.CSS_SELECTOR, css_selector)
+            return bool(elements) and elements[0].get_attribute('href') != previous_href
+        except StaleElementReferenceException:
+            return False
+    return condition
+
+def first_link_href(driver, css_selector: str) -> Optional[str]:
+    """一覧の先頭要素のリンクを取得"""
+    elements = driver.find_elements(By.CSS_SELECTOR, css_selector)
+    return elements[0].get_attribute('href') if elements else None
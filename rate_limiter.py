@@ -0,0 +1,298 @@
+import json
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from fix_settings_patch import get_app_paths
+
+# プロセスごとの利用状況の保存先（クローラーはapp.pyとは別プロセスで動くため）
+METRICS_FILE = get_app_paths()['data_dir'] / 'rate_limit_metrics.json'
+
+# レート制限の既定値（設定の rate_limits で上書き可能）
+DEFAULT_RATE_LIMITS = {
+    'llm': {
+        'openai': {'requests_per_second': 5.0, 'tokens_per_minute': 200000},
+        'deepseek': {'requests_per_second': 2.0, 'tokens_per_minute': 100000}
+    },
+    'site': {
+        'crowdworks.jp': {'pages_per_second': 1.0}
+    },
+    # site に記載のないホストに適用する値
+    'default_site': {'pages_per_second': 2.0},
+    # 429を受けたときにレートを下げる倍率と、成功が続いたときに戻す割合
+    'throttle_factor': 0.5,
+    'recovery_step': 0.05
+}
+
+# Retry-Afterがない429を受けたときに待機する秒数
+DEFAULT_RETRY_AFTER = 10.0
+
+# 利用率を計算する直近の期間（秒）
+UTILIZATION_WINDOW = 60.0
+
+def get_config(settings: Dict) -> Dict:
+    """設定からレート制限の設定を取得（llm・siteはプロバイダ・ホストごとに既定値とマージ）"""
+    overrides = settings.get('rate_limits') or {}
+    config = {**DEFAULT_RATE_LIMITS, **overrides}
+    for section in ('llm', 'site'):
+        merged = {name: dict(value) for name, value in DEFAULT_RATE_LIMITS[section].items()}
+        for name, value in (overrides.get(section) or {}).items():
+            merged[name] = {**merged.get(name, {}), **value}
+        config[section] = merged
+    return config
+
+def parse_retry_after(value) -> Optional[float]:
+    """Retry-Afterヘッダー（秒数またはHTTP日付）を待機秒数に変換（解析できない場合はNone）"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+def retry_after_from_error(error: Exception) -> Optional[float]:
+    """
+    APIエラーがレート制限（429）によるものであれば待機秒数を返す
+
+    Returns:
+        Retry-Afterの秒数（ヘッダーがない場合はDEFAULT_RETRY_AFTER）。429以外のエラーはNone
+    """
+    response = getattr(error, 'response', None)
+    status_code = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status_code != 429:
+        return None
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = parse_retry_after(headers.get('retry-after'))
+    return DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+
+class TokenBucket:
+    """一定のレートで補充され、容量までためておけるトークンバケット"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 1秒あたりに補充する量
+            capacity: ためておける最大量（一度に取得できる量の上限）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.available = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """amountを取得できるまでの秒数（refillの直後に呼び出す）"""
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+class RateLimiter:
+    """
+    リクエスト数（と任意でトークン数）のトークンバケットで送信ペースを制御するクラス
+
+    429を受けた場合はRetry-Afterの間すべての送信を止め、レートを下げる。
+    その後は成功するたびに設定値まで少しずつレートを戻す。
+    """
+
+    def __init__(self, name: str, requests_per_second: float, tokens_per_minute: Optional[float] = None,
+                 throttle_factor: float = 0.5, recovery_step: float = 0.05):
+        self.name = name
+        self.configured_rate = max(0.01, float(requests_per_second))
+        self.throttle_factor = min(1.0, max(0.05, float(throttle_factor)))
+        self.recovery_step = max(0.0, float(recovery_step))
+        # 短時間の集中を許容しすぎないよう、リクエストのバケット容量は1秒分（最低1件）とする
+        self.requests = TokenBucket(self.configured_rate, max(1.0, self.configured_rate))
+        self.tokens = None
+        if tokens_per_minute:
+            self.tokens = TokenBucket(float(tokens_per_minute) / 60, float(tokens_per_minute))
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+        # 利用状況の統計
+        self.acquired = 0
+        self.tokens_used = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+        self._recent = []  # 直近の取得時刻（利用率の計算用）
+
+    @property
+    def current_rate(self) -> float:
+        return self.requests.rate
+
+    def acquire(self, tokens: int = 0):
+        """
+        送信してよくなるまで待機する
+
+        Args:
+            tokens: 今回のリクエストで消費する見込みのトークン数（LLMのみ）
+        """
+        start_time = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                delay = max(self.paused_until - now, self.requests.wait_time(1))
+                if self.tokens is not None and tokens:
+                    self.tokens.refill(now)
+                    delay = max(delay, self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    self.requests.available -= 1
+                    if self.tokens is not None and tokens:
+                        self.tokens.available -= min(tokens, self.tokens.capacity)
+                    waited = now - start_time
+                    self.acquired += 1
+                    self.tokens_used += tokens
+                    self.wait_seconds += waited
+                    self.max_wait = max(self.max_wait, waited)
+                    self._recent.append(now)
+                    return
+            time.sleep(min(delay, 1.0))
+
+    def adjust_tokens(self, difference: int):
+        """実際の使用トークン数と見込みの差を反映する（見込みより多かった場合は以降の送信を遅らせる）"""
+        if self.tokens is None or not difference:
+            return
+        with self._lock:
+            self.tokens.available = min(self.tokens.capacity, self.tokens.available - difference)
+            self.tokens_used += difference
+
+    def report_success(self):
+        """送信が成功したことを記録し、下げていたレートを少し戻す"""
+        if self.requests.rate >= self.configured_rate:
+            return
+        with self._lock:
+            self.requests.rate = min(self.configured_rate,
+                                     self.requests.rate + self.configured_rate * self.recovery_step)
+
+    def report_rate_limited(self, retry_after: Optional[float] = None):
+        """429を受けたことを記録し、Retry-Afterの間送信を止めてレートを下げる"""
+        retry_after = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+        with self._lock:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.requests.rate = max(self.configured_rate * 0.05, self.requests.rate * self.throttle_factor)
+            rate = self.requests.rate
+        logger.warning(
+            f"レート制限を受けました [{self.name}]: {retry_after:.1f}秒停止し、"
+            f"送信レートを{rate:.2f}件/秒に下げます"
+        )
+
+    def metrics(self) -> Dict:
+        """利用状況（直近の利用率・待機時間・429の回数）"""
+        with self._lock:
+            now = time.monotonic()
+            self._recent = [at for at in self._recent if now - at <= UTILIZATION_WINDOW]
+            recent_rate = len(self._recent) / UTILIZATION_WINDOW
+            return {
+                'configured_rate': self.configured_rate,
+                'current_rate': round(self.requests.rate, 3),
+                'tokens_per_minute': round(self.tokens.rate * 60) if self.tokens else None,
+                'requests': self.acquired,
+                'tokens': self.tokens_used,
+                'utilization': round(recent_rate / self.configured_rate, 3),
+                'wait_seconds': round(self.wait_seconds, 2),
+                'avg_wait_seconds': round(self.wait_seconds / self.acquired, 3) if self.acquired else 0.0,
+                'max_wait_seconds': round(self.max_wait, 2),
+                'throttled': self.throttled,
+                'paused_for_seconds': round(max(0.0, self.paused_until - now), 1)
+            }
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+_config = get_config({})
+
+def configure(settings: Dict):
+    """設定を反映する（設定が変わった場合は作成済みのリミッターを作り直す）"""
+    global _config
+    config = get_config(settings)
+    with _limiters_lock:
+        if config == _config:
+            return
+        _config = config
+        _limiters.clear()
+
+def _get_limiter(key: str, factory) -> RateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = factory(_config)
+        return limiter
+
+def llm_limiter(provider: str) -> RateLimiter:
+    """LLMプロバイダ（openai / deepseek）のリミッターを取得"""
+    def factory(config):
+        limits = config['llm'].get(provider) or config['llm']['openai']
+        return RateLimiter(
+            f'llm:{provider}',
+            limits.get('requests_per_second', 1.0),
+            limits.get('tokens_per_minute'),
+            config['throttle_factor'],
+            config['recovery_step']
+        )
+    return _get_limiter(f'llm:{provider}', factory)
+
+def site_limiter(url: str) -> RateLimiter:
+    """URLのホストに対するページ読み込みのリミッターを取得（サブドメインは親ドメインの設定を使う）"""
+    host = (urlparse(url).hostname or url).lower()
+
+    def factory(config):
+        limits = config['default_site']
+        for name, value in config['site'].items():
+            if host == name or host.endswith('.' + name):
+                limits = value
+                break
+        return RateLimiter(
+            f'site:{host}',
+            limits.get('pages_per_second', 1.0),
+            None,
+            config['throttle_factor'],
+            config['recovery_step']
+        )
+    return _get_limiter(f'site:{host}', factory)
+
+def metrics() -> Dict[str, Dict]:
+    """作成済みの全リミッターの利用状況"""
+    with _limiters_lock:
+        limiters = list(_limiters.items())
+    return {key: limiter.metrics() for key, limiter in limiters}
+
+def log_metrics():
+    """全リミッターの利用状況をログに出力"""
+    for key, item in metrics().items():
+        logger.info(
+            f"レート制限 [{key}]: {item['requests']}件, 平均待機 {item['avg_wait_seconds']:.2f}秒, "
+            f"最大待機 {item['max_wait_seconds']:.1f}秒, 429 {item['throttled']}回"
+        )
+
+def save_metrics(process_name: str):
+    """このプロセスの利用状況をファイルに保存（他プロセスの記録は残す）"""
+    try:
+        saved = load_saved_metrics()
+        saved[process_name] = {'updated_at': datetime.now().isoformat(), 'limiters': metrics()}
+        METRICS_FILE.write_text(json.dumps(saved, ensure_ascii=False, indent=2), encoding='utf-8')
+    except Exception as e:
+        logger.warning(f"レート制限の利用状況の保存に失敗: {str(e)}")
+
+def load_saved_metrics() -> Dict[str, Dict]:
+    """プロセスごとに保存された利用状況を読み込む"""
+    try:
+        return json.loads(METRICS_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
@@ -0,0 +1,270 @@
+import json
+import os
+import random
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+import job_store
+from fix_settings_patch import get_app_paths
+
+# ユーザーがチェックした案件と、事前ランキングの再現率の集計の保存先
+CRAWLED_DATA_DIR = get_app_paths()['data_dir'] / 'crawled_data'
+CHECKS_FILE = CRAWLED_DATA_DIR / 'checked_jobs.json'
+METRICS_FILE = get_app_paths()['data_dir'] / 'relevance_metrics.json'
+
+# 事前ランキングの既定値（設定の relevance_ranking で上書き可能）
+DEFAULT_RANKING_CONFIG = {
+    'enabled': False,
+    'min_score': 0.05,       # このスコア以上の案件はLLMに送る
+    'top_k': 10,             # スコアが閾値未満でも、1回の判定ごとに上位この件数はLLMに送る
+    'prompt_weight': 0.5,    # フィルタ条件との類似度の重み（残りはチェック済み案件との類似度）
+    'ngram_range': [2, 3],   # 文字n-gramの長さ
+    'n_features': 4096,      # n-gramをハッシュする次元数
+    'max_checked_jobs': 200, # 参照するチェック済み案件の上限（新しい順）
+    'audit_rate': 0.1,       # 再現率の推定のため、ローカルで除外した案件のうちLLMにも送る割合
+    'cache_size': 5000       # キャッシュする案件ベクトルの件数
+}
+
+def get_config(settings: Dict) -> Dict:
+    """設定から事前ランキングの設定を取得"""
+    return {**DEFAULT_RANKING_CONFIG, **(settings.get('relevance_ranking') or {})}
+
+def job_text(job: Dict) -> str:
+    """ベクトル化する案件のテキスト（タイトルと、取得済みであれば詳細）"""
+    return '\n'.join(filter(None, [job.get('title', ''), job.get('detail_description', '')]))
+
+def _normalize(text: str) -> str:
+    """全角・半角と大文字・小文字の違いをなくし、空白をまとめる"""
+    return ' '.join(unicodedata.normalize('NFKC', text or '').lower().split())
+
+_vector_cache = OrderedDict()
+_vector_cache_lock = threading.Lock()
+
+def vectorize(text: str, config: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    テキストを文字n-gramのハッシュ化した疎ベクトル（添字, 1+log(出現数)）に変換
+
+    分かち書きを必要としないため日本語でも使える。同じテキストの結果はキャッシュする。
+    """
+    low, high = config['ngram_range']
+    n_features = int(config['n_features'])
+    key = (text, low, high, n_features)
+    with _vector_cache_lock:
+        cached = _vector_cache.get(key)
+        if cached is not None:
+            _vector_cache.move_to_end(key)
+            return cached
+
+    normalized = _normalize(text)
+    hashes = [
+        zlib.crc32(normalized[start:start + size].encode('utf-8')) % n_features
+        for size in range(low, high + 1)
+        for start in range(len(normalized) - size + 1)
+    ]
+    indices, counts = np.unique(np.array(hashes, dtype=np.int64), return_counts=True)
+    vector = (indices, (1.0 + np.log(counts)).astype(np.float32))
+
+    with _vector_cache_lock:
+        _vector_cache[key] = vector
+        while len(_vector_cache) > max(1, int(config['cache_size'])):
+            _vector_cache.popitem(last=False)
+    return vector
+
+def _tfidf_matrix(texts: List[str], config: Dict) -> np.ndarray:
+    """テキストのリストをTF-IDFの行列（各行をL2正規化）に変換"""
+    matrix = np.zeros((len(texts), int(config['n_features'])), dtype=np.float32)
+    for row, text in enumerate(texts):
+        indices, values = vectorize(text, config)
+        matrix[row, indices] = values
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    matrix *= idf.astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+def load_checked_jobs(max_jobs: int) -> List[Dict]:
+    """
+    ユーザーがチェックした案件を新しい順に読み込む
+
+    checked_jobs.json にはURLしかないため、フィルタリング済みデータのファイルを
+    新しい順に1件ずつ読み、全て見つかった時点で読み込みをやめる。
+    """
+    try:
+        with open(CHECKS_FILE, 'r', encoding='utf-8') as f:
+            checks = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    checked = sorted(
+        ((url, value.get('updated_at') or '') for url, value in checks.items()
+         if isinstance(value, dict) and value.get('checked')),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    wanted = {url for url, _ in checked[:max(0, int(max_jobs))]}
+    found = {}
+    files = sorted(job_store.list_files(CRAWLED_DATA_DIR, filtered=True), key=os.path.getmtime, reverse=True)
+    for path in files:
+        if len(found) == len(wanted):
+            break
+        try:
+            for job in job_store.iter_records(path):
+                url = job.get('url')
+                if url in wanted and url not in found:
+                    found[url] = job
+        except Exception as e:
+            logger.warning(f"チェック済み案件の読み込みに失敗: {path}: {str(e)}")
+    return list(found.values())
+
+_checked_cache = {'key': None, 'jobs': []}
+
+def _cached_checked_jobs(max_jobs: int) -> List[Dict]:
+    """チェック済み案件（checked_jobs.json が更新されるまで読み直さない）"""
+    try:
+        mtime = os.path.getmtime(CHECKS_FILE)
+    except OSError:
+        return []
+    key = (mtime, max_jobs)
+    if _checked_cache['key'] != key:
+        _checked_cache['jobs'] = load_checked_jobs(max_jobs)
+        _checked_cache['key'] = key
+    return _checked_cache['jobs']
+
+class RelevanceRanker:
+    """
+    LLMに問い合わせる前に、案件とフィルタ条件・チェック済み案件との類似度で候補を絞り込むクラス
+
+    スコアが min_score 以上、または上位 top_k 件の案件のみLLMに送り、残りはローカルで除外する。
+    除外した案件の一部（audit_rate）もLLMに送り、LLMが採用した割合から見逃しを推定する。
+    """
+
+    def __init__(self, config: Dict, prompt: str, checked_jobs: List[Dict]):
+        self.config = config
+        self.prompt = prompt or ''
+        self.checked_texts = [text for text in (job_text(job) for job in checked_jobs) if text]
+
+    @classmethod
+    def from_settings(cls, settings: Dict, prompt: str) -> Optional['RelevanceRanker']:
+        """設定から事前ランキングを構築（無効の場合はNone）"""
+        config = get_config(settings)
+        if not config['enabled']:
+            return None
+        return cls(config, prompt, _cached_checked_jobs(config['max_checked_jobs']))
+
+    def _combine(self, prompt_similarity: np.ndarray, checked_similarity: Optional[np.ndarray]) -> np.ndarray:
+        if checked_similarity is None:
+            return prompt_similarity
+        weight = min(1.0, max(0.0, float(self.config['prompt_weight'])))
+        return weight * prompt_similarity + (1 - weight) * checked_similarity
+
+    def score(self, jobs: List[Dict]) -> np.ndarray:
+        """案件ごとの関連度スコア（入力と同じ順序）"""
+        texts = [self.prompt] + self.checked_texts + [job_text(job) for job in jobs]
+        matrix = _tfidf_matrix(texts, self.config)
+        checked_count = len(self.checked_texts)
+        job_matrix = matrix[1 + checked_count:]
+        prompt_similarity = job_matrix @ matrix[0]
+        checked_similarity = None
+        if checked_count:
+            checked_similarity = (job_matrix @ matrix[1:1 + checked_count].T).max(axis=1)
+        return self._combine(prompt_similarity, checked_similarity)
+
+    def checked_recall(self) -> Optional[float]:
+        """
+        チェック済み案件を1件ずつ除いて残りで採点したとき、閾値以上になる割合（leave-one-out）
+
+        ユーザーが関心を示した案件をどれだけ取りこぼさないかの目安。2件未満の場合はNone。
+        """
+        checked_count = len(self.checked_texts)
+        if checked_count < 2:
+            return None
+        matrix = _tfidf_matrix([self.prompt] + self.checked_texts, self.config)
+        checked_matrix = matrix[1:]
+        similarity = checked_matrix @ checked_matrix.T
+        np.fill_diagonal(similarity, -np.inf)
+        scores = self._combine(checked_matrix @ matrix[0], similarity.max(axis=1))
+        return round(float(np.mean(scores >= float(self.config['min_score']))), 4)
+
+    def split(self, jobs: List[Dict]) -> Tuple[List[Dict], List[Dict], Set[int], Dict]:
+        """
+        LLMに送る案件とローカルで除外する案件に分ける
+
+        Returns:
+            (LLMに送る案件, ローカルで除外した案件, LLMに送る案件のうち再現率の推定用に抽出した案件のid, 集計値)
+            LLMに送る案件は入力の順序を保つ
+        """
+        if not jobs:
+            return [], [], set(), {'kept': 0, 'rejected': 0, 'audited': 0}
+        scores = self.score(jobs)
+        ranks = np.empty(len(jobs), dtype=np.int64)
+        ranks[np.argsort(-scores, kind='stable')] = np.arange(len(jobs))
+        keep = (scores >= float(self.config['min_score'])) | (ranks < int(self.config['top_k']))
+
+        audit_rate = min(1.0, max(0.0, float(self.config['audit_rate'])))
+        llm_jobs, rejected_jobs, audited_ids = [], [], set()
+        for job, kept, job_score in zip(jobs, keep, scores):
+            job['relevance_score'] = round(float(job_score), 4)
+            if kept:
+                llm_jobs.append(job)
+            elif random.random() < audit_rate:
+                llm_jobs.append(job)
+                audited_ids.add(id(job))
+            else:
+                rejected_jobs.append(job)
+        stats = {
+            'kept': int(keep.sum()),
+            'rejected': len(rejected_jobs),
+            'audited': len(audited_ids)
+        }
+        return llm_jobs, rejected_jobs, audited_ids, stats
+
+    def record_outcome(self, llm_jobs: List[Dict], accepted_jobs: List[Dict], audited_ids: Set[int],
+                       rejected_count: int):
+        """LLMの判定結果から再現率の集計を更新して保存する"""
+        accepted_ids = {id(job) for job in accepted_jobs}
+        audited_accepted = len(accepted_ids & audited_ids)
+        kept_accepted = len(accepted_ids - audited_ids)
+        audit_rate = float(self.config['audit_rate'])
+        with _metrics_lock:
+            metrics = load_metrics()
+            metrics['batches'] = metrics.get('batches', 0) + 1
+            metrics['sent_to_llm'] = metrics.get('sent_to_llm', 0) + len(llm_jobs) - len(audited_ids)
+            metrics['rejected_locally'] = metrics.get('rejected_locally', 0) + rejected_count
+            metrics['audited'] = metrics.get('audited', 0) + len(audited_ids)
+            metrics['audit_accepted'] = metrics.get('audit_accepted', 0) + audited_accepted
+            metrics['kept_accepted'] = metrics.get('kept_accepted', 0) + kept_accepted
+            # 抽出した案件でLLMが採用した件数を抽出率で割り戻し、除外した案件全体での見逃しを推定する
+            if audit_rate > 0:
+                metrics['estimated_missed'] = metrics.get('estimated_missed', 0.0) + audited_accepted / audit_rate
+            found = metrics['kept_accepted'] + metrics['audit_accepted']
+            missed = max(metrics.get('estimated_missed', 0.0) - metrics['audit_accepted'], 0.0)
+            metrics['estimated_recall'] = round(found / (found + missed), 4) if found else None
+            metrics['checked_recall'] = self.checked_recall()
+            metrics['updated_at'] = datetime.now().isoformat()
+            save_metrics(metrics)
+        if audited_accepted:
+            logger.warning(
+                f"事前ランキングで除外対象だった案件のうち{audited_accepted}件をLLMが採用しました"
+                f"（推定再現率: {metrics['estimated_recall']}）"
+            )
+
+_metrics_lock = threading.Lock()
+
+def load_metrics() -> Dict:
+    """保存された事前ランキングの累計の集計を読み込む"""
+    try:
+        return json.loads(METRICS_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_metrics(metrics: Dict):
+    try:
+        METRICS_FILE.write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding='utf-8')
+    except Exception as e:
+        logger.warning(f"事前ランキングの集計の保存に失敗: {str(e)}")
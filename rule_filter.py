@@ -0,0 +1,144 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+import budget_parser
+
+# 判定結果
+ACCEPT = 'accept'
+REJECT = 'reject'
+
+# 数値として比較する演算子
+NUMERIC_OPS = ('lt', 'lte', 'gt', 'gte')
+
+def _budget_fields(job: Dict) -> Dict:
+    """案件の数値化済み予算を取得（クロール時に数値化されていない案件はその場で解析）"""
+    if 'budget_type' in job:
+        return job
+    return budget_parser.parse_budget(job.get('budget'))
+
+def _budget_upper(job: Dict) -> Optional[float]:
+    """固定報酬の上限額を取得（時間単価・未設定・上限不明の場合はNone）"""
+    budget = _budget_fields(job)
+    if budget.get('budget_type') != budget_parser.BUDGET_TYPE_FIXED:
+        return None
+    return budget.get('budget_max')
+
+def _get_field(job: Dict, field: str):
+    """案件から比較対象の値を取得"""
+    if field == 'budget_upper':
+        return _budget_upper(job)
+    if field in ('budget_min', 'budget_max', 'budget_type', 'budget_currency'):
+        return _budget_fields(job).get(field)
+    return job.get(field)
+
+def _match(value, op: str, expected) -> bool:
+    """1つの述語を評価する"""
+    if op == 'is_empty':
+        return not value
+    if value is None:
+        return False
+    if op in NUMERIC_OPS:
+        try:
+            number, threshold = float(value), float(expected)
+        except (TypeError, ValueError):
+            return False
+        return {
+            'lt': number < threshold,
+            'lte': number <= threshold,
+            'gt': number > threshold,
+            'gte': number >= threshold
+        }[op]
+
+    text = str(value).lower()
+    candidates = expected if isinstance(expected, list) else [expected]
+    candidates = [str(candidate).lower() for candidate in candidates]
+    if op == 'contains':
+        return any(candidate in text for candidate in candidates)
+    if op == 'not_contains':
+        return not any(candidate in text for candidate in candidates)
+    if op in ('equals', 'in'):
+        return text in candidates
+    if op == 'regex':
+        return any(re.search(candidate, str(value), re.IGNORECASE) for candidate in candidates)
+    raise ValueError(f"未対応の演算子です: {op}")
+
+class RuleFilter:
+    """
+    LLMに問い合わせる前に構造化された条件で案件を判定するフィルタ
+
+    設定例（settings.json の filter_rules）:
+        {
+            "budget_min": 10000,
+            "exclude_keywords": ["データ入力"],
+            "require_keywords": ["Python", "Django"],
+            "accept_keywords": ["Flask"],
+            "blocked_clients": ["〇〇株式会社"],
+            "rules": [
+                {"field": "title", "op": "regex", "value": "急募", "action": "reject"}
+            ]
+        }
+
+    rejectの条件に1つでも当てはまれば不採用、acceptの条件に当てはまれば採用とし、
+    どちらにも当てはまらない案件のみLLMで判定する。
+    """
+
+    def __init__(self, rules: List[Dict]):
+        """
+        Args:
+            rules: field / op / value / action を持つ述語のリスト
+        """
+        self.rules = [rule for rule in rules if rule.get('action') == REJECT]
+        self.rules += [rule for rule in rules if rule.get('action') == ACCEPT]
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> 'RuleFilter':
+        """設定の filter_rules からフィルタを構築"""
+        config = settings.get('filter_rules') or {}
+        rules = []
+        if config.get('blocked_clients'):
+            rules.append({'field': 'client', 'op': 'in', 'value': config['blocked_clients'], 'action': REJECT})
+        if config.get('exclude_keywords'):
+            rules.append({'field': 'title', 'op': 'contains', 'value': config['exclude_keywords'], 'action': REJECT})
+        if config.get('require_keywords'):
+            rules.append({'field': 'title', 'op': 'not_contains', 'value': config['require_keywords'], 'action': REJECT})
+        if config.get('budget_min'):
+            rules.append({'field': 'budget_upper', 'op': 'lt', 'value': config['budget_min'], 'action': REJECT})
+        if config.get('accept_keywords'):
+            rules.append({'field': 'title', 'op': 'contains', 'value': config['accept_keywords'], 'action': ACCEPT})
+        rules.extend(config.get('rules') or [])
+        return cls(rules)
+
+    def evaluate(self, job: Dict) -> Tuple[Optional[str], str]:
+        """
+        案件を判定する
+
+        Returns:
+            (判定, 理由) のタプル。判定はaccept / reject、決められない場合はNone
+        """
+        for rule in self.rules:
+            try:
+                matched = _match(_get_field(job, rule.get('field', '')), rule.get('op', 'contains'), rule.get('value'))
+            except Exception as e:
+                logger.warning(f"フィルタールールの評価に失敗: {rule} ({str(e)})")
+                continue
+            if matched:
+                return rule['action'], f"ルール判定: {rule.get('field')} {rule.get('op')} {rule.get('value')}"
+        return None, ''
+
+    def split(self, jobs: List[Dict]) -> Tuple[List[Tuple[Optional[str], str]], Dict]:
+        """
+        案件リストをまとめて判定する
+
+        Returns:
+            入力と同じ順序の判定結果リストと集計値
+        """
+        decisions = [self.evaluate(job) for job in jobs] if self.rules else [(None, '')] * len(jobs)
+        stats = {
+            'accepted': sum(1 for decision, _ in decisions if decision == ACCEPT),
+            'rejected': sum(1 for decision, _ in decisions if decision == REJECT),
+            'ambiguous': sum(1 for decision, _ in decisions if decision is None)
+        }
+        stats['llm_jobs_skipped'] = stats['accepted'] + stats['rejected']
+        return decisions, stats
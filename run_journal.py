@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from fix_settings_patch import get_app_paths
+
+# 実行ジャーナルの保存先
+RUNS_DIR = get_app_paths()['data_dir'] / 'crawled_data' / 'runs'
+
+# ジャーナルの記録種別
+RECORD_START = 'start'        # 実行開始（生データ・フィルタリング済みデータのファイル名）
+RECORD_PAGE = 'page'          # 一覧ページ1ページ分の案件と、そのうち処理対象となった案件のURL
+RECORD_VERDICT = 'verdict'    # 案件ごとのフィルタリング結果
+RECORD_DETAIL = 'detail'      # 案件ごとの詳細情報
+RECORD_COMPLETE = 'complete'  # 実行完了
+
+class RunState:
+    """ジャーナルから復元した実行状態"""
+
+    def __init__(self):
+        self.run_id = None
+        self.base_filename = None
+        self.scraped_jobs = []  # 一覧から取得した全ての案件
+        self.unique_jobs = []   # 新規・更新の案件（一覧に表示された順）
+        self.verdicts = {}      # URL -> {'decision': 'yes'|'no', 'reason': str, 'decided_by': str}
+        self.details = {}       # URL -> 詳細情報
+        self.completed = False
+
+    def pending_filter(self) -> List[Dict]:
+        """フィルタリングが完了していない案件"""
+        return [job for job in self.unique_jobs if job['url'] not in self.verdicts]
+
+    def accepted_jobs(self) -> List[Dict]:
+        """条件に合った案件（判定理由と取得済みの詳細情報を反映）"""
+        jobs = []
+        for job in self.unique_jobs:
+            verdict = self.verdicts.get(job['url'])
+            if verdict and verdict['decision'] == 'yes':
+                job['gpt_reason'] = verdict['reason']
+                if verdict.get('decided_by'):
+                    job['decided_by'] = verdict['decided_by']
+                job.update(self.details.get(job['url'], {}))
+                jobs.append(job)
+        return jobs
+
+class RunJournal:
+    """
+    クロール1回分の進捗を追記専用のJSONLファイルに記録するクラス
+
+    ページ・フィルタリング・詳細取得のバッチごとにまとめて書き込んでfsyncするため、
+    プロセスが異常終了しても最後に記録したバッチの区切りから再開できる
+    （案件ごとにはfsyncしない）。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.run_id = self.path.stem
+        self._lock = threading.Lock()
+        self._tail_checked = False
+
+    @classmethod
+    def create(cls, base_filename: str) -> 'RunJournal':
+        """新しい実行のジャーナルを作成"""
+        RUNS_DIR.mkdir(parents=True, exist_ok=True)
+        while True:
+            # 同じ時刻に開始した実行（スケジューラと手動実行など）が同じファイルを使わないよう、
+            # マイクロ秒まで含めたファイル名を排他的に作成する
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            path = RUNS_DIR / f'run_{timestamp}.jsonl'
+            try:
+                with open(path, 'x', encoding='utf-8'):
+                    break
+            except FileExistsError:
+                continue
+        journal = cls(path)
+        journal._append({'type': RECORD_START, 'base_filename': base_filename})
+        logger.info(f"実行ジャーナルを作成しました: {journal.run_id}")
+        return journal
+
+    @classmethod
+    def find(cls, run_id: Optional[str] = None) -> Optional['RunJournal']:
+        """
+        再開する実行のジャーナルを取得
+
+        Args:
+            run_id: 実行ID（省略時は完了していない最新の実行）
+        """
+        if run_id:
+            path = RUNS_DIR / f'{run_id}.jsonl'
+            return cls(path) if path.exists() else None
+        for path in sorted(RUNS_DIR.glob('run_*.jsonl'), reverse=True):
+            journal = cls(path)
+            if not journal.load_state().completed:
+                return journal
+        return None
+
+    def _append(self, record: Dict):
+        """1件の記録を追記してディスクに書き出す"""
+        self._append_many([record])
+
+    def _append_many(self, records: List[Dict]):
+        """複数の記録をまとめて追記し、1回のfsyncでディスクに書き出す"""
+        if not records:
+            return
+        at = datetime.now().isoformat()
+        for record in records:
+            record['at'] = at
+        line = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        with self._lock:
+            if not self._tail_checked:
+                # 異常終了で書き込み途中になった最終行に、次の記録が連結されないようにする
+                if self.path.exists() and self.path.stat().st_size > 0:
+                    with open(self.path, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            line = '\n' + line
+                self._tail_checked = True
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record_page(self, page_jobs: List[Dict], selected: List[Dict]):
+        """一覧ページ1ページ分の案件と、処理対象の案件を記録"""
+        self._append({
+            'type': RECORD_PAGE,
+            'jobs': page_jobs,
+            'selected': [job['url'] for job in selected]
+        })
+
+    def record_verdicts(self, jobs: List[Dict], accepted: List[Dict]):
+        """フィルタリングした案件の採否を記録"""
+        accepted_ids = {id(job) for job in accepted}
+        records = []
+        for job in jobs:
+            decision = 'yes' if id(job) in accepted_ids else 'no'
+            records.append({
+                'type': RECORD_VERDICT,
+                'url': job['url'],
+                'decision': decision,
+                'reason': job.get('gpt_reason', '') if decision == 'yes' else '',
+                'decided_by': job.get('decided_by')
+            })
+        self._append_many(records)
+
+    def record_details(self, urls: List[str], details: List[Dict]):
+        """取得した詳細情報を記録（取得できなかった案件は記録しない）"""
+        self._append_many([
+            {'type': RECORD_DETAIL, 'url': url, 'data': detail_data}
+            for url, detail_data in zip(urls, details) if detail_data
+        ])
+
+    def complete(self, filtered_filename: Optional[str]):
+        """実行の完了を記録"""
+        self._append({'type': RECORD_COMPLETE, 'filtered_filename': filtered_filename})
+
+    def load_state(self) -> RunState:
+        """ジャーナルを読み込んで実行状態を復元（書き込み途中の最終行は無視する）"""
+        state = RunState()
+        state.run_id = self.run_id
+        if not self.path.exists():
+            return state
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"ジャーナルの不完全な行を無視します: {self.run_id}")
+                    continue
+                record_type = record.get('type')
+                if record_type == RECORD_START:
+                    state.base_filename = record.get('base_filename')
+                elif record_type == RECORD_PAGE:
+                    selected = set(record.get('selected', []))
+                    for job in record.get('jobs', []):
+                        state.scraped_jobs.append(job)
+                        if job.get('url') in selected:
+                            state.unique_jobs.append(job)
+                elif record_type == RECORD_VERDICT:
+                    state.verdicts[record['url']] = {
+                        'decision': record['decision'],
+                        'reason': record.get('reason', ''),
+                        'decided_by': record.get('decided_by')
+                    }
+                elif record_type == RECORD_DETAIL:
+                    state.details[record['url']] = record.get('data', {})
+                elif record_type == RECORD_COMPLETE:
+                    state.completed = True
+        return state
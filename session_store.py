@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from cryptography.fernet import Fernet, InvalidToken
+from loguru import logger
+
+from fix_settings_patch import get_app_paths
+import rate_limiter
+
+# keyringは任意の依存（インストールされている場合はOSのキーチェーンに暗号鍵を保存する）
+try:
+    import keyring
+except ImportError:
+    keyring = None
+
+# アプリケーションパスを取得
+data_dir = get_app_paths()['data_dir']
+
+# 暗号化したCookie、利用状況の保存先
+COOKIE_JAR_FILE = data_dir / 'session_cookies.enc'
+METRICS_FILE = data_dir / 'session_metrics.json'
+
+# 暗号鍵の保存先（OSのキーチェーン。利用できない場合のみCookieと同じディレクトリのファイル）
+KEYRING_SERVICE = 'ankenNaviCHO'
+KEYRING_USERNAME = 'session_cookies_key'
+COOKIE_KEY_FILE = data_dir / '.session_cookies.key'
+
+# セッションの有効性確認に使用するログイン必須ページ
+VALIDATION_URL = "https://crowdworks.jp/dashboard"
+
+# 有効性確認リクエストのタイムアウト（秒）
+VALIDATION_TIMEOUT = 10
+
+# Seleniumと同じUser-Agentを使用
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+_metrics_lock = threading.Lock()
+
+_key_cache = {}
+
+def _load_key_from_keyring() -> Optional[bytes]:
+    """
+    OSのキーチェーンから鍵を取得する（存在しない場合は生成して保存）
+
+    以前のバージョンでファイルに保存した鍵がある場合は、キーチェーンに移してファイルを削除する。
+
+    Returns:
+        鍵（keyringがインストールされていない、またはキーチェーンを利用できない場合はNone）
+    """
+    if keyring is None:
+        return None
+    try:
+        key = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+        if key is None:
+            if COOKIE_KEY_FILE.exists():
+                key = COOKIE_KEY_FILE.read_bytes().decode('ascii')
+            else:
+                key = Fernet.generate_key().decode('ascii')
+            keyring.set_password(KEYRING_SERVICE, KEYRING_USERNAME, key)
+            if COOKIE_KEY_FILE.exists():
+                COOKIE_KEY_FILE.unlink()
+                logger.info("セッションCookieの暗号鍵をOSのキーチェーンに移しました")
+        return key.encode('ascii')
+    except Exception as e:
+        logger.warning(f"OSのキーチェーンを利用できないため、暗号鍵をファイルに保存します: {str(e)}")
+        return None
+
+def _load_key_from_file() -> bytes:
+    """ファイルから鍵を読み込む（存在しない場合は生成）"""
+    if not COOKIE_KEY_FILE.exists():
+        COOKIE_KEY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        COOKIE_KEY_FILE.write_bytes(Fernet.generate_key())
+        os.chmod(COOKIE_KEY_FILE, 0o600)
+    return COOKIE_KEY_FILE.read_bytes()
+
+def _get_fernet() -> Fernet:
+    """
+    Cookie暗号化用の鍵を読み込む（存在しない場合は生成）
+
+    鍵はOSのキーチェーンに保存し、Cookieのファイルだけを読まれても復号できないようにする。
+    keyringがない、またはキーチェーンを利用できない環境（ヘッドレスのLinuxなど）では
+    Cookieと同じディレクトリのファイルに鍵を保存する。この場合はデータディレクトリを
+    読める人なら誰でも復号できるため、ファイルをのぞき見された際に内容が読めない程度の保護にとどまる。
+    キーチェーンの鍵が失われた場合は、保存済みのCookieを破棄して再ログインする。
+    """
+    if 'key' not in _key_cache:
+        _key_cache['key'] = _load_key_from_keyring() or _load_key_from_file()
+    return Fernet(_key_cache['key'])
+
+def save_cookies(driver, email: str):
+    """ログイン済みのブラウザのCookieを暗号化して保存"""
+    try:
+        payload = {
+            'email': email,
+            'saved_at': datetime.now().isoformat(),
+            'cookies': driver.get_cookies()
+        }
+        token = _get_fernet().encrypt(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        COOKIE_JAR_FILE.write_bytes(token)
+        os.chmod(COOKIE_JAR_FILE, 0o600)
+        logger.info(f"セッションCookieを保存しました（{len(payload['cookies'])}件）")
+    except Exception as e:
+        logger.warning(f"セッションCookieの保存に失敗: {str(e)}")
+
+def load_cookies(email: str) -> Optional[List[Dict]]:
+    """保存済みのCookieを復号して読み込む（別アカウントのCookieや破損したファイルはNone）"""
+    if not COOKIE_JAR_FILE.exists():
+        return None
+    try:
+        payload = json.loads(_get_fernet().decrypt(COOKIE_JAR_FILE.read_bytes()))
+    except (InvalidToken, ValueError) as e:
+        logger.warning(f"保存済みのセッションCookieを読み込めません: {str(e)}")
+        clear_cookies()
+        return None
+    if payload.get('email') != email:
+        return None
+    return payload.get('cookies') or None
+
+def clear_cookies():
+    """保存済みのCookieを削除"""
+    try:
+        COOKIE_JAR_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+def is_session_valid(cookies: List[Dict]) -> bool:
+    """ログイン必須ページにリクエストし、ログインページへ転送されないかを確認"""
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    for cookie in cookies:
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    try:
+        rate_limiter.site_limiter(VALIDATION_URL).acquire()
+        response = session.get(VALIDATION_URL, timeout=VALIDATION_TIMEOUT, allow_redirects=False)
+    except requests.RequestException as e:
+        logger.warning(f"セッションの有効性確認に失敗: {str(e)}")
+        return False
+    finally:
+        session.close()
+    if response.is_redirect and '/login' in response.headers.get('Location', ''):
+        return False
+    return response.status_code == 200
+
+def _to_cdp_cookie(cookie: Dict) -> Dict:
+    """WebDriver形式のCookieをChrome DevTools Protocol形式に変換"""
+    cdp_cookie = {
+        'name': cookie['name'],
+        'value': cookie['value'],
+        'domain': cookie.get('domain'),
+        'path': cookie.get('path', '/'),
+        'secure': cookie.get('secure', False),
+        'httpOnly': cookie.get('httpOnly', False)
+    }
+    if cookie.get('expiry'):
+        cdp_cookie['expires'] = cookie['expiry']
+    if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+        cdp_cookie['sameSite'] = cookie['sameSite']
+    return cdp_cookie
+
+def restore_session(driver, email: str, consumer: str) -> bool:
+    """
+    保存済みのCookieをブラウザに復元する
+
+    Args:
+        driver: Chrome WebDriver
+        email: ログインに使用するメールアドレス（保存時と異なる場合は復元しない）
+        consumer: 利用元（'crawler' / 'bulk_apply'）。利用状況の集計に使用
+
+    Returns:
+        有効なセッションを復元できた場合はTrue（フォームからのログインが必要な場合はFalse）
+    """
+    start_time = time.monotonic()
+    cookies = load_cookies(email)
+    if not cookies:
+        return False
+
+    if not is_session_valid(cookies):
+        logger.info("保存済みのセッションが期限切れのため、ログインし直します")
+        clear_cookies()
+        record_event(consumer, 'expired')
+        return False
+
+    try:
+        # ページを開かずに全ドメインのCookieを設定する
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': [_to_cdp_cookie(c) for c in cookies]})
+    except Exception as e:
+        logger.warning(f"セッションCookieの復元に失敗: {str(e)}")
+        return False
+
+    record_event(consumer, 'reused')
+    logger.info(f"保存済みのセッションを再利用しました（{time.monotonic() - start_time:.2f}秒）")
+    return True
+
+def _load_metrics() -> Dict:
+    try:
+        with open(METRICS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def record_event(consumer: str, event: str):
+    """
+    セッションの利用状況を記録
+
+    Args:
+        consumer: 利用元（'crawler' / 'bulk_apply'）
+        event: 'reused'（Cookieを再利用）/ 'fresh_login'（フォームからログイン）/ 'expired'（Cookieが期限切れ）
+    """
+    with _metrics_lock:
+        try:
+            metrics = _load_metrics()
+            counters = metrics.setdefault(consumer, {'reused': 0, 'fresh_login': 0, 'expired': 0})
+            counters[event] = counters.get(event, 0) + 1
+            counters['last_' + event] = datetime.now().isoformat()
+            temp_file = METRICS_FILE.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(metrics, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, METRICS_FILE)
+        except Exception as e:
+            logger.warning(f"セッション利用状況の記録に失敗: {str(e)}")
+
+def get_metrics() -> Dict:
+    """利用元ごとのCookie再利用回数・ログイン回数と再利用率を取得"""
+    metrics = _load_metrics()
+    for counters in metrics.values():
+        logins = counters.get('reused', 0) + counters.get('fresh_login', 0)
+        counters['reuse_rate'] = round(counters.get('reused', 0) / logins, 3) if logins else 0.0
+    return metrics
@@ -0,0 +1,47 @@
+import pytest
+
+import budget_parser
+from budget_parser import BUDGET_TYPE_FIXED, BUDGET_TYPE_HOURLY, BUDGET_TYPE_UNSET
+
+@pytest.mark.parametrize('text, budget_min, budget_max, budget_type', [
+    ('10,000円 〜 50,000円', 10000, 50000, BUDGET_TYPE_FIXED),
+    ('50,000円 〜 10,000円', 10000, 50000, BUDGET_TYPE_FIXED),
+    ('１０，０００円 ～ ５０，０００円', 10000, 50000, BUDGET_TYPE_FIXED),
+    ('１．５万円', 15000, 15000, BUDGET_TYPE_FIXED),
+    ('1万5000円', 15000, 15000, BUDGET_TYPE_FIXED),
+    ('3千円', 3000, 3000, BUDGET_TYPE_FIXED),
+    ('〜 50,000円', None, 50000, BUDGET_TYPE_FIXED),
+    ('10,000円 〜', 10000, None, BUDGET_TYPE_FIXED),
+    ('10,000円から', 10000, None, BUDGET_TYPE_FIXED),
+    ('1,000円 / 時間', 1000, 1000, BUDGET_TYPE_HOURLY),
+    ('時給 1,500円 〜 2,000円', 1500, 2000, BUDGET_TYPE_HOURLY),
+    ('¥5,000', 5000, 5000, BUDGET_TYPE_FIXED),
+    ('5000', 5000, 5000, BUDGET_TYPE_FIXED),
+])
+def test_parse_budget_amounts(text, budget_min, budget_max, budget_type):
+    result = budget_parser.parse_budget(text)
+    assert (result['budget_min'], result['budget_max'], result['budget_type']) == (budget_min, budget_max, budget_type)
+    assert result['budget_currency'] == 'JPY'
+
+@pytest.mark.parametrize('text, budget_min, budget_max', [
+    ('3件 10,000円', 10000, 10000),
+    ('1時間 1,000円', 1000, 1000),
+    ('2名 × 3万円 〜 5万円', 30000, 50000),
+])
+def test_parse_budget_ignores_counts(text, budget_min, budget_max):
+    result = budget_parser.parse_budget(text)
+    assert (result['budget_min'], result['budget_max']) == (budget_min, budget_max)
+
+@pytest.mark.parametrize('text', [None, '', '予算未設定', '相談して決める'])
+def test_parse_budget_unset(text):
+    assert budget_parser.parse_budget(text) == {
+        'budget_min': None,
+        'budget_max': None,
+        'budget_type': BUDGET_TYPE_UNSET,
+        'budget_currency': None
+    }
+
+def test_parse_budget_hourly_without_amount():
+    result = budget_parser.parse_budget('時間単価制')
+    assert result['budget_type'] == BUDGET_TYPE_HOURLY
+    assert result['budget_min'] is None and result['budget_max'] is None
@@ -0,0 +1,41 @@
+import time
+
+import llm_cache
+from llm_cache import VerdictCache
+
+JOB = {'title': 'Python開発', 'budget': '10,000円', 'client': 'A'}
+
+def test_key_depends_on_prompt_model_and_content():
+    key = llm_cache.make_key('条件', 'gpt-4o-mini', JOB)
+    assert key == llm_cache.make_key('条件', 'gpt-4o-mini', dict(JOB))
+    assert key != llm_cache.make_key('別の条件', 'gpt-4o-mini', JOB)
+    assert key != llm_cache.make_key('条件', 'gpt-4o', JOB)
+    assert key != llm_cache.make_key('条件', 'gpt-4o-mini', {**JOB, 'budget': '20,000円'})
+
+def test_put_and_get_many_count_hits(tmp_path):
+    cache = VerdictCache(tmp_path / 'cache.sqlite3')
+    cache.put('a', {'decision': 'yes', 'reason': '合う'})
+    found = cache.get_many(['a', 'b', 'a'])
+    assert found == {'a': {'decision': 'yes', 'reason': '合う'}}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1)
+    assert stats['total_hits'] == 2
+
+def test_only_yes_and_no_are_cached(tmp_path):
+    cache = VerdictCache(tmp_path / 'cache.sqlite3')
+    for decision in ('error', 'maybe', ''):
+        cache.put(decision or 'empty', {'decision': decision, 'reason': ''})
+    assert cache.stats()['entries'] == 0
+
+def test_evicts_expired_and_least_recently_used(tmp_path):
+    cache = VerdictCache(tmp_path / 'cache.sqlite3', max_entries=2, max_age_days=1)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, {'decision': 'no', 'reason': ''})
+    with cache._lock:
+        cache._conn.execute("UPDATE verdicts SET last_used_at = ? WHERE key = 'a'", (time.time() - 10,))
+        cache._conn.execute("UPDATE verdicts SET created_at = ? WHERE key = 'c'", (time.time() - 2 * 86400,))
+        cache._conn.commit()
+    cache.put('d', {'decision': 'yes', 'reason': ''})
+    # 期限切れの c と、上限を超えた分のうち最終利用が最も古い a を削除する
+    assert cache.evict() == 2
+    assert set(cache.get_many(['a', 'b', 'c', 'd'])) == {'b', 'd'}
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import llm_filter
+
+def _job(title='案件', budget='10,000円', client='クライアント'):
+    return {'title': title, 'budget': budget, 'client': client}
+
+def test_split_batches_by_count_keeps_order():
+    batches = llm_filter.split_batches([_job() for _ in range(25)], batch_size=10, token_budget=10000)
+    assert batches == [list(range(0, 10)), list(range(10, 20)), list(range(20, 25))]
+
+def test_split_batches_by_token_budget():
+    jobs = [_job(title='あ' * 100) for _ in range(4)]
+    tokens = llm_filter.estimate_tokens(llm_filter.format_job_for_batch(1, jobs[0]))
+    batches = llm_filter.split_batches(jobs, batch_size=10, token_budget=tokens * 2)
+    assert batches == [[0, 1], [2, 3]]
+
+def test_split_batches_oversized_job_gets_own_batch():
+    jobs = [_job(), _job(title='あ' * 1000), _job()]
+    batches = llm_filter.split_batches(jobs, batch_size=10, token_budget=50)
+    assert [index for batch in batches for index in batch] == [0, 1, 2]
+    assert [1] in batches
+
+def test_split_batches_empty():
+    assert llm_filter.split_batches([], batch_size=10, token_budget=100) == []
+
+def test_parse_batch_response_results_object():
+    content = json.dumps({'results': [
+        {'id': 1, 'decision': 'yes', 'reason': 'a'},
+        {'id': 2, 'decision': 'NO', 'reason': 'b'}
+    ]})
+    assert llm_filter.parse_batch_response(content, 2) == {
+        1: {'decision': 'yes', 'reason': 'a'},
+        2: {'decision': 'no', 'reason': 'b'}
+    }
+
+def test_parse_batch_response_other_key_and_bare_array():
+    item = {'id': '1', 'decision': 'yes', 'reason': ''}
+    assert llm_filter.parse_batch_response(json.dumps({'items': [item]}), 1) == {1: {'decision': 'yes', 'reason': ''}}
+    assert llm_filter.parse_batch_response(json.dumps([item]), 1) == {1: {'decision': 'yes', 'reason': ''}}
+
+def test_parse_batch_response_drops_invalid_items():
+    content = json.dumps({'results': [
+        {'id': 1, 'decision': 'maybe'},
+        {'id': 2, 'decision': ''},
+        {'id': 5, 'decision': 'yes'},
+        {'id': 'x', 'decision': 'yes'},
+        'yes',
+        {'id': 3, 'decision': ' yes '}
+    ]})
+    assert llm_filter.parse_batch_response(content, 3) == {3: {'decision': 'yes', 'reason': ''}}
+
+def test_parse_batch_response_errors():
+    with pytest.raises(ValueError):
+        llm_filter.parse_batch_response(json.dumps({'results': 'yes'}), 1)
+    with pytest.raises(json.JSONDecodeError):
+        llm_filter.parse_batch_response('not json', 1)
+
+def test_parse_job_response_valid():
+    content = json.dumps({'decision': 'Yes', 'reason': '条件に合う'})
+    assert llm_filter.parse_job_response(content) == {'decision': 'yes', 'reason': '条件に合う'}
+
+@pytest.mark.parametrize('content', [
+    json.dumps({'decision': 'maybe'}),
+    json.dumps({'decision': ''}),
+    json.dumps({'decision': 'はい'}),
+    json.dumps({'reason': 'decisionなし'}),
+    json.dumps(['yes']),
+    'not json'
+])
+def test_parse_job_response_rejects_malformed(content):
+    with pytest.raises(ValueError):
+        llm_filter.parse_job_response(content)
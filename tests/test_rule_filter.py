@@ -0,0 +1,69 @@
+import rule_filter
+from rule_filter import ACCEPT, REJECT, RuleFilter
+
+def _job(title='PythonでWebアプリ開発', budget='10,000円 〜 50,000円', client='株式会社A'):
+    return {'title': title, 'budget': budget, 'client': client}
+
+def _filter(**config):
+    return RuleFilter.from_settings({'filter_rules': config})
+
+def test_no_rules_leaves_everything_to_llm():
+    decisions, stats = RuleFilter.from_settings({}).split([_job(), _job()])
+    assert decisions == [(None, ''), (None, '')]
+    assert stats == {'accepted': 0, 'rejected': 0, 'ambiguous': 2, 'llm_jobs_skipped': 0}
+
+def test_reject_rules_win_over_accept_rules():
+    rules = _filter(exclude_keywords=['データ入力'], accept_keywords=['Python'])
+    assert rules.evaluate(_job(title='Pythonでデータ入力'))[0] == REJECT
+    assert rules.evaluate(_job(title='Pythonで開発'))[0] == ACCEPT
+    assert rules.evaluate(_job(title='Javaで開発'))[0] is None
+
+def test_keywords_are_case_insensitive():
+    rules = _filter(require_keywords=['python'])
+    assert rules.evaluate(_job(title='PYTHONの案件'))[0] is None
+    assert rules.evaluate(_job(title='Rubyの案件'))[0] == REJECT
+
+def test_blocked_clients_match_exactly():
+    rules = _filter(blocked_clients=['株式会社A'])
+    assert rules.evaluate(_job(client='株式会社A'))[0] == REJECT
+    assert rules.evaluate(_job(client='株式会社AB'))[0] is None
+
+def test_budget_min_uses_fixed_upper_bound_only():
+    rules = _filter(budget_min=30000)
+    assert rules.evaluate(_job(budget='10,000円 〜 20,000円'))[0] == REJECT
+    assert rules.evaluate(_job(budget='10,000円 〜 50,000円'))[0] is None
+    # 時間単価・未設定・上限不明の予算では判定しない
+    assert rules.evaluate(_job(budget='1,000円 / 時間'))[0] is None
+    assert rules.evaluate(_job(budget='予算未設定'))[0] is None
+    assert rules.evaluate(_job(budget='10,000円 〜'))[0] is None
+
+def test_budget_min_prefers_parsed_fields():
+    job = _job(budget='不明')
+    job.update({'budget_type': 'fixed', 'budget_min': 5000, 'budget_max': 5000})
+    assert _filter(budget_min=10000).evaluate(job)[0] == REJECT
+
+def test_custom_rules_and_reason():
+    rules = _filter(rules=[{'field': 'title', 'op': 'regex', 'value': '急募', 'action': 'reject'}])
+    decision, reason = rules.evaluate(_job(title='【急募】LP制作'))
+    assert decision == REJECT
+    assert reason.startswith('ルール判定')
+
+def test_invalid_rule_is_skipped():
+    rules = RuleFilter([
+        {'field': 'title', 'op': 'unknown', 'value': 'x', 'action': REJECT},
+        {'field': 'title', 'op': 'regex', 'value': '(', 'action': REJECT},
+        {'field': 'title', 'op': 'contains', 'value': 'Python', 'action': ACCEPT}
+    ])
+    assert rules.evaluate(_job())[0] == ACCEPT
+
+def test_numeric_ops_ignore_non_numbers():
+    assert not rule_filter._match('abc', 'lt', 10)
+    assert not rule_filter._match(None, 'gte', 10)
+    assert rule_filter._match('', 'is_empty', None)
+
+def test_split_counts():
+    rules = _filter(exclude_keywords=['データ入力'], accept_keywords=['Python'])
+    jobs = [_job(title='データ入力'), _job(title='Python'), _job(title='Go')]
+    decisions, stats = rules.split(jobs)
+    assert [decision for decision, _ in decisions] == [REJECT, ACCEPT, None]
+    assert stats == {'accepted': 1, 'rejected': 1, 'ambiguous': 1, 'llm_jobs_skipped': 2}
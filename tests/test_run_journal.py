@@ -0,0 +1,69 @@
+import pytest
+
+import run_journal
+from run_journal import RunJournal
+
+@pytest.fixture(autouse=True)
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_journal, 'RUNS_DIR', tmp_path / 'runs')
+    return tmp_path / 'runs'
+
+def _jobs(count):
+    return [{'url': f'https://example.com/{i}', 'title': f'案件{i}'} for i in range(count)]
+
+def test_resume_state_after_each_stage():
+    jobs = _jobs(4)
+    journal = RunJournal.create('jobs_1.jsonl')
+    journal.record_page(jobs, jobs[1:])
+    state = journal.load_state()
+    assert state.base_filename == 'jobs_1.jsonl'
+    assert len(state.scraped_jobs) == 4
+    assert [job['url'] for job in state.pending_filter()] == [job['url'] for job in jobs[1:]]
+
+    jobs[1]['gpt_reason'] = '条件に合う'
+    jobs[1]['decided_by'] = jobs[2]['decided_by'] = 'llm'
+    journal.record_verdicts(jobs[1:3], [jobs[1]])
+    journal.record_details([jobs[1]['url'], jobs[2]['url']], [{'detail_description': '詳細'}, {}])
+    state = journal.load_state()
+    assert [job['url'] for job in state.pending_filter()] == [jobs[3]['url']]
+    assert state.verdicts[jobs[2]['url']] == {'decision': 'no', 'reason': '', 'decided_by': 'llm'}
+    assert list(state.details) == [jobs[1]['url']]
+    accepted = state.accepted_jobs()
+    assert [job['url'] for job in accepted] == [jobs[1]['url']]
+    assert accepted[0]['gpt_reason'] == '条件に合う'
+    assert accepted[0]['decided_by'] == 'llm'
+    assert accepted[0]['detail_description'] == '詳細'
+    assert not state.completed
+
+    journal.complete('jobs_1_filtered.jsonl')
+    assert journal.load_state().completed
+
+def test_torn_last_line_is_ignored_and_not_merged():
+    jobs = _jobs(2)
+    journal = RunJournal.create('jobs_1.jsonl')
+    journal.record_page(jobs, jobs)
+    # 書き込み途中で異常終了した状態を再現する
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "verdict", "url": "https://exa')
+
+    resumed = RunJournal(journal.path)
+    state = resumed.load_state()
+    assert len(state.pending_filter()) == 2
+
+    resumed.record_verdicts(jobs, [])
+    state = resumed.load_state()
+    assert state.pending_filter() == []
+    assert set(state.verdicts) == {job['url'] for job in jobs}
+
+def test_find_returns_latest_incomplete_run():
+    finished = RunJournal.create('jobs_1.jsonl')
+    finished.complete(None)
+    unfinished = RunJournal.create('jobs_2.jsonl')
+    assert RunJournal.find().run_id == unfinished.run_id
+    assert RunJournal.find(finished.run_id).run_id == finished.run_id
+    assert RunJournal.find('run_missing') is None
+
+def test_runs_started_in_the_same_second_get_separate_files():
+    journals = [RunJournal.create(f'jobs_{i}.jsonl') for i in range(5)]
+    assert len({journal.path for journal in journals}) == 5
+    assert [journal.load_state().base_filename for journal in journals] == [f'jobs_{i}.jsonl' for i in range(5)]
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import job_store
+import url_index
+from url_index import UrlIndex
+
+@pytest.fixture
+def crawled_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_index, 'CRAWLED_DATA_DIR', tmp_path)
+    return tmp_path
+
+def _job(url, title='案件', budget='10,000円', posted_date=None):
+    return {'url': url, 'title': title, 'budget': budget, 'client': 'A', 'posted_date': posted_date}
+
+def test_imports_existing_history_once(crawled_dir):
+    job_store.write_records(str(crawled_dir / 'jobs_20240101_000000.jsonl'), [_job('u1'), _job('u2')])
+    job_store.write_records(str(crawled_dir / 'jobs_20240102_000000.json'), [_job('u3')])
+    job_store.write_records(str(crawled_dir / 'jobs_20240102_000000_filtered.json'), [_job('u3')])
+    index = UrlIndex(crawled_dir / 'index.sqlite3')
+    assert index.count() == 3
+    assert 'u1' in index and 'u3' in index
+
+    # 取り込み済みの場合は、ファイルが増えても再度取り込まない
+    job_store.write_records(str(crawled_dir / 'jobs_20240103_000000.jsonl'), [_job('u4')])
+    assert UrlIndex(crawled_dir / 'index.sqlite3').count() == 3
+
+def test_record_updates_existing_urls(crawled_dir):
+    index = UrlIndex(crawled_dir / 'index.sqlite3')
+    index.record([_job('u1', posted_date='2024-01-02T00:00:00')], seen_at=100)
+    index.record([_job('u1', budget='20,000円')], seen_at=200)
+    found = index.lookup(['u1', 'missing', None])
+    assert list(found) == ['u1']
+    # 投稿日時がない記録では以前の投稿日時を残す
+    assert found['u1']['posted_date'] == '2024-01-02T00:00:00'
+    assert found['u1']['content_hash'] == url_index.content_hash(_job('u1', budget='20,000円'))
+
+def test_remove_respects_seen_before(crawled_dir):
+    index = UrlIndex(crawled_dir / 'index.sqlite3')
+    index.record([_job('old'), _job('recent')], seen_at=100)
+    index.record([_job('recent')], seen_at=300)
+    assert index.remove({'old', 'recent', 'unknown'}, seen_before=200) == 1
+    assert 'old' not in index and 'recent' in index
+    assert index.remove(['recent']) == 1
+    assert index.count() == 0
+
+def test_clear_does_not_reimport_history(crawled_dir):
+    job_store.write_records(str(crawled_dir / 'jobs_20240101_000000.jsonl'), [_job('u1')])
+    index = UrlIndex(crawled_dir / 'index.sqlite3')
+    index.clear()
+    assert index.count() == 0
+    assert UrlIndex(crawled_dir / 'index.sqlite3').count() == 0
+
+def test_urls_in_files_skips_unreadable(crawled_dir):
+    good = crawled_dir / 'jobs_1.jsonl'
+    job_store.write_records(str(good), [_job('u1'), {'title': 'URLなし'}])
+    broken = crawled_dir / 'jobs_2.json'
+    broken.write_text('[{', encoding='utf-8')
+    assert url_index.urls_in_files([good, broken, crawled_dir / 'missing.jsonl']) == {'u1'}
+
+def test_newest_posted_date_and_is_newer(crawled_dir):
+    index = UrlIndex(crawled_dir / 'index.sqlite3')
+    index.record([_job('u1', posted_date='2024-01-01T00:00:00'), _job('u2', posted_date='2024-02-01T00:00:00'),
+                  _job('u3')])
+    assert index.newest_posted_date() == '2024-02-01T00:00:00'
+    assert url_index.is_newer('2024-02-01T00:00:00', '2024-01-01T00:00:00')
+    assert not url_index.is_newer(None, '2024-01-01T00:00:00')
+    assert not url_index.is_newer('2024-02-01T00:00:00+09:00', '2024-01-01T00:00:00')
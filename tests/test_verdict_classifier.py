@@ -0,0 +1,48 @@
+import pytest
+
+import job_store
+import verdict_classifier
+
+PROMPT = 'Pythonの案件'
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(verdict_classifier, 'CRAWLED_DATA_DIR', tmp_path)
+    monkeypatch.setattr(verdict_classifier, 'VERDICT_LOG_FILE', tmp_path / 'verdicts.jsonl')
+    return tmp_path
+
+def _job(url, decided_by=verdict_classifier.STAGE_LLM, title='案件'):
+    return {'url': url, 'title': title, 'budget': '10,000円', 'client': 'A', 'decided_by': decided_by}
+
+def test_only_llm_verdicts_for_current_prompt_are_labels(data_dir):
+    jobs = [
+        _job('llm-yes'),
+        _job('llm-no'),
+        _job('rule', verdict_classifier.STAGE_RULE),
+        _job('ranker', verdict_classifier.STAGE_RANKER),
+        _job('classifier', verdict_classifier.STAGE_CLASSIFIER),
+        _job('error', verdict_classifier.STAGE_ERROR)
+    ]
+    job_store.write_records(str(data_dir / 'jobs_20240101_000000.jsonl'), jobs)
+    verdict_classifier.record_verdicts(jobs, [jobs[0], jobs[2], jobs[5]], PROMPT)
+    # 別のフィルタ条件での判定はラベルに使わない
+    verdict_classifier.record_verdicts([_job('old-prompt')], [], '以前の条件')
+
+    assert verdict_classifier.load_llm_verdicts(PROMPT) == {'llm-yes': 1, 'llm-no': 0}
+    samples = verdict_classifier.load_training_data(PROMPT)
+    assert sorted((job['url'], label) for job, label in samples) == [('llm-no', 0), ('llm-yes', 1)]
+
+def test_latest_verdict_wins(data_dir):
+    job = _job('u1')
+    verdict_classifier.record_verdicts([job], [job], PROMPT)
+    # 後からルールで判定された案件はLLMの判定として扱わない
+    verdict_classifier.record_verdicts([_job('u1', verdict_classifier.STAGE_RULE)], [], PROMPT)
+    assert verdict_classifier.load_llm_verdicts(PROMPT) == {}
+
+def test_train_refuses_too_few_matching_samples(data_dir):
+    jobs = [_job(f'u{i}', title=f'案件{i}') for i in range(10)]
+    job_store.write_records(str(data_dir / 'jobs_20240101_000000.jsonl'), jobs)
+    verdict_classifier.record_verdicts(jobs, jobs[:5], PROMPT)
+    settings = {'verdict_classifier': {'min_samples': 20}}
+    with pytest.raises(ValueError):
+        verdict_classifier.train(settings, PROMPT)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+import job_store
+from fix_settings_patch import get_app_paths
+
+# 保存先ディレクトリとインデックスDBのパス
+CRAWLED_DATA_DIR = get_app_paths()['data_dir'] / 'crawled_data'
+URL_INDEX_DB_FILE = CRAWLED_DATA_DIR / 'url_index.sqlite3'
+
+def content_hash(job: Dict) -> str:
+    """一覧に表示される案件内容のハッシュ（内容が変わった案件の検出に使用）"""
+    payload = json.dumps([
+        job.get('title', ''),
+        job.get('budget', ''),
+        job.get('client', '')
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    """投稿日時を解析（不明な場合はNone）"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def is_newer(posted_date: Optional[str], previous_posted_date: Optional[str]) -> bool:
+    """投稿日時が前回より新しいか（どちらかが不明な場合や比較できない場合はFalse）"""
+    new_date = _parse_date(posted_date)
+    prev_date = _parse_date(previous_posted_date)
+    if new_date is None or prev_date is None:
+        return False
+    try:
+        return new_date > prev_date
+    except TypeError:
+        # タイムゾーンの有無が異なる場合は比較しない
+        return False
+
+class UrlIndex:
+    """全てのクロール履歴の案件URLを保持するSQLiteのインデックス"""
+
+    def __init__(self, db_path: Path = URL_INDEX_DB_FILE):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                title TEXT,
+                posted_date TEXT,
+                content_hash TEXT,
+                first_seen_at REAL NOT NULL,
+                last_seen_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        self._conn.commit()
+        self._import_history()
+
+    def _import_history(self):
+        """初回のみ、既存の jobs_*.json / jobs_*.jsonl を全て取り込む"""
+        with self._lock:
+            if self._conn.execute("SELECT value FROM meta WHERE name = 'history_imported'").fetchone():
+                return
+        files = sorted((Path(path) for path in job_store.list_files(CRAWLED_DATA_DIR)),
+                       key=lambda path: path.stat().st_mtime)
+        imported = 0
+        for path in files:
+            try:
+                jobs = job_store.load_records(str(path))
+            except Exception as e:
+                logger.warning(f"履歴ファイルの読み込みに失敗: {path.name}: {str(e)}")
+                continue
+            self.record(jobs, seen_at=path.stat().st_mtime)
+            imported += len(jobs)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('history_imported', ?)",
+                               (datetime.now().isoformat(),))
+            self._conn.commit()
+        if files:
+            logger.info(f"URLインデックスに既存の履歴を取り込みました（{len(files)}ファイル, {imported}件）")
+
+    def __contains__(self, url: str) -> bool:
+        return self.lookup([url]).get(url) is not None
+
+    def lookup(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        複数のURLをまとめて参照する
+
+        Returns:
+            インデックスに存在したURLをキーとした posted_date, content_hash, title
+        """
+        found = {}
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        with self._lock:
+            # SQLiteのパラメータ数上限を避けるため分割して問い合わせる
+            for start in range(0, len(unique_urls), 500):
+                chunk = unique_urls[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT url, posted_date, content_hash, title FROM urls WHERE url IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for url, posted_date, hash_value, title in rows:
+                    found[url] = {'posted_date': posted_date, 'content_hash': hash_value, 'title': title}
+        return found
+
+    def record(self, jobs: List[Dict], seen_at: Optional[float] = None):
+        """案件を取得済みとして記録（既存のURLは投稿日時・内容ハッシュ・最終取得日時を更新）"""
+        now = seen_at or time.time()
+        rows = [
+            (job['url'], job.get('title'), job.get('posted_date'), content_hash(job), now, now)
+            for job in jobs if job.get('url')
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO urls (url, title, posted_date, content_hash, first_seen_at, last_seen_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    posted_date = COALESCE(excluded.posted_date, urls.posted_date),
+                    content_hash = excluded.content_hash,
+                    last_seen_at = MAX(urls.last_seen_at, excluded.last_seen_at)
+            """, rows)
+            self._conn.commit()
+
+    def newest_posted_date(self) -> Optional[str]:
+        """記録済みの案件の最新投稿日時"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT posted_date FROM urls WHERE posted_date IS NOT NULL ORDER BY last_seen_at DESC LIMIT 500"
+            ).fetchall()
+        newest = None
+        for (posted_date,) in rows:
+            if newest is None or is_newer(posted_date, newest):
+                newest = posted_date
+        return newest
+
+    def remove(self, urls, seen_before: Optional[float] = None) -> int:
+        """
+        指定したURLを記録から削除する（案件データの削除時に使用）
+
+        Args:
+            seen_before: 指定した場合、最終取得日時がこの時刻より前のURLのみ削除する
+
+        Returns:
+            削除した件数
+        """
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        removed = 0
+        with self._lock:
+            for start in range(0, len(unique_urls), 500):
+                chunk = unique_urls[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                query = f"DELETE FROM urls WHERE url IN ({placeholders})"
+                params = list(chunk)
+                if seen_before is not None:
+                    query += " AND last_seen_at < ?"
+                    params.append(seen_before)
+                removed += self._conn.execute(query, params).rowcount
+            self._conn.commit()
+        return removed
+
+    def clear(self):
+        """全ての記録を削除する（全データのクリア時に使用。既存ファイルの再取り込みは行わない）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM urls")
+            self._conn.commit()
+
+    def count(self) -> int:
+        """記録済みのURL数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+def urls_in_files(paths) -> set:
+    """案件データファイルに含まれるURLの集合（読み込めないファイルは読み飛ばす）"""
+    urls = set()
+    for path in paths:
+        try:
+            urls.update(job['url'] for job in job_store.iter_records(str(path)) if job.get('url'))
+        except Exception as e:
+            logger.warning(f"案件データファイルの読み込みに失敗: {path}: {str(e)}")
+    return urls
+
+_instance = None
+_instance_lock = threading.Lock()
+
+def get_index() -> UrlIndex:
+    """UrlIndexのシングルトンインスタンスを取得"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = UrlIndex()
+        return _instance
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+過去のLLMの判定結果から学習したローカル分類器
+
+判定ログに記録された、現在のフィルタ条件でのLLMの採用・不採用をラベルとし、
+生データ（jobs_*.json / .jsonl）の案件から作ったハッシュ化した特徴量でロジスティック回帰を学習する。
+確信度の高い案件はAPIを呼ばずに判定し、判断が分かれる案件のみLLMに送る。
+
+再学習: python verdict_classifier.py --train
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+import budget_parser
+import job_store
+import relevance_ranker
+from fix_settings_patch import get_app_paths
+
+# 学習データの場所と、モデル・運用中の一致率の保存先
+CRAWLED_DATA_DIR = get_app_paths()['data_dir'] / 'crawled_data'
+MODEL_FILE = get_app_paths()['data_dir'] / 'verdict_classifier.npz'
+METRICS_FILE = get_app_paths()['data_dir'] / 'verdict_classifier_metrics.json'
+# 案件ごとの判定ログ（判定したステージとフィルタ条件のハッシュ。LLMの判定のみを学習に使うために記録する）
+VERDICT_LOG_FILE = get_app_paths()['data_dir'] / 'verdict_classifier_verdicts.jsonl'
+
+# 案件を判定したステージ（案件の decided_by に記録する）
+STAGE_RULE = 'rule'              # ルールフィルタ
+STAGE_RANKER = 'ranker'          # 事前ランキングでLLMに送らずに除外
+STAGE_CLASSIFIER = 'classifier'  # ローカル分類器
+STAGE_LLM = 'llm'                # LLM（キャッシュの判定を含む）
+STAGE_ERROR = 'error'            # LLMで判定できなかった
+
+# 分類器の既定値（設定の verdict_classifier で上書き可能）
+DEFAULT_CLASSIFIER_CONFIG = {
+    'enabled': False,
+    'accept_threshold': 0.9,    # 採用の確率がこれ以上の案件はLLMに送らずに採用する
+    'reject_threshold': 0.05,   # 採用の確率がこれ以下の案件はLLMに送らずに不採用とする
+    'min_samples': 200,         # 学習データがこれより少ないモデルは使わない
+    'min_agreement': 0.95,      # 検証データでの確信度の高い判定とLLMの一致率がこれ未満のモデルは使わない
+    'audit_rate': 0.05,         # 運用中の一致率を測るため、ローカルで判定した案件のうちLLMにも送る割合
+    'ngram_range': [2, 3],      # タイトルの文字n-gramの長さ
+    'n_features': 16384,        # 特徴量をハッシュする次元数
+    'cache_size': 5000,         # キャッシュする案件ベクトルの件数
+    'epochs': 300,
+    'learning_rate': 5.0,
+    'l2': 0.0001,
+    'holdout_ratio': 0.2        # 一致率の検証に使う学習データの割合
+}
+
+# 学習データの分割に使う乱数のシード（再学習しても同じ分割で比較できるようにする）
+SPLIT_SEED = 42
+
+def get_config(settings: Dict) -> Dict:
+    """設定から分類器の設定を取得"""
+    return {**DEFAULT_CLASSIFIER_CONFIG, **(settings.get('verdict_classifier') or {})}
+
+def prompt_hash(prompt: str) -> str:
+    """フィルタ条件のハッシュ（条件が変わったモデルを使わないために記録する）"""
+    return hashlib.sha256((prompt or '').strip().encode('utf-8')).hexdigest()[:16]
+
+def _token_index(token: str, n_features: int) -> int:
+    return zlib.crc32(token.encode('utf-8')) % n_features
+
+def _budget_bucket(amount: Optional[float]) -> str:
+    """金額を桁数で区分する（1万円台・10万円台など）"""
+    if not amount:
+        return 'none'
+    return str(int(np.log10(max(amount, 1))))
+
+def job_features(job: Dict, config: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    案件の特徴量（添字と値の疎ベクトル、L2正規化済み）
+
+    LLMに送るのと同じ項目（タイトル・予算・クライアント）から作る。
+    """
+    n_features = int(config['n_features'])
+    indices, values = relevance_ranker.vectorize(job.get('title', ''), config)
+    budget = budget_parser.parse_budget(job.get('budget'))
+    tokens = [
+        f"client:{job.get('client', '')}",
+        f"budget_type:{budget['budget_type']}",
+        f"budget_max:{budget['budget_type']}:{_budget_bucket(budget['budget_max'])}"
+    ]
+    features = dict(zip(indices.tolist(), values.tolist()))
+    for token in tokens:
+        index = _token_index(token, n_features)
+        features[index] = features.get(index, 0.0) + 1.0
+    feature_indices = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+    feature_values = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    norm = np.linalg.norm(feature_values)
+    return feature_indices, feature_values / norm if norm > 0 else feature_values
+
+class SparseRows:
+    """案件ごとの疎ベクトルをまとめた行列（行番号・列番号・値の3つの配列）"""
+
+    def __init__(self, vectors: List[Tuple[np.ndarray, np.ndarray]]):
+        self.count = len(vectors)
+        lengths = [len(indices) for indices, _ in vectors]
+        self.rows = np.repeat(np.arange(self.count), lengths)
+        self.indices = np.concatenate([indices for indices, _ in vectors]) if vectors else np.zeros(0, np.int64)
+        self.values = np.concatenate([values for _, values in vectors]) if vectors else np.zeros(0, np.float32)
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """各行と重みの内積"""
+        return np.bincount(self.rows, weights=self.values * weights[self.indices], minlength=self.count)
+
+    def transpose_dot(self, row_weights: np.ndarray, n_features: int) -> np.ndarray:
+        """行ごとの重みを掛けて列方向に合計する（勾配の計算に使う）"""
+        return np.bincount(self.indices, weights=self.values * row_weights[self.rows], minlength=n_features)
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+def fit(rows: SparseRows, labels: np.ndarray, config: Dict) -> Tuple[np.ndarray, float]:
+    """
+    L2正則化付きロジスティック回帰を勾配降下法で学習する
+
+    採用は不採用より少ないため、クラスの件数の逆数で重み付けする。
+    """
+    n_features = int(config['n_features'])
+    weights = np.zeros(n_features, dtype=np.float64)
+    bias = 0.0
+    positives = max(1, int(labels.sum()))
+    negatives = max(1, len(labels) - positives)
+    sample_weights = np.where(labels == 1, len(labels) / (2 * positives), len(labels) / (2 * negatives))
+    learning_rate = float(config['learning_rate'])
+    l2 = float(config['l2'])
+    for _ in range(int(config['epochs'])):
+        errors = (_sigmoid(rows.dot(weights) + bias) - labels) * sample_weights / len(labels)
+        weights -= learning_rate * (rows.transpose_dot(errors, n_features) + l2 * weights)
+        bias -= learning_rate * float(errors.sum())
+    return weights, bias
+
+_verdict_log_lock = threading.Lock()
+
+def record_verdicts(jobs: List[Dict], accepted_jobs: List[Dict], prompt: str):
+    """
+    判定した案件の採否を、判定したステージ（案件の decided_by）とフィルタ条件のハッシュとともに判定ログに記録する
+
+    Args:
+        jobs: 判定した全ての案件
+        accepted_jobs: 採用した案件
+        prompt: 判定に使ったフィルタ条件
+    """
+    accepted_ids = {id(job) for job in accepted_jobs}
+    current_hash = prompt_hash(prompt)
+    decided_at = datetime.now().isoformat()
+    records = []
+    for job in jobs:
+        if not job.get('url'):
+            continue
+        stage = job.get('decided_by')
+        if stage == STAGE_ERROR:
+            decision = 'error'
+        else:
+            decision = 'yes' if id(job) in accepted_ids else 'no'
+        records.append({
+            'url': job['url'],
+            'decided_by': stage,
+            'decision': decision,
+            'prompt_hash': current_hash,
+            'decided_at': decided_at
+        })
+    if not records:
+        return
+    try:
+        with _verdict_log_lock:
+            with job_store.JsonlWriter(str(VERDICT_LOG_FILE)) as writer:
+                writer.extend(records)
+    except Exception as e:
+        logger.warning(f"判定ログの記録に失敗: {str(e)}")
+
+def load_llm_verdicts(prompt: str) -> Dict[str, int]:
+    """
+    判定ログから、現在のフィルタ条件でのLLMの判定を取得する
+
+    同じURLが複数回ある場合は最新の判定を使い、それがLLM以外のステージの判定
+    またはフィルタ条件が異なる判定であれば除く。
+
+    Returns:
+        URLをキーとした判定（採用は1、不採用は0）
+    """
+    if not VERDICT_LOG_FILE.exists():
+        return {}
+    latest = {}
+    for record in job_store.iter_records(str(VERDICT_LOG_FILE)):
+        if record.get('url'):
+            latest[record['url']] = record
+    current_hash = prompt_hash(prompt)
+    return {
+        url: 1 if record['decision'] == 'yes' else 0
+        for url, record in latest.items()
+        if record.get('decided_by') == STAGE_LLM and record.get('prompt_hash') == current_hash
+        and record.get('decision') in ('yes', 'no')
+    }
+
+def load_training_data(prompt: str) -> List[Tuple[Dict, int]]:
+    """
+    過去のクロール結果から (案件, LLMの判定) の組を作る
+
+    ラベルは判定ログのうち、現在のフィルタ条件でLLMが判定したもののみを使う。
+    案件の内容は生データから取得し、同じURLが複数回ある場合は最新の内容を使う。
+    """
+    verdicts = load_llm_verdicts(prompt)
+    if not verdicts:
+        return []
+    samples = {}
+    raw_files = sorted(job_store.list_files(CRAWLED_DATA_DIR, filtered=False), key=os.path.getmtime)
+    for raw_file in raw_files:
+        try:
+            for job in job_store.iter_records(raw_file):
+                url = job.get('url')
+                if url in verdicts and job.get('title'):
+                    samples[url] = (job, verdicts[url])
+        except Exception as e:
+            logger.warning(f"学習データの読み込みに失敗: {raw_file}: {str(e)}")
+    return list(samples.values())
+
+def evaluate(probabilities: np.ndarray, labels: np.ndarray, config: Dict) -> Dict:
+    """
+    LLMの判定との一致率を集計する
+
+    confident_* は閾値によりローカルで判定される案件のみの値（実際の運用で効く一致率）。
+    """
+    predicted = probabilities >= 0.5
+    actual = labels == 1
+    confident_accept = probabilities >= float(config['accept_threshold'])
+    confident_reject = probabilities <= float(config['reject_threshold'])
+    confident = confident_accept | confident_reject
+    true_positives = int((predicted & actual).sum())
+    return {
+        'samples': int(len(labels)),
+        'positives': int(actual.sum()),
+        'agreement': round(float((predicted == actual).mean()), 4) if len(labels) else None,
+        'precision': round(true_positives / int(predicted.sum()), 4) if predicted.any() else None,
+        'recall': round(true_positives / int(actual.sum()), 4) if actual.any() else None,
+        'confident_coverage': round(float(confident.mean()), 4) if len(labels) else None,
+        'confident_agreement': (round(float((predicted[confident] == actual[confident]).mean()), 4)
+                                if confident.any() else None),
+        # 不採用と判定して見逃す案件（LLMは採用）の数。最も避けたい誤り
+        'confident_missed': int((confident_reject & actual).sum())
+    }
+
+def train(settings: Dict, prompt: str) -> Dict:
+    """
+    履歴から分類器を学習して保存する
+
+    一部の案件を検証用に取り分けて一致率を測った後、全ての案件で学習し直して保存する。
+
+    Returns:
+        学習結果のレポート
+
+    Raises:
+        ValueError: 現在のフィルタ条件でのLLMの判定が min_samples 件未満の場合、
+                    または採用・不採用の両方が含まれていない場合
+    """
+    config = get_config(settings)
+    samples = load_training_data(prompt)
+    if len(samples) < int(config['min_samples']):
+        raise ValueError(
+            f"現在のフィルタ条件でのLLMの判定が{config['min_samples']}件未満です（{len(samples)}件）"
+        )
+    labels = np.array([label for _, label in samples], dtype=np.float64)
+    if labels.min() == labels.max():
+        raise ValueError(f"学習データに採用・不採用の両方の案件が必要です（{len(samples)}件）")
+
+    vectors = [job_features(job, config) for job, _ in samples]
+    order = list(range(len(samples)))
+    random.Random(SPLIT_SEED).shuffle(order)
+    holdout_size = int(len(order) * min(0.5, max(0.0, float(config['holdout_ratio']))))
+    holdout, training = order[:holdout_size], order[holdout_size:]
+
+    holdout_report = None
+    if holdout:
+        weights, bias = fit(SparseRows([vectors[i] for i in training]), labels[training], config)
+        holdout_rows = SparseRows([vectors[i] for i in holdout])
+        holdout_report = evaluate(_sigmoid(holdout_rows.dot(weights) + bias), labels[holdout], config)
+
+    weights, bias = fit(SparseRows(vectors), labels, config)
+    report = {
+        'trained_at': datetime.now().isoformat(),
+        'prompt_hash': prompt_hash(prompt),
+        'samples': len(samples),
+        'positives': int(labels.sum()),
+        'n_features': int(config['n_features']),
+        'ngram_range': list(config['ngram_range']),
+        'holdout': holdout_report
+    }
+    temp_file = MODEL_FILE.with_name(MODEL_FILE.stem + '.tmp.npz')
+    np.savez(temp_file, weights=weights.astype(np.float32), bias=np.array([bias]),
+             meta=np.array(json.dumps(report, ensure_ascii=False)))
+    os.replace(temp_file, MODEL_FILE)
+    _model_cache['mtime'] = None
+    logger.info(
+        f"判定の分類器を学習しました: {report['samples']}件（採用 {report['positives']}件）, "
+        f"検証データの一致率 {(holdout_report or {}).get('agreement')}, "
+        f"確信度の高い判定の一致率 {(holdout_report or {}).get('confident_agreement')}"
+    )
+    return report
+
+class VerdictClassifier:
+    """学習済みの重みで案件の採用確率を予測する"""
+
+    def __init__(self, weights: np.ndarray, bias: float, meta: Dict):
+        self.weights = weights
+        self.bias = bias
+        self.meta = meta
+
+    def predict(self, jobs: List[Dict], config: Dict) -> np.ndarray:
+        """案件ごとの採用の確率（入力と同じ順序）"""
+        # 特徴量は学習時と同じ次元・n-gramで作る
+        feature_config = {**config, 'n_features': self.meta['n_features'], 'ngram_range': self.meta['ngram_range']}
+        rows = SparseRows([job_features(job, feature_config) for job in jobs])
+        return _sigmoid(rows.dot(self.weights) + self.bias)
+
+    def unusable_reason(self, config: Dict, prompt: str) -> Optional[str]:
+        """このモデルを判定に使えない理由（使える場合はNone）"""
+        if self.meta.get('prompt_hash') != prompt_hash(prompt):
+            return "フィルタ条件が学習時から変更されています"
+        if self.meta.get('samples', 0) < int(config['min_samples']):
+            return f"学習データが{config['min_samples']}件未満です"
+        agreement = (self.meta.get('holdout') or {}).get('confident_agreement')
+        if agreement is None or agreement < float(config['min_agreement']):
+            return f"検証データでの一致率（{agreement}）が{config['min_agreement']}未満です"
+        return None
+
+    def split(self, jobs: List[Dict], config: Dict) -> Tuple[Dict[int, Tuple[str, float]], List[Dict], Set[int]]:
+        """
+        ローカルで判定する案件とLLMに送る案件に分ける
+
+        Returns:
+            (案件のidをキーとしたローカルの判定（yes / no）と採用確率, LLMに送る案件,
+             LLMに送る案件のうち一致率の測定用に抽出した案件のid)
+        """
+        probabilities = self.predict(jobs, config) if jobs else np.zeros(0)
+        audit_rate = min(1.0, max(0.0, float(config['audit_rate'])))
+        local_decisions, llm_jobs, audited_ids = {}, [], set()
+        for job, probability in zip(jobs, probabilities):
+            probability = float(probability)
+            if probability >= float(config['accept_threshold']):
+                decision = 'yes'
+            elif probability <= float(config['reject_threshold']):
+                decision = 'no'
+            else:
+                llm_jobs.append(job)
+                continue
+            local_decisions[id(job)] = (decision, probability)
+            if random.random() < audit_rate:
+                llm_jobs.append(job)
+                audited_ids.add(id(job))
+        return local_decisions, llm_jobs, audited_ids
+
+_model_cache = {'mtime': None, 'classifier': None}
+_model_lock = threading.Lock()
+
+def load_model() -> Optional[VerdictClassifier]:
+    """保存された分類器を読み込む（ファイルが更新されるまで読み直さない）"""
+    with _model_lock:
+        try:
+            mtime = os.path.getmtime(MODEL_FILE)
+        except OSError:
+            return None
+        if _model_cache['mtime'] != mtime:
+            with np.load(MODEL_FILE) as data:
+                _model_cache['classifier'] = VerdictClassifier(
+                    data['weights'], float(data['bias'][0]), json.loads(str(data['meta']))
+                )
+            _model_cache['mtime'] = mtime
+        return _model_cache['classifier']
+
+def get_classifier(settings: Dict, prompt: str) -> Optional[VerdictClassifier]:
+    """判定に使える分類器を取得（無効・未学習・使える状態でない場合はNone）"""
+    config = get_config(settings)
+    if not config['enabled']:
+        return None
+    try:
+        classifier = load_model()
+    except Exception as e:
+        logger.warning(f"判定の分類器の読み込みに失敗: {str(e)}")
+        return None
+    if classifier is None:
+        logger.info("判定の分類器が未学習のため、全ての案件をLLMで判定します")
+        return None
+    reason = classifier.unusable_reason(config, prompt)
+    if reason:
+        logger.info(f"判定の分類器を使用しません: {reason}（再学習してください）")
+        return None
+    return classifier
+
+_metrics_lock = threading.Lock()
+
+def load_metrics() -> Dict:
+    """運用中の累計（ローカルで判定した件数と、抽出してLLMでも判定した案件での一致率）"""
+    try:
+        return json.loads(METRICS_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def record_outcome(jobs: List[Dict], local_decisions: Dict[int, Tuple[str, float]], audited_ids: Set[int],
+                   llm_results: Dict[int, Dict]):
+    """
+    運用中の集計を更新して保存する
+
+    Args:
+        jobs: 判定した全ての案件
+        local_decisions: split() が返したローカルの判定
+        audited_ids: 一致率の測定用にLLMでも判定した案件のid
+        llm_results: 案件のidをキーとしたLLMの判定結果
+    """
+    compared = [(local_decisions[job_id][0], llm_results[job_id]['decision']) for job_id in audited_ids
+                if llm_results.get(job_id, {}).get('decision') in ('yes', 'no')]
+    local_only = [job for job in jobs if id(job) in local_decisions and id(job) not in audited_ids]
+    with _metrics_lock:
+        metrics = load_metrics()
+        metrics['local_accepted'] = metrics.get('local_accepted', 0) + sum(
+            1 for job in local_only if local_decisions[id(job)][0] == 'yes')
+        metrics['local_rejected'] = metrics.get('local_rejected', 0) + sum(
+            1 for job in local_only if local_decisions[id(job)][0] == 'no')
+        metrics['audited'] = metrics.get('audited', 0) + len(compared)
+        metrics['audit_agreed'] = metrics.get('audit_agreed', 0) + sum(1 for local, llm in compared if local == llm)
+        # 分類器が不採用としたがLLMは採用した件数（見逃しにつながる誤り）
+        metrics['audit_missed'] = metrics.get('audit_missed', 0) + sum(
+            1 for local, llm in compared if local == 'no' and llm == 'yes')
+        metrics['live_agreement'] = (round(metrics['audit_agreed'] / metrics['audited'], 4)
+                                     if metrics['audited'] else None)
+        metrics['updated_at'] = datetime.now().isoformat()
+        try:
+            METRICS_FILE.write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding='utf-8')
+        except Exception as e:
+            logger.warning(f"判定の分類器の集計の保存に失敗: {str(e)}")
+
+def report() -> Dict:
+    """学習時の検証結果と運用中の一致率"""
+    try:
+        classifier = load_model()
+    except Exception as e:
+        logger.warning(f"判定の分類器の読み込みに失敗: {str(e)}")
+        classifier = None
+    return {
+        'model': classifier.meta if classifier else None,
+        'live': load_metrics()
+    }
+
+if __name__ == "__main__":
+    if '--train' not in sys.argv[1:]:
+        print("使い方: python verdict_classifier.py --train")
+        sys.exit(1)
+    from crawler import load_config, load_settings
+    result = train(load_settings(), load_config().get('prompt', ''))
+    print(json.dumps(result, ensure_ascii=False, indent=2))